@@ -7,18 +7,22 @@ background RMS in a 2D image.
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 from itertools import product
+import json
+import os
 
 import numpy as np
-from numpy.lib.index_tricks import index_exp
 from astropy.utils import lazyproperty
 
-from .core import SigmaClip, SExtractorBackground, StdBackgroundRMS
+from .core import (SigmaClip, SExtractorBackground, StdBackgroundRMS,
+                   _histogram_sigma_clip)
 from ..utils import ShepardIDWInterpolator
 
 
-__all__ = ['BkgZoomInterpolator', 'BkgIDWInterpolator', 'Background2D']
+__all__ = ['BkgZoomInterpolator', 'BkgSplineInterpolator',
+           'BkgIDWInterpolator', 'Background2D']
 
-__doctest_requires__ = {('BkgZoomInterpolator', 'Background2D'): ['scipy']}
+__doctest_requires__ = {('BkgZoomInterpolator', 'BkgSplineInterpolator',
+                         'Background2D'): ['scipy']}
 
 
 class BkgZoomInterpolator(object):
@@ -71,7 +75,7 @@ class BkgZoomInterpolator(object):
 
         mesh = np.asanyarray(mesh)
         if np.ptp(mesh) == 0:
-            return np.zeros_like(bkg2d_obj.data) + np.min(mesh)
+            return np.zeros(bkg2d_obj._data_shape) + np.min(mesh)
 
         from scipy.ndimage import zoom
 
@@ -86,17 +90,230 @@ class BkgZoomInterpolator(object):
             result = zoom(mesh, zoom_factor, order=self.order, mode=self.mode,
                           cval=self.cval)
 
-            return result[0:bkg2d_obj.data.shape[0],
-                          0:bkg2d_obj.data.shape[1]]
+            return result[0:bkg2d_obj._data_shape[0],
+                          0:bkg2d_obj._data_shape[1]]
         else:
             # The mesh is resized directly to the final data size.
-            zoom_factor = (float(bkg2d_obj.data.shape[0] / mesh.shape[0]),
-                           float(bkg2d_obj.data.shape[1] / mesh.shape[1]))
+            zoom_factor = (float(bkg2d_obj._data_shape[0] / mesh.shape[0]),
+                           float(bkg2d_obj._data_shape[1] / mesh.shape[1]))
 
             return zoom(mesh, zoom_factor, order=self.order, mode=self.mode,
                         cval=self.cval)
 
 
+class BkgSplineInterpolator(object):
+    """
+    This class generates full-sized background and background RMS images
+    from lower-resolution mesh images using separable spline
+    interpolation.
+
+    The result is the same as `BkgZoomInterpolator`, but the spline
+    interpolation is expressed as the product of two (one for each axis)
+    interpolation weight matrices with the mesh.  The weight matrices
+    depend only on the mesh and image shapes.  They are computed once
+    and then reused for both the background and background RMS images
+    (and for each image of a stack).  For ``order=1`` (bilinear
+    interpolation), each output row is computed from only two rows of
+    the intermediate result, which is much faster for large images.
+
+    This class must be used in concert with the `Background2D` class.
+
+    Parameters
+    ----------
+    order : int, optional
+        The order of the spline interpolation used to resize the
+        low-resolution background and background RMS mesh images.  The
+        value must be an integer in the range 0-5.  The default is 3
+        (bicubic interpolation).
+
+    mode : {'reflect', 'constant', 'nearest', 'wrap'}, optional
+        Points outside the boundaries of the input are filled according
+        to the given mode.  Default is 'reflect'.
+
+    cval : float, optional
+        The value used for points outside the boundaries of the input if
+        ``mode='constant'``. Default is 0.0
+    """
+
+    def __init__(self, order=3, mode='reflect', cval=0.0):
+        self.order = order
+        self.mode = mode
+        self.cval = cval
+        self._weights = {}
+
+    def _axis_weights(self, nmesh, nout, zoom_factor):
+        """
+        Calculate the 1D spline interpolation weights along one axis.
+
+        Parameters
+        ----------
+        nmesh : int
+            The number of meshes along the axis.
+
+        nout : int
+            The number of output pixels along the axis.
+
+        zoom_factor : float
+            The zoom factor along the axis.
+
+        Returns
+        -------
+        weights : 2D `~numpy.ndarray`
+            A ``(nout, nmesh)`` array of interpolation weights.
+        """
+
+        from scipy.ndimage import zoom
+
+        # order, mode, and cval are public attributes that may be changed
+        # after the weights are cached
+        key = (nmesh, nout, zoom_factor, self.order, self.mode, self.cval)
+        if key not in self._weights:
+            weights = np.empty((nmesh, nout))
+            for i, unit in enumerate(np.eye(nmesh)):
+                weights[i] = zoom(unit, zoom_factor, order=self.order,
+                                  mode=self.mode, cval=self.cval)[0:nout]
+            self._weights[key] = weights.T
+
+        return self._weights[key]
+
+    def __call__(self, mesh, bkg2d_obj, output=None):
+        """
+        Resize the 2D mesh array.
+
+        Parameters
+        ----------
+        mesh : 2D `~numpy.ndarray`
+            The low-resolution 2D mesh array.
+
+        bkg2d_obj : `Background2D` object
+            The `Background2D` object that prepared the ``mesh`` array.
+
+        output : 2D `~numpy.ndarray`, optional
+            An array (e.g. a `~numpy.memmap`) with the same shape as
+            the image into which the result is written.  The output
+            is computed in blocks of rows, so no full-sized temporary
+            arrays are created.
+
+        Returns
+        -------
+        result : 2D `~numpy.ndarray`
+            The resized background or background RMS image.  If
+            ``output`` is input, then ``output`` is returned.
+        """
+
+        mesh = np.asanyarray(mesh)
+        shape = bkg2d_obj._data_shape
+        if output is None:
+            output = np.empty(shape)
+        elif output.shape != shape:
+            raise ValueError('output must have a shape of {0}'
+                             .format(shape))
+
+        if np.ptp(mesh) == 0:
+            output[...] = np.min(mesh)
+            return output
+
+        if bkg2d_obj.edge_method == 'pad':
+            # The mesh is resized to the larger padded-data size (i.e.
+            # zoom_factor should be an integer) and then cropped back to
+            # the final data size.
+            zoom_factor = (int(bkg2d_obj.nyboxes * bkg2d_obj.box_size[0] /
+                               mesh.shape[0]),
+                           int(bkg2d_obj.nxboxes * bkg2d_obj.box_size[1] /
+                               mesh.shape[1]))
+        else:
+            zoom_factor = (float(shape[0] / mesh.shape[0]),
+                           float(shape[1] / mesh.shape[1]))
+
+        yweights = self._axis_weights(mesh.shape[0], shape[0],
+                                      zoom_factor[0])
+        xweights = self._axis_weights(mesh.shape[1], shape[1],
+                                      zoom_factor[1])
+        xresized = np.dot(np.ma.getdata(mesh), xweights.T)
+
+        if self.order == 1:
+            # each output row depends on (at most) two mesh rows, which
+            # are not adjacent if the weights wrap around the edges
+            # (mode='wrap')
+            rows = np.arange(shape[0])
+            nonzero = yweights != 0
+            idx0 = np.argmax(nonzero, axis=1)
+            idx1 = mesh.shape[0] - 1 - np.argmax(nonzero[:, ::-1], axis=1)
+            weights0 = yweights[rows, idx0][:, np.newaxis]
+            weights1 = (yweights[rows, idx1] * (idx1 != idx0))[:, np.newaxis]
+
+        nrows = max(1, 2**20 // shape[1])
+        for i in range(0, shape[0], nrows):
+            slc = slice(i, i + nrows)
+            if self.order == 1:
+                output[slc] = (weights0[slc] * xresized[idx0[slc]] +
+                               weights1[slc] * xresized[idx1[slc]])
+            else:
+                output[slc] = np.dot(yweights[slc], xresized)
+
+        return output
+
+
+def _idw_interpolate(coordinates, values, positions, leafsize=10,
+                     n_neighbors=8, eps=0., power=1., reg=0., output=None):
+    """
+    Interpolate several sets of values defined at the same coordinates
+    using `~photutils.utils.ShepardIDWInterpolator`.
+
+    The k-d tree, the nearest-neighbor query, and the interpolation
+    weights depend only on the coordinates and positions, so they are
+    computed once and then used for each set of values (e.g. the mesh
+    values of each image of a stack).
+
+    Parameters
+    ----------
+    coordinates : 2D `~numpy.ndarray`
+        The ``(N, 2)`` coordinates of the data points.
+
+    values : 2D `~numpy.ndarray`
+        A ``(nsets, N)`` array with one set of data values per row.
+
+    positions : 2D `~numpy.ndarray`
+        The ``(M, 2)`` coordinates at which to interpolate the values.
+
+    leafsize, n_neighbors, eps, power, reg : optional
+        See `~photutils.utils.ShepardIDWInterpolator`.
+
+    output : `~numpy.ndarray`, optional
+        An array of ``nsets`` rows (each with ``M`` elements) into
+        which the result is written.
+
+    Returns
+    -------
+    result : `~numpy.ndarray`
+        A ``(nsets, M)`` array of the interpolated values.  If
+        ``output`` is input, then ``output`` is returned.
+    """
+
+    n_neighbors = int(n_neighbors)
+    if n_neighbors < 1:
+        raise ValueError('n_neighbors must be a positive integer')
+
+    values = np.asarray(values)
+    if output is None:
+        output = np.empty((values.shape[0], len(positions)))
+
+    f = ShepardIDWInterpolator(coordinates, values[0], leafsize=leafsize)
+    distances, idx = f.kdtree.query(positions, k=n_neighbors, eps=eps)
+    if n_neighbors == 1:
+        for values1d, output1d in zip(values, output):
+            output1d[...] = values1d[idx].reshape(output1d.shape)
+        return output
+
+    idx, weights = f._neighbor_weights(distances, idx, power, reg,
+                                       conf_dist=1.e-12)
+    for values1d, output1d in zip(values, output):
+        output1d[...] = np.sum(weights * values1d[idx],
+                               axis=1).reshape(output1d.shape)
+
+    return output
+
+
 class BkgIDWInterpolator(object):
     """
     This class generates full-sized background and background RMS images
@@ -131,35 +348,148 @@ class BkgIDWInterpolator(object):
         self.power = power
         self.reg = reg
 
-    def __call__(self, mesh, bkg2d_obj):
+    def __call__(self, mesh, bkg2d_obj, output=None):
         """
         Resize the 2D mesh array.
 
         Parameters
         ----------
-        mesh : 2D `~numpy.ndarray`
-            The low-resolution 2D mesh array.
+        mesh : 2D or 3D `~numpy.ndarray`
+            The low-resolution 2D mesh array, or a 3D stack of mesh
+            arrays.  The meshes of a stack are interpolated using the
+            same k-d tree and interpolation weights.
 
         bkg2d_obj : `Background2D` object
             The `Background2D` object that prepared the ``mesh`` array.
 
+        output : `~numpy.ndarray`, optional
+            An array (e.g. a `~numpy.memmap`) with the shape of the
+            resized ``mesh`` into which the result is written.
+
         Returns
         -------
-        result : 2D `~numpy.ndarray`
-            The resized background or background RMS image.
+        result : 2D or 3D `~numpy.ndarray`
+            The resized background or background RMS image (or stack of
+            images).  If ``output`` is input, then ``output`` is
+            returned.
         """
 
         mesh = np.asanyarray(mesh)
+        shape = mesh.shape[:-2] + bkg2d_obj._data_shape
+        if output is None:
+            output = np.empty(shape)
+        elif output.shape != shape:
+            raise ValueError('output must have a shape of {0}'
+                             .format(shape))
+
         if np.ptp(mesh) == 0:
-            return np.zeros_like(bkg2d_obj.data) + np.min(mesh)
+            output[...] = np.min(mesh)
+            return output
+
+        mesh1d = mesh[..., bkg2d_obj.mesh_yidx, bkg2d_obj.mesh_xidx]
+        _idw_interpolate(bkg2d_obj.yx,
+                         np.ma.getdata(mesh1d).reshape(-1, mesh1d.shape[-1]),
+                         bkg2d_obj.data_coords, leafsize=self.leafsize,
+                         n_neighbors=self.n_neighbors, power=self.power,
+                         reg=self.reg,
+                         output=output.reshape((-1,) +
+                                               bkg2d_obj._data_shape))
 
-        mesh1d = mesh[bkg2d_obj.mesh_yidx, bkg2d_obj.mesh_xidx]
-        f = ShepardIDWInterpolator(bkg2d_obj.yx, mesh1d,
-                                   leafsize=self.leafsize)
-        data = f(bkg2d_obj.data_coords, n_neighbors=self.n_neighbors,
-                 power=self.power, reg=self.reg)
+        return output
 
-        return data.reshape(bkg2d_obj.data.shape)
+
+def _interpolator_config(interpolator):
+    """
+    Return the class name and the JSON-encoded parameters of a
+    background interpolator.
+
+    Only the (public) parameters of the `BkgZoomInterpolator`,
+    `BkgSplineInterpolator`, and `BkgIDWInterpolator` classes are
+    stored.  For any other interpolator, the parameters are an empty
+    JSON object.
+    """
+
+    name = interpolator.__class__.__name__
+    if name in _INTERPOLATORS:
+        params = {key: value for key, value in vars(interpolator).items()
+                  if not key.startswith('_')}
+    else:
+        params = {}
+
+    # numpy scalars are not JSON serializable
+    return name, json.dumps(params, sort_keys=True,
+                            default=lambda value: value.item())
+
+
+def _make_interpolator(name, params):
+    """
+    Create a background interpolator from its class name and
+    JSON-encoded parameters.
+    """
+
+    if name not in _INTERPOLATORS:
+        raise ValueError('The "{0}" interpolator cannot be restored.  '
+                         'Please input the interpolator.'.format(name))
+
+    params = {str(key): value for key, value in json.loads(params).items()}
+
+    return _INTERPOLATORS[name](**params)
+
+
+def _create_memmap(filename, shape, overwrite=False):
+    """
+    Create a FITS or NumPy ``.npy`` file containing a float64 image and
+    return a writeable memory map of the image.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the output file.  If ``filename`` has a ``.npy``
+        extension, then a NumPy file is created, otherwise a FITS file
+        (with the image in the primary HDU) is created.
+
+    shape : tuple of int
+        The shape of the image.
+
+    overwrite : bool, optional
+        If `True`, overwrite ``filename`` if it exists.
+
+    Returns
+    -------
+    result : `~numpy.memmap`
+        The memory-mapped image.
+    """
+
+    if not overwrite and os.path.exists(filename):
+        raise IOError('File "{0}" already exists.'.format(filename))
+
+    if os.path.splitext(str(filename))[1] == '.npy':
+        return np.lib.format.open_memmap(str(filename), mode='w+',
+                                         dtype=np.float64, shape=shape)
+
+    from astropy.io import fits
+
+    # write only the header and extend the file to the full (padded)
+    # size of the data without creating the data in memory
+    header = fits.PrimaryHDU(np.zeros((1,) * len(shape))).header
+    for i, size in enumerate(shape[::-1]):
+        header['NAXIS{0}'.format(i + 1)] = size
+    header_str = header.tostring()
+    nbytes = int(np.prod(shape)) * 8
+    block_size = 2880
+    nblocks = (nbytes + block_size - 1) // block_size
+    with open(filename, 'wb') as fobj:
+        fobj.write(header_str.encode('ascii'))
+        fobj.seek(len(header_str) + nblocks * block_size - 1)
+        fobj.write(b'\0')
+
+    return np.memmap(filename, dtype='>f8', mode='r+',
+                     offset=len(header_str), shape=shape)
+
+
+_INTERPOLATORS = {'BkgZoomInterpolator': BkgZoomInterpolator,
+                  'BkgSplineInterpolator': BkgSplineInterpolator,
+                  'BkgIDWInterpolator': BkgIDWInterpolator}
 
 
 class Background2D(object):
@@ -178,7 +508,12 @@ class Background2D(object):
     ----------
     data : array_like
         The 2D array from which to estimate the background and/or
-        background RMS map.
+        background RMS map.  ``data`` may also be a 3D stack of 2D
+        images with the same shape (e.g. a series of exposures), in
+        which case the mesh statistics of all images are computed in a
+        single pass and the background and background RMS are 3D
+        arrays with the same shape as ``data``.  For a stack, the mesh
+        selection (and hence the ``mask``) is shared by all images.
 
     box_size : int or array_like (int)
         The box size along each axis.  If ``box_size`` is a scalar then
@@ -192,7 +527,8 @@ class Background2D(object):
     mask : array_like (bool), optional
         A boolean mask, with the same shape as ``data``, where a `True`
         value indicates the corresponding element of ``data`` is masked.
-        Masked data are excluded from calculations.
+        Masked data are excluded from calculations.  If ``data`` is a 3D
+        stack, then ``mask`` must have the shape of a single 2D image.
 
     exclude_mesh_method : {'threshold', 'any', 'all'}, optional
         The method used to determine whether to exclude a particular
@@ -246,7 +582,9 @@ class Background2D(object):
         A `~photutils.background.SigmaClip` object that defines the
         sigma clipping parameters.  If `None` then no sigma clipping
         will be performed.  The default is to perform sigma clipping
-        with ``sigma=3.`` and ``iters=10``.
+        with ``sigma=3.`` and ``iters=10``.  Integer data are clipped
+        using a histogram of the data values if the ``bkg_estimator``
+        has ``histogram=True`` (the default).
 
     bkg_estimator : callable, optional
         A callable object (a function or e.g., an instance of any
@@ -296,17 +634,20 @@ class Background2D(object):
                  interpolator=BkgZoomInterpolator()):
 
         data = np.asanyarray(data)
+        if data.ndim not in (2, 3):
+            raise ValueError('data must be a 2D array or a 3D stack of 2D '
+                             'arrays')
 
         box_size = np.atleast_1d(box_size)
         if len(box_size) == 1:
             box_size = np.repeat(box_size, 2)
-        self.box_size = (min(box_size[0], data.shape[0]),
-                         min(box_size[1], data.shape[1]))
+        self.box_size = (min(box_size[0], data.shape[-2]),
+                         min(box_size[1], data.shape[-1]))
         self.box_npixels = self.box_size[0] * self.box_size[1]
 
         if mask is not None:
             mask = np.asanyarray(mask)
-            if mask.shape != data.shape:
+            if mask.shape != data.shape[-2:]:
                 raise ValueError('mask and data must have the same shape')
 
         if exclude_mesh_percentile < 0 or exclude_mesh_percentile > 100:
@@ -314,6 +655,8 @@ class Background2D(object):
                              '100 (inclusive).')
 
         self.data = data
+        self._data_shape = data.shape[-2:]
+        self._stack_shape = data.shape[:-2]
         self.mask = mask
         self.exclude_mesh_method = exclude_mesh_method
         self.exclude_mesh_percentile = exclude_mesh_percentile
@@ -336,82 +679,7 @@ class Background2D(object):
         self._calc_bkg_bkgrms()
         self._calc_coordinates()
 
-    def _pad_data(self, yextra, xextra):
-        """
-        Pad the ``data`` and ``mask`` to have an integer number of
-        background meshes of size ``box_size`` in both dimensions.  The
-        padding is added on the top and/or right edges (this is the best
-        option for the "zoom" interpolator).
-
-        Parameters
-        ----------
-        yextra, xextra : int
-            The modulus of the data size and the box size in both the
-            ``y`` and ``x`` dimensions.  This is the number of extra
-            pixels beyond a multiple of the box size in the ``y`` and
-            ``x`` dimensions.
-
-        Returns
-        -------
-        result : `~numpy.ma.MaskedArray`
-            The padded data and mask as a masked array.
-        """
-
-        ypad = 0
-        xpad = 0
-        if yextra > 0:
-            ypad = self.box_size[0] - yextra
-        if xextra > 0:
-            xpad = self.box_size[1] - xextra
-        pad_width = ((0, ypad), (0, xpad))
-
-        # mode must be a string for numpy < 0.11
-        # (see https://github.com/numpy/numpy/issues/7112)
-        mode = str('constant')
-        data = np.pad(self.data, pad_width, mode=mode,
-                      constant_values=[1.e10])
-
-        # mask the padded regions
-        pad_mask = np.zeros_like(data)
-        y0 = data.shape[0] - ypad
-        x0 = data.shape[1] - xpad
-        pad_mask[y0:, :] = True
-        pad_mask[:, x0:] = True
-
-        # pad the input mask separately (there is no np.ma.pad function)
-        if self.mask is not None:
-            mask = np.pad(self.mask, pad_width, mode=mode,
-                          constant_values=[True])
-            mask = np.logical_or(mask, pad_mask)
-        else:
-            mask = pad_mask
-
-        return np.ma.masked_array(data, mask=mask)
-
-    def _crop_data(self):
-        """
-        Crop the ``data`` and ``mask`` to have an integer number of
-        background meshes of size ``box_size`` in both dimensions.  The
-        data are cropped on the top and/or right edges (this is the best
-        option for the "zoom" interpolator).
-
-        Returns
-        -------
-        result : `~numpy.ma.MaskedArray`
-            The cropped data and mask as a masked array.
-        """
-
-        ny_crop = self.nyboxes * self.box_size[1]
-        nx_crop = self.nxboxes * self.box_size[0]
-        crop_slc = index_exp[0:ny_crop, 0:nx_crop]
-        if self.mask is not None:
-            mask = self.mask[crop_slc]
-        else:
-            mask = False
-
-        return np.ma.masked_array(self.data[crop_slc], mask=mask)
-
-    def _select_meshes(self, data):
+    def _select_meshes(self, nmasked):
         """
         Define the x and y indices with respect to the low-resolution
         mesh image of the meshes to use for the background
@@ -423,9 +691,8 @@ class Background2D(object):
 
         Parameters
         ----------
-        data : 2D `~numpy.ma.MaskedArray`
-            A 2D array where the y dimension represents each mesh and
-            the x dimension represents the data in each mesh.
+        nmasked : 1D `~numpy.ndarray`
+            The number of masked pixels in each mesh.
 
         Returns
         -------
@@ -433,9 +700,6 @@ class Background2D(object):
             The 1D mesh indices.
         """
 
-        # the number of masked pixels in each mesh
-        nmasked = np.ma.count_masked(data, axis=1)
-
         if self.exclude_mesh_method == 'any':
             # keep meshes that do not have any masked pixels
             mesh_idx = np.where(nmasked == 0)[0]
@@ -476,43 +740,103 @@ class Background2D(object):
         """
         Prepare the data.
 
-        First, pad or crop the 2D data array so that there are an
-        integer number of meshes in both dimensions, creating a masked
-        array.
-
-        Then reshape into a different 2D masked array where each row
-        represents the data in a single mesh.  This method also performs
-        a first cut at rejecting certain meshes as specified by the
-        input keywords.
+        First, define the meshes so that there are an integer number of
+        meshes in both dimensions.  If ``edge_method='pad'``, the meshes
+        on the top and/or right edges extend beyond the data and their
+        pixels outside of the data are masked.  If
+        ``edge_method='crop'``, the data beyond the last full meshes are
+        ignored.
+
+        Then create a 2D masked array where each row represents the data
+        in a single mesh.  This method also performs a first cut at
+        rejecting certain meshes as specified by the input keywords.
+
+        To limit memory use, the number of masked pixels in each mesh
+        is computed directly from the mask and only the selected meshes
+        are copied (once) from the data.  Neither the data nor the mask
+        are padded or copied as a whole.
+
+        If ``data`` is a `~numpy.ma.MaskedArray`, its mask is combined
+        with the input ``mask``.  For a 3D stack of images, the rows of
+        all images are stacked (image by image) so that the mesh
+        statistics of all images can be computed at once.  All images
+        share the same selected meshes, which are selected using the
+        pixels masked in any image.
         """
 
-        self.nyboxes = self.data.shape[0] // self.box_size[0]
-        self.nxboxes = self.data.shape[1] // self.box_size[1]
-        yextra = self.data.shape[0] % self.box_size[0]
-        xextra = self.data.shape[1] % self.box_size[1]
+        ny, nx = self.box_size
+        self.nyboxes = self._data_shape[0] // ny
+        self.nxboxes = self._data_shape[1] // nx
+        yextra = self._data_shape[0] % ny
+        xextra = self._data_shape[1] % nx
 
-        if (xextra + yextra) == 0:
-            # no resizing of the data is necessary
-            data_ma = np.ma.masked_array(self.data, mask=self.mask)
-        else:
-            # pad or crop the data
+        if (xextra + yextra) > 0:
             if self.edge_method == 'pad':
-                data_ma = self._pad_data(yextra, xextra)
-                self.nyboxes = data_ma.shape[0] // self.box_size[0]
-                self.nxboxes = data_ma.shape[1] // self.box_size[1]
-            elif self.edge_method == 'crop':
-                data_ma = self._crop_data()
-            else:
+                self.nyboxes += int(yextra > 0)
+                self.nxboxes += int(xextra > 0)
+            elif self.edge_method != 'crop':
                 raise ValueError('edge_method must be "pad" or "crop"')
 
-        # a reshaped 2D array with mesh data along the x axis
-        mesh_data = np.ma.swapaxes(data_ma.reshape(
-            self.nyboxes, self.box_size[0], self.nxboxes, self.box_size[1]),
-            1, 2).reshape(self.nyboxes * self.nxboxes, self.box_npixels)
+        data = self.data
+        mask = self.mask
+        if np.ma.isMaskedArray(data):
+            data_mask = np.ma.getmaskarray(data)
+            if mask is not None:
+                data_mask = data_mask | mask.astype(bool)
+            mask = data_mask
+            data = np.ma.getdata(data)
+
+        nimages = int(np.prod(self._stack_shape))
+        data = np.asarray(data).reshape((nimages,) + self._data_shape)
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool)
+            if mask.ndim > 2:
+                mask = mask.reshape((nimages,) + self._data_shape)
+
+        # the number of masked pixels in each mesh, including the
+        # pixels beyond the data edges for padded meshes
+        ystarts = np.arange(self.nyboxes) * ny
+        xstarts = np.arange(self.nxboxes) * nx
+        ysizes = np.minimum(ystarts + ny, self._data_shape[0]) - ystarts
+        xsizes = np.minimum(xstarts + nx, self._data_shape[1]) - xstarts
+        nmasked = self.box_npixels - np.outer(ysizes, xsizes).ravel()
+        if mask is not None:
+            mask2d = mask if mask.ndim == 2 else mask.any(axis=0)
+            mask2d = mask2d[:ystarts[-1] + ysizes[-1],
+                            :xstarts[-1] + xsizes[-1]]
+            nmasked += np.add.reduceat(
+                np.add.reduceat(mask2d, ystarts, axis=0, dtype=np.intp),
+                xstarts, axis=1).ravel()
 
         # first cut on rejecting meshes
-        self.mesh_idx = self._select_meshes(mesh_data)
-        self.mesh_data = mesh_data[self.mesh_idx, :]
+        self.mesh_idx = self._select_meshes(nmasked)
+
+        # gather only the selected meshes into a contiguous array; the
+        # pixels of padded meshes beyond the data edges are masked
+        yidx, xidx = np.unravel_index(self.mesh_idx,
+                                      (self.nyboxes, self.nxboxes))
+        rows = yidx[:, np.newaxis] * ny + np.arange(ny)
+        cols = xidx[:, np.newaxis] * nx + np.arange(nx)
+        outside = ((rows >= self._data_shape[0])[:, :, np.newaxis] |
+                   (cols >= self._data_shape[1])[:, np.newaxis, :])
+        rows = np.minimum(rows, self._data_shape[0] - 1)[:, :, np.newaxis]
+        cols = np.minimum(cols, self._data_shape[1] - 1)[:, np.newaxis, :]
+
+        mesh_data = data[:, rows, cols].reshape(-1, self.box_npixels)
+        if mask is None and not np.any(outside):
+            mesh_mask = np.ma.nomask
+        else:
+            if mask is None:
+                mesh_mask = outside
+            elif mask.ndim == 2:
+                mesh_mask = mask[rows, cols] | outside
+            else:
+                mesh_mask = mask[:, rows, cols] | outside
+            if mesh_mask.ndim == 3 and nimages > 1:
+                mesh_mask = np.tile(mesh_mask, (nimages, 1, 1))
+            mesh_mask = mesh_mask.reshape(-1, self.box_npixels)
+
+        self.mesh_data = np.ma.masked_array(mesh_data, mask=mesh_mask)
 
         return
 
@@ -524,22 +848,24 @@ class Background2D(object):
         Parameters
         ----------
         data : 1D `~numpy.ndarray`
-            A 1D array of mesh values.
+            A 1D array of mesh values.  For a stack of images, ``data``
+            is a 2D array with the mesh values of each image along the
+            x axis.
 
         Returns
         -------
         result : 2D `~numpy.ma.MaskedArray`
-            A 2D masked array.  Pixels not defined in ``mesh_idx`` are
-            masked.
+            A 2D masked array (3D for a stack of images).  Pixels not
+            defined in ``mesh_idx`` are masked.
         """
 
-        if data.shape != self.mesh_idx.shape:
+        if data.shape[-1:] != self.mesh_idx.shape:
             raise ValueError('data and mesh_idx must have the same shape')
 
-        data2d = np.zeros(self._mesh_shape)
+        data2d = np.zeros(data.shape[:-1] + self._mesh_shape)
         mask2d = np.ones(data2d.shape).astype(np.bool)
-        data2d[self.mesh_yidx, self.mesh_xidx] = data
-        mask2d[self.mesh_yidx, self.mesh_xidx] = False
+        data2d[..., self.mesh_yidx, self.mesh_xidx] = data
+        mask2d[..., self.mesh_yidx, self.mesh_xidx] = False
 
         return np.ma.masked_array(data2d, mask=mask2d)
 
@@ -554,8 +880,11 @@ class Background2D(object):
 
         Parameters
         ----------
-        data : 1D `~numpy.ndarray`
-            A 1D array of mesh values.
+        data : 1D or 2D `~numpy.ndarray`
+            A 1D array of mesh values, or a 2D array with one set of
+            mesh values (e.g. of each image of a stack) per row.  All
+            the sets are interpolated using the same k-d tree and
+            interpolation weights.
 
         n_neighbors : int, optional
             The maximum number of nearest neighbors to use during the
@@ -580,17 +909,17 @@ class Background2D(object):
         -------
         result : 2D `~numpy.ndarray`
             A 2D array of the mesh values where masked pixels have been
-            filled by IDW interpolation.
+            filled by IDW interpolation (3D for a 2D ``data`` array).
        """
 
         yx = np.column_stack([self.mesh_yidx, self.mesh_xidx])
         coords = np.array(list(product(range(self.nyboxes),
                                        range(self.nxboxes))))
-        f = ShepardIDWInterpolator(yx, data)
-        img1d = f(coords, n_neighbors=n_neighbors, power=power, eps=eps,
-                  reg=reg)
+        img1d = _idw_interpolate(yx, np.ma.getdata(data).reshape(
+            -1, data.shape[-1]), coords, n_neighbors=n_neighbors, eps=eps,
+            power=power, reg=reg)
 
-        return img1d.reshape(self._mesh_shape)
+        return img1d.reshape(data.shape[:-1] + self._mesh_shape)
 
     def _selective_filter(self, data, indices):
         """
@@ -625,10 +954,20 @@ class Background2D(object):
 
         return data_out
 
-    def _filter_meshes(self):
+    def _filter_meshes(self, bkg, bkgrms):
         """
         Apply a 2D median filter to the low-resolution 2D mesh,
         including only pixels inside the image at the borders.
+
+        Parameters
+        ----------
+        bkg, bkgrms : 2D `~numpy.ndarray`
+            The 2D background and background RMS meshes.
+
+        Returns
+        -------
+        bkg, bkgrms : 2D `~numpy.ndarray`
+            The filtered 2D background and background RMS meshes.
         """
 
         from scipy.ndimage import generic_filter
@@ -640,21 +979,54 @@ class Background2D(object):
 
         if self.filter_threshold is None:
             # filter the entire arrays
-            self.background_mesh = generic_filter(
-                self.background_mesh, nanmedian_func, size=self.filter_size,
-                mode='constant', cval=np.nan)
-            self.background_rms_mesh = generic_filter(
-                self.background_rms_mesh, nanmedian_func,
-                size=self.filter_size, mode='constant', cval=np.nan)
+            bkg = generic_filter(bkg, nanmedian_func, size=self.filter_size,
+                                 mode='constant', cval=np.nan)
+            bkgrms = generic_filter(bkgrms, nanmedian_func,
+                                    size=self.filter_size, mode='constant',
+                                    cval=np.nan)
         else:
             # selectively filter
-            indices = np.nonzero(self.background_mesh > self.filter_threshold)
-            self.background_mesh = self._selective_filter(
-                self.background_mesh, indices)
-            self.background_rms_mesh = self._selective_filter(
-                self.background_rms_mesh, indices)
+            indices = np.nonzero(bkg > self.filter_threshold)
+            bkg = self._selective_filter(bkg, indices)
+            bkgrms = self._selective_filter(bkgrms, indices)
 
-        return
+        return bkg, bkgrms
+
+    def _calc_mesh_stats(self, mesh_data):
+        """
+        Calculate the sigma-clipped data and the background and
+        background RMS estimates for each mesh.
+
+        Parameters
+        ----------
+        mesh_data : 2D `~numpy.ma.MaskedArray`
+            A 2D array where the y dimension represents each mesh and
+            the x dimension represents the data in each mesh.
+
+        Returns
+        -------
+        data_sigclip : 2D `~numpy.ma.MaskedArray`
+            The sigma-clipped ``mesh_data``.
+
+        bkg1d, bkgrms1d : 1D `~numpy.ma.MaskedArray`
+            The background and background RMS estimates for each mesh.
+        """
+
+        if self.sigma_clip is not None:
+            # a SigmaClip subclass may redefine the clipping
+            if (type(self.sigma_clip) is SigmaClip and
+                    getattr(self.bkg_estimator, 'histogram', False)):
+                data_sigclip = _histogram_sigma_clip(mesh_data,
+                                                     self.sigma_clip, axis=1)
+            else:
+                data_sigclip = self.sigma_clip(mesh_data, axis=1)
+        else:
+            data_sigclip = mesh_data
+
+        bkg1d = self.bkg_estimator(data_sigclip, axis=1)
+        bkgrms1d = self.bkgrms_estimator(data_sigclip, axis=1)
+
+        return data_sigclip, bkg1d, bkgrms1d
 
     def _calc_bkg_bkgrms(self):
         """
@@ -669,35 +1041,64 @@ class Background2D(object):
         "MINIBACK_RMS" background maps in SExtractor, respectively.
         """
 
-        if self.sigma_clip is not None:
-            data_sigclip = self.sigma_clip(self.mesh_data, axis=1)
-        else:
-            data_sigclip = self.mesh_data
-        self._data_sigclip = data_sigclip
+        # bkg1d and bkgrms1d are needed for background_mesh_ma and
+        # background_rms_mesh_ma properties
+        self._data_sigclip, bkg1d, bkgrms1d = (
+            self._calc_mesh_stats(self.mesh_data))
+        self.bkg1d = bkg1d.reshape(self._stack_shape + (-1,))
+        self.bkgrms1d = bkgrms1d.reshape(self._stack_shape + (-1,))
+
+        self._make_meshes()
+
+    def _make_meshes(self):
+        """
+        Create the 2D background and background RMS meshes from the
+        ``bkg1d`` and ``bkgrms1d`` mesh values, including the mesh
+        interpolation and filtering.
+
+        For a stack of images, the meshes of each image are created
+        separately and the results are 3D arrays.
+        """
 
         self._mesh_shape = (self.nyboxes, self.nxboxes)
         self.mesh_yidx, self.mesh_xidx = np.unravel_index(self.mesh_idx,
                                                           self._mesh_shape)
 
-        # needed for background_mesh_ma and background_rms_mesh_ma
-        # properties
-        self.bkg1d = self.bkg_estimator(data_sigclip, axis=1)
-        self.bkgrms1d = self.bkgrms_estimator(data_sigclip, axis=1)
+        nmeshes = len(self.mesh_idx)
+        bkg1d = self.bkg1d.reshape(-1, nmeshes)
+        bkgrms1d = self.bkgrms1d.reshape(-1, nmeshes)
 
         # make the 2D mesh arrays
-        if len(self.bkg1d) == (self.nxboxes * self.nyboxes):
-            bkg = self._make_2d_array(self.bkg1d)
-            bkgrms = self._make_2d_array(self.bkgrms1d)
+        if nmeshes == (self.nxboxes * self.nyboxes):
+            bkgs = self._make_2d_array(bkg1d)
+            bkgrmss = self._make_2d_array(bkgrms1d)
         else:
-            bkg = self._interpolate_meshes(self.bkg1d)
-            bkgrms = self._interpolate_meshes(self.bkgrms1d)
-
-        self.background_mesh = bkg
-        self.background_rms_mesh = bkgrms
-
-        # filter the 2D mesh arrays
-        if not np.array_equal(self.filter_size, [1, 1]):
-            self._filter_meshes()
+            # the meshes of all the images (and both the background and
+            # background RMS meshes) are defined at the same mesh
+            # positions, so they are interpolated together
+            meshes = self._interpolate_meshes(
+                np.concatenate([np.ma.getdata(bkg1d),
+                                np.ma.getdata(bkgrms1d)]))
+            bkgs, bkgrmss = meshes[:len(bkg1d)], meshes[len(bkg1d):]
+
+        bkg_meshes = []
+        bkgrms_meshes = []
+        for bkg, bkgrms in zip(bkgs, bkgrmss):
+            # filter the 2D mesh arrays
+            if not np.array_equal(self.filter_size, [1, 1]):
+                bkg, bkgrms = self._filter_meshes(bkg, bkgrms)
+
+            bkg_meshes.append(bkg)
+            bkgrms_meshes.append(bkgrms)
+
+        if self._stack_shape:
+            self.background_mesh = np.array(bkg_meshes).reshape(
+                self._stack_shape + self._mesh_shape)
+            self.background_rms_mesh = np.array(bkgrms_meshes).reshape(
+                self._stack_shape + self._mesh_shape)
+        else:
+            self.background_mesh = bkg_meshes[0]
+            self.background_rms_mesh = bkgrms_meshes[0]
 
         return
 
@@ -712,16 +1113,122 @@ class Background2D(object):
         increasing 1D array of the x and y ranges.
         """
 
-        # the position coordinates used to initialize an interpolation
+        self._calc_mesh_coordinates()
+
+        # the position coordinates used when calling an interpolator
+        nx, ny = self._data_shape
+        self.data_coords = np.array(list(product(range(ny), range(nx))))
+
+    def _calc_mesh_coordinates(self):
+        """
+        Calculate the pixel coordinates of the centers of the meshes
+        used to initialize an interpolator.
+        """
+
         self.y = (self.mesh_yidx * self.box_size[0] +
                   (self.box_size[0] - 1) / 2.)
         self.x = (self.mesh_xidx * self.box_size[1] +
                   (self.box_size[1] - 1) / 2.)
         self.yx = np.column_stack([self.y, self.x])
 
-        # the position coordinates used when calling an interpolator
-        nx, ny = self.data.shape
-        self.data_coords = np.array(list(product(range(ny), range(nx))))
+    def update_mask(self, mask):
+        """
+        Update the input mask and recompute the background and
+        background RMS.
+
+        Only the meshes that contain pixels whose mask value has
+        changed (or that were previously excluded) are recomputed.  The
+        sigma-clipped statistics of all other meshes are reused.  The
+        mesh selection, mesh interpolation, and filtering are then
+        redone on the full low-resolution mesh.
+
+        This is useful for iterative workflows where a source mask is
+        progressively grown between background estimates.
+
+        Parameters
+        ----------
+        mask : array_like (bool)
+            The new boolean mask, with the same shape as ``data``, where
+            a `True` value indicates the corresponding element of
+            ``data`` is masked.  Masked data are excluded from
+            calculations.
+        """
+
+        if self.data is None:
+            raise ValueError('update_mask requires the data, but this '
+                             'object was created from meshes.')
+
+        mask = np.asanyarray(mask)
+        if mask.shape != self._data_shape:
+            raise ValueError('mask and data must have the same shape')
+
+        if self.mask is None:
+            changed = mask.astype(bool)
+        else:
+            changed = (mask.astype(bool) != self.mask.astype(bool))
+
+        # flag the meshes that contain changed pixels (pixels outside of
+        # the cropped data are never used)
+        yidx, xidx = np.nonzero(changed)
+        ymesh = yidx // self.box_size[0]
+        xmesh = xidx // self.box_size[1]
+        good = (ymesh < self.nyboxes) & (xmesh < self.nxboxes)
+        nmeshes = self.nyboxes * self.nxboxes
+        dirty = np.zeros(nmeshes, dtype=bool)
+        dirty[ymesh[good] * self.nxboxes + xmesh[good]] = True
+
+        # index of each mesh in the previous 1D mesh arrays (-1 if the
+        # mesh was previously excluded)
+        prev_idx = np.zeros(nmeshes, dtype=np.int64) - 1
+        prev_idx[self.mesh_idx] = np.arange(len(self.mesh_idx))
+        npixels = self.box_npixels
+        prev_data_sigclip = self._data_sigclip.reshape(
+            self._stack_shape + (-1, npixels))
+        prev_bkg1d = self.bkg1d
+        prev_bkgrms1d = self.bkgrms1d
+
+        self.mask = mask
+        self._prepare_data()
+
+        prev_idx = prev_idx[self.mesh_idx]
+        recompute = dirty[self.mesh_idx] | (prev_idx < 0)
+        reuse = ~recompute
+
+        # for a stack of images, the same meshes are recomputed in each
+        # image
+        shape1d = self._stack_shape + (len(self.mesh_idx),)
+        mesh_data = self.mesh_data.reshape(shape1d + (npixels,))
+        data_sigclip = np.ma.masked_array(
+            np.zeros(mesh_data.shape, dtype=mesh_data.dtype),
+            mask=np.zeros(mesh_data.shape, dtype=bool))
+        self.bkg1d = np.ma.masked_array(np.zeros(shape1d),
+                                        mask=np.zeros(shape1d, dtype=bool))
+        self.bkgrms1d = np.ma.masked_array(np.zeros(shape1d),
+                                           mask=np.zeros(shape1d, dtype=bool))
+
+        data_sigclip[..., reuse, :] = (
+            prev_data_sigclip[..., prev_idx[reuse], :])
+        self.bkg1d[..., reuse] = prev_bkg1d[..., prev_idx[reuse]]
+        self.bkgrms1d[..., reuse] = prev_bkgrms1d[..., prev_idx[reuse]]
+
+        if np.any(recompute):
+            shape = self._stack_shape + (-1,)
+            sigclip, bkg1d, bkgrms1d = self._calc_mesh_stats(
+                mesh_data[..., recompute, :].reshape(-1, npixels))
+            data_sigclip[..., recompute, :] = sigclip.reshape(
+                shape + (npixels,))
+            self.bkg1d[..., recompute] = bkg1d.reshape(shape)
+            self.bkgrms1d[..., recompute] = bkgrms1d.reshape(shape)
+
+        self._data_sigclip = data_sigclip.reshape(-1, npixels)
+        self._make_meshes()
+        self._calc_mesh_coordinates()
+
+        # be sure to delete any lazy properties to reset their values.
+        del (self.mesh_nmasked, self.background_mesh_ma,
+             self.background_rms_mesh_ma, self.background_median,
+             self.background_rms_median, self.background,
+             self.background_rms)
 
     @lazyproperty
     def mesh_nmasked(self):
@@ -729,10 +1236,19 @@ class Background2D(object):
         A 2D (masked) array of the number of masked pixels in each mesh.
         Only meshes included in the background estimation are included.
         Excluded meshes will be masked in the image.
+
+        ``mesh_nmasked`` requires the data, so it is not available for
+        objects created with `from_meshes` or `read`.
         """
 
-        return self._make_2d_array(np.ma.count_masked(self._data_sigclip,
-                                                      axis=1))
+        if self.data is None:
+            raise ValueError('mesh_nmasked requires the data, but this '
+                             'object was created from meshes.')
+
+        nmasked = np.ma.count_masked(self._data_sigclip, axis=1)
+
+        return self._make_2d_array(nmasked.reshape(self._stack_shape +
+                                                   (-1,)))
 
     @lazyproperty
     def background_mesh_ma(self):
@@ -740,7 +1256,7 @@ class Background2D(object):
         The background 2D (masked) array mesh prior to any interpolation.
         """
 
-        if len(self.bkg1d) == (self.nxboxes * self.nyboxes):
+        if self.bkg1d.shape[-1] == (self.nxboxes * self.nyboxes):
             return self.background_mesh
         else:
             return self._make_2d_array(self.bkg1d)
@@ -751,7 +1267,7 @@ class Background2D(object):
         The background RMS 2D (masked) array mesh prior to any interpolation.
         """
 
-        if len(self.bkg1d) == (self.nxboxes * self.nyboxes):
+        if self.bkg1d.shape[-1] == (self.nxboxes * self.nyboxes):
             return self.background_rms_mesh
         else:
             return self._make_2d_array(self.bkgrms1d)
@@ -762,10 +1278,12 @@ class Background2D(object):
         The median value of the 2D low-resolution background map.
 
         This is equivalent to the value SExtractor prints to stdout
-        (i.e., "(M+D) Background: <value>").
+        (i.e., "(M+D) Background: <value>").  For a stack of images,
+        this is a 1D array of the median value of each image.
         """
 
-        return np.median(self.background_mesh)
+        return np.median(self.background_mesh.reshape(self._stack_shape +
+                                                      (-1,)), axis=-1)
 
     @lazyproperty
     def background_rms_median(self):
@@ -773,22 +1291,386 @@ class Background2D(object):
         The median value of the low-resolution background RMS map.
 
         This is equivalent to the value SExtractor prints to stdout
-        (i.e., "(M+D) RMS: <value>").
+        (i.e., "(M+D) RMS: <value>").  For a stack of images, this is a
+        1D array of the median value of each image.
+        """
+
+        return np.median(self.background_rms_mesh.reshape(
+            self._stack_shape + (-1,)), axis=-1)
+
+    def _resize_mesh(self, mesh, output=None):
         """
+        Resize a low-resolution mesh (or each mesh of a stack of
+        images) to the full-sized image using the ``interpolator``.
+
+        If ``output`` is input, the result is written into ``output``.
+        `BkgSplineInterpolator` writes directly into ``output``, without
+        a full-sized temporary array.
+        """
+
+        meshes = mesh.reshape((-1,) + self._mesh_shape)
+
+        if isinstance(self.interpolator, BkgIDWInterpolator):
+            # interpolate all the meshes of a stack with the same k-d
+            # tree and interpolation weights
+            return self.interpolator(mesh, self, output=output)
+
+        if output is None:
+            if not self._stack_shape:
+                return self.interpolator(mesh, self)
+
+            result = np.array([self.interpolator(mesh2d, self)
+                               for mesh2d in meshes])
+
+            return result.reshape(self._stack_shape + self._data_shape)
 
-        return np.median(self.background_rms_mesh)
+        outputs = output.reshape((-1,) + self._data_shape)
+        for mesh2d, output2d in zip(meshes, outputs):
+            if isinstance(self.interpolator, BkgSplineInterpolator):
+                self.interpolator(mesh2d, self, output=output2d)
+            else:
+                output2d[...] = self.interpolator(mesh2d, self)
+
+        return output
 
     @lazyproperty
     def background(self):
-        """A 2D `~numpy.ndarray` containing the background image."""
+        """
+        A 2D `~numpy.ndarray` containing the background image (3D for
+        a stack of images).
+        """
 
-        return self.interpolator(self.background_mesh, self)
+        return self._resize_mesh(self.background_mesh)
 
     @lazyproperty
     def background_rms(self):
-        """A 2D `~numpy.ndarray` containing the background RMS image."""
+        """
+        A 2D `~numpy.ndarray` containing the background RMS image (3D
+        for a stack of images).
+        """
+
+        return self._resize_mesh(self.background_rms_mesh)
+
+    @classmethod
+    def from_meshes(cls, shape, box_size, background_mesh,
+                    background_rms_mesh, mesh_idx=None, edge_method='pad',
+                    interpolator=BkgZoomInterpolator()):
+        """
+        Create a `Background2D` object from previously computed
+        low-resolution background and background RMS meshes.
+
+        No pixel statistics are computed.  The full-sized
+        ``background`` and ``background_rms`` images are generated by
+        interpolating the input meshes.
+
+        Parameters
+        ----------
+        shape : 2-tuple of int
+            The ``(ny, nx)`` shape of the data from which the meshes
+            were computed.
+
+        box_size : int or array_like (int)
+            The box size along each axis used to compute the meshes.
+            If ``box_size`` is a scalar then a square box of size
+            ``box_size`` is assumed.  If ``box_size`` has two elements,
+            they should be in ``(ny, nx)`` order.
+
+        background_mesh : 2D array_like
+            The low-resolution background mesh (e.g. the
+            ``background_mesh`` attribute of a `Background2D` object).
+            For a stack of images, ``background_mesh`` is a 3D array of
+            2D meshes.
+
+        background_rms_mesh : 2D array_like
+            The low-resolution background RMS mesh (e.g. the
+            ``background_rms_mesh`` attribute of a `Background2D`
+            object).  It must have the same shape as
+            ``background_mesh``.
+
+        mesh_idx : 1D array_like (int), optional
+            The 1D indices of the meshes that were used in the
+            background estimation.  If `None`, then all meshes are
+            assumed to have been used.
+
+        edge_method : {'pad', 'crop'}, optional
+            The method that was used to handle the case where the
+            image size is not an integer multiple of the ``box_size``.
+
+        interpolator : callable, optional
+            A callable object (a function or object) used to
+            interpolate the low-resolution meshes to the full-size
+            background or background RMS maps.  The default is an
+            instance of `BkgZoomInterpolator`.
+
+        Returns
+        -------
+        result : `Background2D`
+            A `Background2D` object.  Its ``data`` and ``mask``
+            attributes are `None`.
+        """
+
+        shape = tuple(int(size) for size in shape)
+        if len(shape) != 2:
+            raise ValueError('shape must have two elements')
 
-        return self.interpolator(self.background_rms_mesh, self)
+        box_size = np.atleast_1d(box_size)
+        if len(box_size) == 1:
+            box_size = np.repeat(box_size, 2)
+        box_size = (min(box_size[0], shape[0]), min(box_size[1], shape[1]))
+
+        if edge_method == 'pad':
+            mesh_shape = (-(-shape[0] // box_size[0]),
+                          -(-shape[1] // box_size[1]))
+        elif edge_method == 'crop':
+            mesh_shape = (shape[0] // box_size[0], shape[1] // box_size[1])
+        else:
+            raise ValueError('edge_method must be "pad" or "crop"')
+
+        background_mesh = np.ma.getdata(background_mesh)
+        background_rms_mesh = np.ma.getdata(background_rms_mesh)
+        if (background_mesh.ndim not in (2, 3) or
+                background_mesh.shape[-2:] != mesh_shape or
+                background_rms_mesh.shape != background_mesh.shape):
+            raise ValueError('background_mesh and background_rms_mesh must '
+                             'have a shape of {0} for the input shape, '
+                             'box_size, and edge_method'.format(mesh_shape))
+
+        if mesh_idx is None:
+            mesh_idx = np.arange(mesh_shape[0] * mesh_shape[1])
+        else:
+            mesh_idx = np.asanyarray(mesh_idx).astype(np.int64)
+
+        obj = cls.__new__(cls)
+        obj.data = None
+        obj._data_shape = shape
+        obj._stack_shape = background_mesh.shape[:-2]
+        obj.mask = None
+        obj.box_size = box_size
+        obj.box_npixels = box_size[0] * box_size[1]
+        obj.edge_method = edge_method
+        obj.interpolator = interpolator
+
+        obj.nyboxes, obj.nxboxes = mesh_shape
+        obj._mesh_shape = mesh_shape
+        obj.mesh_idx = mesh_idx
+        obj.mesh_yidx, obj.mesh_xidx = np.unravel_index(mesh_idx, mesh_shape)
+        obj.bkg1d = background_mesh[..., obj.mesh_yidx, obj.mesh_xidx]
+        obj.bkgrms1d = background_rms_mesh[..., obj.mesh_yidx,
+                                           obj.mesh_xidx]
+        obj.background_mesh = background_mesh
+        obj.background_rms_mesh = background_rms_mesh
+        obj._calc_coordinates()
+
+        return obj
+
+    @classmethod
+    def read(cls, filename, interpolator=None):
+        """
+        Read a `Background2D` object from a file written by
+        `Background2D.write`.
+
+        The full-sized background and background RMS images are
+        rebuilt from the stored meshes without reprocessing the data
+        (see `Background2D.from_meshes`).
+
+        Parameters
+        ----------
+        filename : str
+            The name of the FITS or NumPy ``.npz`` file.  Files with a
+            ``.npz`` extension are read as NumPy files.
+
+        interpolator : callable, optional
+            The interpolator used to generate the full-sized images.
+            If `None`, then the interpolator stored in the file is
+            used.  This is required if the file was written using an
+            interpolator other than `BkgZoomInterpolator` or
+            `BkgIDWInterpolator`.
+
+        Returns
+        -------
+        result : `Background2D`
+            A `Background2D` object.
+        """
+
+        if os.path.splitext(str(filename))[1] == '.npz':
+            with np.load(filename) as npz:
+                shape = tuple(npz['shape'])
+                box_size = tuple(npz['box_size'])
+                edge_method = str(npz['edge_method'])
+                interp_name = str(npz['interpolator'])
+                interp_params = str(npz['interpolator_params'])
+                background_mesh = npz['background_mesh']
+                background_rms_mesh = npz['background_rms_mesh']
+                mesh_idx = npz['mesh_idx']
+                bkg1d = npz['bkg1d']
+                bkgrms1d = npz['bkgrms1d']
+        else:
+            from astropy.io import fits
+
+            with fits.open(filename) as hdulist:
+                header = hdulist[0].header
+                shape = (header['DATANY'], header['DATANX'])
+                box_size = (header['BOXNY'], header['BOXNX'])
+                edge_method = header['EDGEMETH']
+                interp_name = header['INTERP']
+                interp_params = header['INTERPAR']
+                background_mesh = np.array(hdulist['BKGMESH'].data)
+                background_rms_mesh = np.array(hdulist['RMSMESH'].data)
+                meshes = hdulist['MESHES'].data
+                mesh_idx = np.array(meshes['MESH_IDX'])
+                bkg1d = np.array(meshes['BKG']).T
+                bkgrms1d = np.array(meshes['BKGRMS']).T
+
+        if interpolator is None:
+            interpolator = _make_interpolator(interp_name, interp_params)
+
+        obj = cls.from_meshes(shape, box_size, background_mesh,
+                              background_rms_mesh, mesh_idx=mesh_idx,
+                              edge_method=edge_method,
+                              interpolator=interpolator)
+
+        # the mesh values prior to any mesh filtering
+        obj.bkg1d = bkg1d
+        obj.bkgrms1d = bkgrms1d
+
+        return obj
+
+    def write(self, filename, overwrite=False):
+        """
+        Write the low-resolution background and background RMS meshes
+        to a FITS or NumPy ``.npz`` file.
+
+        The mesh arrays, mesh indices, box size, and interpolator
+        parameters are stored, so that the file is small compared to
+        the data.  Use `Background2D.read` to rebuild the full-sized
+        background and background RMS images.
+
+        Parameters
+        ----------
+        filename : str
+            The name of the output file.  If ``filename`` has a
+            ``.npz`` extension, then a compressed NumPy file is
+            written, otherwise a FITS file is written.
+
+        overwrite : bool, optional
+            If `True`, overwrite ``filename`` if it exists.
+        """
+
+        if not overwrite and os.path.exists(filename):
+            raise IOError('File "{0}" already exists.'.format(filename))
+
+        interp_name, interp_params = _interpolator_config(self.interpolator)
+        background_mesh = np.ma.getdata(self.background_mesh)
+        background_rms_mesh = np.ma.getdata(self.background_rms_mesh)
+        bkg1d = np.ma.getdata(self.bkg1d)
+        bkgrms1d = np.ma.getdata(self.bkgrms1d)
+
+        if os.path.splitext(str(filename))[1] == '.npz':
+            np.savez_compressed(
+                filename, shape=np.array(self._data_shape),
+                box_size=np.array(self.box_size),
+                edge_method=np.array(self.edge_method),
+                interpolator=np.array(interp_name),
+                interpolator_params=np.array(interp_params),
+                background_mesh=background_mesh,
+                background_rms_mesh=background_rms_mesh,
+                mesh_idx=self.mesh_idx, bkg1d=bkg1d, bkgrms1d=bkgrms1d)
+        else:
+            from astropy.io import fits
+
+            header = fits.Header()
+            header['DATANY'] = (self._data_shape[0], 'data size along y')
+            header['DATANX'] = (self._data_shape[1], 'data size along x')
+            header['BOXNY'] = (int(self.box_size[0]), 'box size along y')
+            header['BOXNX'] = (int(self.box_size[1]), 'box size along x')
+            header['EDGEMETH'] = (self.edge_method, 'edge method')
+            header['INTERP'] = (interp_name, 'interpolator')
+            header['INTERPAR'] = interp_params
+
+            # for a stack of images, each row contains the values of a
+            # mesh in all images
+            nimages = int(np.prod(self._stack_shape))
+            fmt = '{0}D'.format(nimages)
+            columns = [fits.Column(name='MESH_IDX', format='K',
+                                   array=self.mesh_idx),
+                       fits.Column(name='BKG', format=fmt,
+                                   array=bkg1d.reshape(nimages, -1).T),
+                       fits.Column(name='BKGRMS', format=fmt,
+                                   array=bkgrms1d.reshape(nimages, -1).T)]
+            hdulist = fits.HDUList([
+                fits.PrimaryHDU(header=header),
+                fits.ImageHDU(background_mesh, name='BKGMESH'),
+                fits.ImageHDU(background_rms_mesh, name='RMSMESH'),
+                fits.BinTableHDU.from_columns(columns, name='MESHES')])
+            hdulist.writeto(filename, overwrite=True)
+
+    def write_subtracted(self, filename, rms_filename=None, data=None,
+                         overwrite=False):
+        """
+        Write the background-subtracted data (and optionally the
+        background RMS image) to a FITS or NumPy ``.npy`` file.
+
+        The output files are memory mapped.  The background is
+        interpolated into the output file, which is then subtracted
+        from the data in strips of rows.  Therefore, the full-sized
+        background, background RMS, and background-subtracted images
+        are never held in memory at the same time.  This is most
+        efficient with the `BkgSplineInterpolator`, which writes
+        directly into the output file.  Other interpolators create the
+        full-sized background (or background RMS) of an image in memory
+        before it is written.
+
+        Parameters
+        ----------
+        filename : str
+            The name of the output background-subtracted data file.  If
+            ``filename`` has a ``.npy`` extension, then a NumPy file is
+            written, otherwise a FITS file is written.
+
+        rms_filename : str, optional
+            The name of the output background RMS file.  If `None`, then
+            the background RMS image is not written.
+
+        data : array_like, optional
+            The data from which to subtract the background (e.g. for
+            an object created by `Background2D.read` or
+            `Background2D.from_meshes`).  It must have the same shape as
+            the data used to create the background.  If `None`, then the
+            input ``data`` are used.
+
+        overwrite : bool, optional
+            If `True`, overwrite the output files if they exist.
+        """
+
+        if data is None:
+            data = self.data
+            if data is None:
+                raise ValueError('data must be input for an object '
+                                 'created from meshes.')
+
+        data = np.asanyarray(data)
+        shape = self._stack_shape + self._data_shape
+        if data.shape != shape:
+            raise ValueError('data must have a shape of {0}'.format(shape))
+
+        output = _create_memmap(filename, shape, overwrite=overwrite)
+        self._resize_mesh(self.background_mesh, output=output)
+
+        outputs = output.reshape((-1,) + self._data_shape)
+        nrows = max(1, 2**20 // self._data_shape[1])
+        for data2d, output2d in zip(data.reshape(outputs.shape), outputs):
+            for i in range(0, self._data_shape[0], nrows):
+                slc = slice(i, i + nrows)
+                output2d[slc] = data2d[slc] - output2d[slc]
+        output.flush()
+        del output
+
+        if rms_filename is not None:
+            output = _create_memmap(rms_filename, shape,
+                                    overwrite=overwrite)
+            self._resize_mesh(self.background_rms_mesh, output=output)
+            output.flush()
+            del output
 
     def plot_meshes(self, ax=None, marker='+', color='blue', outlines=False,
                     **kwargs):
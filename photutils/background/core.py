@@ -58,6 +58,288 @@ def _masked_median(data, axis=None):
     return _median
 
 
+def _histogram_rows(data, axis=None):
+    """
+    Reshape a (masked) integer array into rows (the 1D slices along
+    ``axis``) and calculate the range of the unmasked values of each
+    row.
+
+    Parameters
+    ----------
+    data : `~numpy.ma.MaskedArray`
+        The input integer data.
+    axis : int or `None`, optional
+        The array axis along which the rows are taken.  If `None`, then
+        the entire array is a single row.
+
+    Returns
+    -------
+    values : 2D `~numpy.ma.MaskedArray`
+        The ``(nrows, nvalues)`` data rows.
+    good : 2D bool `~numpy.ndarray`
+        `True` for the unmasked values of ``values``.
+    vmin : 1D `~numpy.ndarray`
+        The minimum unmasked value of each row.
+    nbins : 1D `~numpy.ndarray`
+        The number of histogram bins (i.e. the range of unmasked values)
+        of each row.  Rows without unmasked values get a single bin.
+    """
+
+    if axis is None:
+        values = data.reshape(1, -1)
+    else:
+        values = np.ma.swapaxes(data, axis, -1)
+        values = values.reshape(-1, values.shape[-1])
+
+    good = ~np.ma.getmaskarray(values)
+    data_values = np.ma.getdata(values)
+    if np.all(good):
+        vmin = data_values.min(axis=1).astype(np.int64)
+        vmax = data_values.max(axis=1).astype(np.int64)
+    else:
+        ngood = good.sum(axis=1)
+        iinfo = np.iinfo(data_values.dtype)
+        vmin = np.where(good, data_values, iinfo.max).min(axis=1)
+        vmax = np.where(good, data_values, iinfo.min).max(axis=1)
+        vmin = np.where(ngood == 0, 0, vmin).astype(np.int64)
+        vmax = np.where(ngood == 0, 0, vmax).astype(np.int64)
+
+    return values, good, vmin, vmax - vmin + 1
+
+
+def _row_histogram(data_values, good, vmin, nbins):
+    """
+    Calculate a single histogram of all the rows of an integer array,
+    with the bins of each row offset by the total number of bins of the
+    previous rows.
+
+    Returns the histogram and the offset of the first bin of each row.
+    """
+
+    offsets = np.cumsum(nbins) - nbins
+    bins = data_values.astype(np.int64)
+    bins += (offsets - vmin)[:, np.newaxis]
+    if np.all(good):
+        bins = bins.ravel()
+    else:
+        bins = bins[good]
+
+    return np.bincount(bins, minlength=nbins.sum()), offsets
+
+
+def _histogram_median(data, axis=None):
+    """
+    Calculate the median of a (masked) integer array using a histogram
+    (i.e. a counting sort) of the data values.
+
+    The result is identical to `_masked_median`, but the computation
+    scales linearly with the number of data values instead of
+    requiring a sort.  If the data are not integers, then
+    `_masked_median` is used instead.  The range of data values is
+    checked for each row (i.e. each 1D slice along ``axis``): rows
+    whose range is larger than the number of values along ``axis`` use
+    `_masked_median`, so the number of histogram bins is never larger
+    than the data size.
+
+    Parameters
+    ----------
+    data : array-like
+        The input data.
+    axis : int or `None`, optional
+        The array axis along which the median is calculated.  If
+        `None`, then the entire array is used.
+
+    Returns
+    -------
+    result : float or `~numpy.ma.MaskedArray`
+        The resulting median.  If ``axis`` is `None`, then a float is
+        returned, otherwise a `~numpy.ma.MaskedArray` is returned.
+    """
+
+    data = np.ma.asanyarray(data)
+    if data.dtype.kind not in 'iu' or data.size == 0:
+        return _masked_median(data, axis=axis)
+
+    values, good, vmin, nbins = _histogram_rows(data, axis=axis)
+    nrows, nvalues = values.shape
+    ngood = good.sum(axis=1)
+    if ngood.sum() == 0:
+        return _masked_median(data, axis=axis)
+
+    # only rows whose range of values is not larger than the number of
+    # values per row use the histogram, which bounds the total number
+    # of bins to the data size; the median of the other rows is
+    # calculated by sorting
+    data_values = np.ma.getdata(values)
+    hist_rows = (nbins <= nvalues)
+    median = np.zeros(nrows)
+    if not np.all(hist_rows):
+        if not np.any(hist_rows):
+            return _masked_median(data, axis=axis)
+        median[~hist_rows] = np.ma.getdata(_masked_median(
+            values[~hist_rows], axis=1))
+        data_values = data_values[hist_rows]
+        good = good[hist_rows]
+        vmin = vmin[hist_rows]
+        nbins = nbins[hist_rows]
+
+    hist, offsets = _row_histogram(data_values, good, vmin, nbins)
+    cumhist = np.cumsum(hist)
+
+    # the value of the (zero-based) k-th sorted element of a row is the
+    # first bin of the row where the cumulative histogram exceeds k
+    # (plus the number of values in the previous rows)
+    nrow = good.sum(axis=1)
+    nbefore = np.cumsum(nrow) - nrow
+    klow = nbefore + (nrow - 1) // 2
+    khigh = nbefore + nrow // 2
+    vlow = np.searchsorted(cumhist, klow, side='right') - offsets
+    vhigh = np.searchsorted(cumhist, khigh, side='right') - offsets
+    median[hist_rows] = (vlow + vhigh) / 2. + vmin
+
+    if axis is None:
+        return median[0]
+    else:
+        out_shape = np.ma.swapaxes(data, axis, -1).shape[:-1]
+        return np.ma.masked_array(median, mask=(ngood == 0)).reshape(
+            out_shape)
+
+
+def _histogram_sigma_clip(data, sigma_clip, axis=None):
+    """
+    Sigma clip a (masked) integer array using a histogram of the data
+    values.
+
+    Values are rejected only outside of an interval around the median,
+    so the values kept in each row (i.e. each 1D slice along ``axis``)
+    are always the unmasked values within a range of values.  The
+    number of kept values, their median, and their standard deviation
+    are calculated from the cumulative sums of a histogram of the data
+    values (weighted by one, the bin values, and their squares), so
+    the clipping iterations do not sort (or even read) the data.
+
+    The result is the same as ``sigma_clip(data, axis=axis)``, except
+    for values exactly at the clipping limits, whose rejection depends
+    on the rounding of the standard deviation.  Non-integer data, and
+    rows whose range of values is larger than the number of values
+    along ``axis``, are clipped with ``sigma_clip``.
+
+    Parameters
+    ----------
+    data : array-like
+        The input data.
+    sigma_clip : `SigmaClip`
+        The `SigmaClip` object that defines the sigma clipping
+        parameters.
+    axis : int or `None`, optional
+        The array axis along which to clip.  If `None`, then the entire
+        array is clipped.
+
+    Returns
+    -------
+    filtered_data : `~numpy.ma.MaskedArray`
+        A masked array with the same shape as ``data``, where the
+        rejected values have been masked.
+    """
+
+    data = np.ma.asanyarray(data)
+    if data.dtype.kind not in 'iu' or data.size == 0:
+        return sigma_clip(data, axis=axis)
+
+    values, good, vmin, nbins = _histogram_rows(data, axis=axis)
+    nvalues = values.shape[1]
+    hist_rows = (nbins <= nvalues)
+
+    if not np.any(hist_rows):
+        return sigma_clip(data, axis=axis)
+
+    # the cumulative sums of the squared bin values are exact int64
+    # values only if they cannot overflow
+    nbins_max = int(np.max(nbins[hist_rows]))
+    if int(good[hist_rows].sum()) * nbins_max**2 >= 2**62:
+        return sigma_clip(data, axis=axis)
+
+    sigma_lower = sigma_clip.sigma_lower
+    if sigma_lower is None:
+        sigma_lower = sigma_clip.sigma
+    sigma_upper = sigma_clip.sigma_upper
+    if sigma_upper is None:
+        sigma_upper = sigma_clip.sigma
+
+    data_values = np.ma.getdata(values)
+    hvmin = vmin[hist_rows]
+    hnbins = nbins[hist_rows]
+    hist, offsets = _row_histogram(data_values[hist_rows], good[hist_rows],
+                                   hvmin, hnbins)
+
+    # the bin values relative to the minimum value of each row, and the
+    # cumulative sums (with a leading zero) used for the sums over any
+    # range of bins
+    xbins = np.arange(len(hist)) - np.repeat(offsets, hnbins)
+    cumhist = np.concatenate([[0], np.cumsum(hist)])
+    cumsum1 = np.concatenate([[0], np.cumsum(hist * xbins)])
+    cumsum2 = np.concatenate([[0], np.cumsum(hist * xbins**2)])
+
+    # the first and last kept bins of each row
+    lo = offsets.copy()
+    hi = offsets + hnbins - 1
+    nkept = cumhist[hi + 1] - cumhist[lo]
+
+    iters = sigma_clip.iters
+    i = 0
+    while iters is None or i < iters:
+        i += 1
+        active = nkept > 0
+        if not np.any(active):
+            break
+        klow = cumhist[lo] + (nkept - 1) // 2
+        khigh = cumhist[lo] + nkept // 2
+        vlow = (np.searchsorted(cumhist[1:], klow, side='right') - offsets +
+                hvmin)
+        vhigh = (np.searchsorted(cumhist[1:], khigh, side='right') -
+                 offsets + hvmin)
+        median = (vlow + vhigh) / 2.
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sum1 = cumsum1[hi + 1] - cumsum1[lo]
+            sum2 = cumsum2[hi + 1] - cumsum2[lo]
+            mean = sum1 / nkept
+            std = np.sqrt(np.maximum((sum2 - sum1 * mean) / nkept, 0.))
+
+        # integer values v are kept if min_value <= v <= max_value
+        min_value = median - std * sigma_lower
+        max_value = median + std * sigma_upper
+        new_lo = np.clip(np.ceil(min_value[active]).astype(np.int64) -
+                         hvmin[active], 0, hnbins[active])
+        new_hi = np.clip(np.floor(max_value[active]).astype(np.int64) -
+                         hvmin[active], -1, hnbins[active] - 1)
+        lo[active] = np.maximum(lo[active], offsets[active] + new_lo)
+        hi[active] = np.minimum(hi[active], offsets[active] + new_hi)
+
+        new_nkept = np.where(hi >= lo, cumhist[hi + 1] - cumhist[lo], 0)
+        if np.all(new_nkept == nkept):
+            break
+        nkept = new_nkept
+
+    kept = np.zeros(values.shape, dtype=bool)
+    kept[hist_rows] = (good[hist_rows] &
+                       (data_values[hist_rows] >=
+                        (lo - offsets + hvmin)[:, np.newaxis]) &
+                       (data_values[hist_rows] <=
+                        (hi - offsets + hvmin)[:, np.newaxis]))
+    if not np.all(hist_rows):
+        kept[~hist_rows] = ~np.ma.getmaskarray(
+            sigma_clip(values[~hist_rows], axis=1))
+
+    if axis is None:
+        mask = ~kept.reshape(data.shape)
+    else:
+        mask = np.swapaxes(~kept.reshape(
+            np.swapaxes(data, axis, -1).shape), axis, -1)
+
+    return np.ma.masked_array(np.ma.getdata(data), mask=mask)
+
+
 class _ABCMetaAndInheritDocstrings(InheritDocstrings, abc.ABCMeta):
     pass
 
@@ -157,14 +439,54 @@ class BackgroundBase(object):
         A `SigmaClip` object that defines the sigma clipping parameters.
         If `None` then no sigma clipping will be performed.  The default
         is to perform sigma clipping with ``sigma=3.`` and ``iters=5``.
+    histogram : bool, optional
+        If `True`, then medians of integer data are calculated from a
+        histogram of the data values (a counting sort), which is much
+        faster than sorting for integer data with a limited range of
+        values (e.g. raw detector data).  The result is identical to
+        the sorting method.  The sigma clipping of integer data (with a
+        `SigmaClip` object) also uses the histogram to calculate the
+        median and standard deviation of each clipping iteration.  The
+        clipped values are the same, except for values exactly at the
+        clipping limits, which depend on the rounding of the standard
+        deviation.  Non-integer data always use the sorting method.  The
+        default is `True`.
     """
 
-    def __init__(self, sigma_clip=SigmaClip(sigma=3., iters=5)):
+    def __init__(self, sigma_clip=SigmaClip(sigma=3., iters=5),
+                 histogram=True):
         self.sigma_clip = sigma_clip
+        self.histogram = histogram
 
     def __call__(self, data, axis=None):
         return self.calc_background(data, axis=axis)
 
+    def _median(self, data, axis=None):
+        """
+        Calculate the median of a (masked) array, using the histogram
+        method for integer data if ``histogram`` is `True`.
+        """
+
+        if self.histogram:
+            return _histogram_median(data, axis=axis)
+        else:
+            return _masked_median(data, axis=axis)
+
+    def _sigma_clip(self, data, axis=None):
+        """
+        Sigma clip a (masked) array with ``sigma_clip``, using the
+        histogram method for integer data if ``histogram`` is `True`.
+        """
+
+        if self.sigma_clip is None:
+            return data
+
+        # a SigmaClip subclass may redefine the clipping
+        if self.histogram and type(self.sigma_clip) is SigmaClip:
+            return _histogram_sigma_clip(data, self.sigma_clip, axis=axis)
+        else:
+            return self.sigma_clip(data, axis=axis)
+
     @abc.abstractmethod
     def calc_background(self, data, axis=None):
         """
@@ -239,6 +561,11 @@ class MeanBackground(BackgroundBase):
         A `SigmaClip` object that defines the sigma clipping parameters.
         If `None` then no sigma clipping will be performed.  The default
         is to perform sigma clipping with ``sigma=3.`` and ``iters=5``.
+    histogram : bool, optional
+        If `True`, then the sigma clipping of integer data is calculated
+        from a histogram of the data values (a counting sort) instead of
+        sorting the data.  The result differs only for values exactly at
+        the clipping limits.  The default is `True`.
 
     Examples
     --------
@@ -263,8 +590,7 @@ class MeanBackground(BackgroundBase):
     """
 
     def calc_background(self, data, axis=None):
-        if self.sigma_clip is not None:
-            data = self.sigma_clip(data, axis=axis)
+        data = self._sigma_clip(data, axis=axis)
 
         return np.ma.mean(data, axis=axis)
 
@@ -280,6 +606,12 @@ class MedianBackground(BackgroundBase):
         A `SigmaClip` object that defines the sigma clipping parameters.
         If `None` then no sigma clipping will be performed.  The default
         is to perform sigma clipping with ``sigma=3.`` and ``iters=5``.
+    histogram : bool, optional
+        If `True`, then the median and the sigma clipping of integer
+        data are calculated from a histogram of the data values (a
+        counting sort) instead of sorting the data.  The median is
+        identical and the sigma clipping differs only for values exactly
+        at the clipping limits.  The default is `True`.
 
     Examples
     --------
@@ -304,10 +636,9 @@ class MedianBackground(BackgroundBase):
     """
 
     def calc_background(self, data, axis=None):
-        if self.sigma_clip is not None:
-            data = self.sigma_clip(data, axis=axis)
+        data = self._sigma_clip(data, axis=axis)
 
-        return _masked_median(data, axis=axis)
+        return self._median(data, axis=axis)
 
 
 class ModeEstimatorBackground(BackgroundBase):
@@ -325,6 +656,12 @@ class ModeEstimatorBackground(BackgroundBase):
         A `SigmaClip` object that defines the sigma clipping parameters.
         If `None` then no sigma clipping will be performed.  The default
         is to perform sigma clipping with ``sigma=3.`` and ``iters=5``.
+    histogram : bool, optional
+        If `True`, then the median and the sigma clipping of integer
+        data are calculated from a histogram of the data values (a
+        counting sort) instead of sorting the data.  The median is
+        identical and the sigma clipping differs only for values exactly
+        at the clipping limits.  The default is `True`.
 
     Examples
     --------
@@ -355,9 +692,8 @@ class ModeEstimatorBackground(BackgroundBase):
         self.mean_factor = mean_factor
 
     def calc_background(self, data, axis=None):
-        if self.sigma_clip is not None:
-            data = self.sigma_clip(data, axis=axis)
-        return ((self.median_factor * _masked_median(data, axis=axis)) -
+        data = self._sigma_clip(data, axis=axis)
+        return ((self.median_factor * self._median(data, axis=axis)) -
                 (self.mean_factor * np.ma.mean(data, axis=axis)))
 
 
@@ -375,6 +711,12 @@ class MMMBackground(ModeEstimatorBackground):
         A `SigmaClip` object that defines the sigma clipping parameters.
         If `None` then no sigma clipping will be performed.  The default
         is to perform sigma clipping with ``sigma=3.`` and ``iters=5``.
+    histogram : bool, optional
+        If `True`, then the median and the sigma clipping of integer
+        data are calculated from a histogram of the data values (a
+        counting sort) instead of sorting the data.  The median is
+        identical and the sigma clipping differs only for values exactly
+        at the clipping limits.  The default is `True`.
 
     Examples
     --------
@@ -425,6 +767,12 @@ class SExtractorBackground(BackgroundBase):
         A `SigmaClip` object that defines the sigma clipping parameters.
         If `None` then no sigma clipping will be performed.  The default
         is to perform sigma clipping with ``sigma=3.`` and ``iters=5``.
+    histogram : bool, optional
+        If `True`, then the median and the sigma clipping of integer
+        data are calculated from a histogram of the data values (a
+        counting sort) instead of sorting the data.  The median is
+        identical and the sigma clipping differs only for values exactly
+        at the clipping limits.  The default is `True`.
 
     Examples
     --------
@@ -449,10 +797,9 @@ class SExtractorBackground(BackgroundBase):
     """
 
     def calc_background(self, data, axis=None):
-        if self.sigma_clip is not None:
-            data = self.sigma_clip(data, axis=axis)
+        data = self._sigma_clip(data, axis=axis)
 
-        _median = np.atleast_1d(_masked_median(data, axis=axis))
+        _median = np.atleast_1d(self._median(data, axis=axis))
         _mean = np.atleast_1d(np.ma.mean(data, axis=axis))
         _std = np.atleast_1d(np.ma.std(data, axis=axis))
         bkg = np.atleast_1d((2.5 * _median) - (1.5 * _mean))
@@ -487,6 +834,11 @@ class BiweightLocationBackground(BackgroundBase):
         A `SigmaClip` object that defines the sigma clipping parameters.
         If `None` then no sigma clipping will be performed.  The default
         is to perform sigma clipping with ``sigma=3.`` and ``iters=5``.
+    histogram : bool, optional
+        If `True`, then the sigma clipping of integer data is calculated
+        from a histogram of the data values (a counting sort) instead of
+        sorting the data.  The result differs only for values exactly at
+        the clipping limits.  The default is `True`.
 
     Examples
     --------
@@ -516,8 +868,7 @@ class BiweightLocationBackground(BackgroundBase):
         self.M = M
 
     def calc_background(self, data, axis=None):
-        if self.sigma_clip is not None:
-            data = self.sigma_clip(data, axis=axis)
+        data = self._sigma_clip(data, axis=axis)
 
         return biweight_location(data, c=self.c, M=self.M, axis=axis)
 
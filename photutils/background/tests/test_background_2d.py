@@ -8,8 +8,8 @@ from numpy.testing import assert_allclose
 from astropy.tests.helper import pytest
 
 from ..core import MeanBackground
-from ..background_2d import (BkgZoomInterpolator, BkgIDWInterpolator,
-                             Background2D)
+from ..background_2d import (BkgZoomInterpolator, BkgSplineInterpolator,
+                             BkgIDWInterpolator, Background2D)
 
 try:
     import scipy
@@ -17,6 +17,12 @@ try:
 except ImportError:
     HAS_SCIPY = False
 
+try:
+    import pathlib
+    HAS_PATHLIB = True
+except ImportError:
+    HAS_PATHLIB = False
+
 
 DATA = np.ones((100, 100))
 BKG_RMS = np.zeros((100, 100))
@@ -26,7 +32,8 @@ PADBKG_MESH = np.ones((5, 5))
 PADBKG_RMS_MESH = np.zeros((5, 5))
 FILTER_SIZES = [(1, 1), (3, 3)]
 EDGE_METHODS = ['pad', 'crop']
-INTERPOLATORS = [BkgZoomInterpolator(), BkgIDWInterpolator()]
+INTERPOLATORS = [BkgZoomInterpolator(), BkgSplineInterpolator(),
+                 BkgIDWInterpolator()]
 
 
 @pytest.mark.skipif('not HAS_SCIPY')
@@ -59,6 +66,24 @@ class TestBackground2D(object):
         assert_allclose(b2.background_mesh, bkg_low_res)
         assert b2.background.shape == data.shape
 
+    def test_background_integer(self):
+        data = np.ones((100, 100), dtype=np.uint16) * 100
+        data[25:50, 50:75] = 1000
+        b1 = Background2D(data, (23, 22), filter_size=(1, 1))
+        b2 = Background2D(data.astype(float), (23, 22), filter_size=(1, 1))
+        assert_allclose(b1.background_mesh, b2.background_mesh)
+        assert_allclose(b1.background, b2.background)
+
+    def test_background_integer_noise(self):
+        prng = np.random.RandomState(12345)
+        data = prng.poisson(100., size=(100, 100)).astype(np.uint16)
+        data[25:50, 50:75] += 1000
+        data[10, 10] = 60000
+        b1 = Background2D(data, (23, 22), filter_size=(1, 1))
+        b2 = Background2D(data.astype(float), (23, 22), filter_size=(1, 1))
+        assert_allclose(b1.background_mesh, b2.background_mesh)
+        assert_allclose(b1.background_rms_mesh, b2.background_rms_mesh)
+
     def test_no_sigma_clipping(self):
         data = np.copy(DATA)
         data[10, 10] = 100.
@@ -99,6 +124,33 @@ class TestBackground2D(object):
                           bkg_estimator=MeanBackground(), edge_method='pad')
         assert_allclose(b2.background, DATA)
 
+    @pytest.mark.parametrize('box_size', ([(25, 25), (23, 22)]))
+    def test_background_masked_array(self, box_size):
+        """Test that the mask of a masked array ``data`` is used."""
+
+        data = np.copy(DATA)
+        data[25:50, 25:50] = 100.
+        mask = np.zeros_like(DATA, dtype=np.bool)
+        mask[25:50, 25:50] = True
+        data_ma = np.ma.masked_array(data, mask=mask)
+        b = Background2D(data_ma, box_size, filter_size=(1, 1),
+                         bkg_estimator=MeanBackground())
+        assert_allclose(b.background, DATA)
+
+        # a stack of masked arrays
+        data3d = np.ma.masked_array([data, data], mask=[mask, mask])
+        b = Background2D(data3d, box_size, filter_size=(1, 1),
+                         bkg_estimator=MeanBackground())
+        assert_allclose(b.background, [DATA, DATA])
+
+        # combined with the input mask
+        mask2 = np.zeros_like(DATA, dtype=np.bool)
+        mask2[60:70, 60:70] = True
+        data_ma[60:70, 60:70] = 50.
+        b = Background2D(data_ma, box_size, filter_size=(1, 1), mask=mask2,
+                         bkg_estimator=MeanBackground())
+        assert_allclose(b.background, DATA)
+
     @pytest.mark.parametrize('exclude_mesh_method',
                              (['any', 'all', 'threshold']))
     def test_exclude_mesh(self, exclude_mesh_method):
@@ -195,3 +247,288 @@ class TestBackground2D(object):
 
         b = Background2D(DATA, (25, 25))
         b.plot_meshes(outlines=True)
+
+    @pytest.mark.parametrize(('filename', 'interpolator'),
+                             list(itertools.product(['bkg.fits', 'bkg.npz'],
+                                                    INTERPOLATORS)))
+    def test_write_read(self, tmpdir, filename, interpolator):
+        data = np.copy(DATA)
+        data[25:50, 50:75] = 10.
+        mask = np.zeros(data.shape, dtype=bool)
+        mask[0:25, 0:25] = True
+        b1 = Background2D(data, (23, 22), mask=mask,
+                          interpolator=interpolator)
+        filename = str(tmpdir.join(filename))
+        b1.write(filename)
+        b2 = Background2D.read(filename)
+        assert b2.interpolator.__class__ == interpolator.__class__
+        assert_allclose(b2.mesh_idx, b1.mesh_idx)
+        assert_allclose(b2.background_mesh_ma, b1.background_mesh_ma)
+        assert_allclose(b2.background_rms_mesh_ma, b1.background_rms_mesh_ma)
+        assert_allclose(b2.background, b1.background)
+        assert_allclose(b2.background_rms, b1.background_rms)
+        assert b2.background_median == b1.background_median
+
+        with pytest.raises(IOError):
+            b1.write(filename)
+        b1.write(filename, overwrite=True)
+
+    @pytest.mark.skipif('not HAS_PATHLIB')
+    @pytest.mark.parametrize(('filename', 'sub_filename'),
+                             [('bkg.fits', 'sub.fits'),
+                              ('bkg.npz', 'sub.npy')])
+    def test_write_read_pathlib(self, tmpdir, filename, sub_filename):
+        b1 = Background2D(DATA, (25, 25))
+        filename = pathlib.Path(str(tmpdir.join(filename)))
+        b1.write(filename)
+        b2 = Background2D.read(filename)
+        assert_allclose(b2.background, b1.background)
+
+        sub_filename = pathlib.Path(str(tmpdir.join(sub_filename)))
+        b1.write_subtracted(sub_filename, data=DATA)
+        assert sub_filename.exists()
+
+    def test_read_custom_interpolator(self, tmpdir):
+        def interp(mesh, bkg2d_obj):
+            return np.zeros(bkg2d_obj._data_shape) + np.mean(mesh)
+
+        b1 = Background2D(DATA, (25, 25), interpolator=interp)
+        filename = str(tmpdir.join('bkg.fits'))
+        b1.write(filename)
+        with pytest.raises(ValueError):
+            Background2D.read(filename)
+        b2 = Background2D.read(filename, interpolator=interp)
+        assert_allclose(b2.background, b1.background)
+
+    @pytest.mark.parametrize('edge_method', EDGE_METHODS)
+    def test_from_meshes(self, edge_method):
+        b1 = Background2D(DATA, (23, 22), edge_method=edge_method)
+        b2 = Background2D.from_meshes(DATA.shape, (23, 22),
+                                      b1.background_mesh,
+                                      b1.background_rms_mesh,
+                                      edge_method=edge_method)
+        assert b2.data is None
+        assert_allclose(b2.background, b1.background)
+        assert_allclose(b2.background_rms, b1.background_rms)
+
+    def test_from_meshes_badshape(self):
+        with pytest.raises(ValueError):
+            Background2D.from_meshes(DATA.shape, (25, 25), BKG_MESH,
+                                     PADBKG_RMS_MESH)
+        with pytest.raises(ValueError):
+            Background2D.from_meshes(DATA.shape, (23, 22), BKG_MESH,
+                                     BKG_RMS_MESH)
+        with pytest.raises(ValueError):
+            Background2D.from_meshes(DATA.shape, (25, 25), BKG_MESH,
+                                     BKG_RMS_MESH, edge_method='invalid')
+
+    @pytest.mark.parametrize(('edge_method', 'interpolator'),
+                             list(itertools.product(EDGE_METHODS,
+                                                    INTERPOLATORS)))
+    def test_update_mask(self, edge_method, interpolator):
+        np.random.seed(0)
+        data = np.random.normal(1., 0.1, (100, 100))
+        data[30:40, 50:60] = 10.
+        data[70:90, 5:25] = 20.
+        mask1 = np.zeros(data.shape, dtype=bool)
+        mask1[32:38, 52:58] = True
+        mask2 = np.zeros(data.shape, dtype=bool)
+        mask2[30:40, 50:60] = True
+        mask2[70:90, 5:25] = True
+
+        b1 = Background2D(data, (23, 22), mask=mask1,
+                          edge_method=edge_method, interpolator=interpolator)
+        b1.background    # evaluate lazyproperty before update
+        b1.update_mask(mask2)
+        b2 = Background2D(data, (23, 22), mask=mask2,
+                          edge_method=edge_method, interpolator=interpolator)
+
+        assert_allclose(b1.mesh_idx, b2.mesh_idx)
+        assert_allclose(b1.mesh_nmasked, b2.mesh_nmasked)
+        assert_allclose(b1.background_mesh_ma, b2.background_mesh_ma)
+        assert_allclose(b1.background_rms_mesh_ma, b2.background_rms_mesh_ma)
+        assert_allclose(b1.background, b2.background)
+        assert_allclose(b1.background_rms, b2.background_rms)
+
+    def test_update_mask_nomask(self):
+        b1 = Background2D(DATA, (25, 25))
+        b1.update_mask(np.zeros(DATA.shape, dtype=bool))
+        assert_allclose(b1.background, DATA)
+
+    def test_update_mask_badshape(self):
+        b1 = Background2D(DATA, (25, 25))
+        with pytest.raises(ValueError):
+            b1.update_mask(np.zeros((10, 10), dtype=bool))
+
+    def test_update_mask_from_meshes(self):
+        b1 = Background2D.from_meshes(DATA.shape, (25, 25), BKG_MESH,
+                                      BKG_RMS_MESH)
+        with pytest.raises(ValueError):
+            b1.update_mask(np.zeros(DATA.shape, dtype=bool))
+
+    def test_mesh_nmasked_from_meshes(self, tmpdir):
+        b1 = Background2D.from_meshes(DATA.shape, (25, 25), BKG_MESH,
+                                      BKG_RMS_MESH)
+        with pytest.raises(ValueError):
+            b1.mesh_nmasked
+
+        filename = str(tmpdir.join('bkg.fits'))
+        Background2D(DATA, (25, 25)).write(filename)
+        b2 = Background2D.read(filename)
+        with pytest.raises(ValueError):
+            b2.mesh_nmasked
+
+    @pytest.mark.parametrize(('edge_method', 'interpolator'),
+                             list(itertools.product(EDGE_METHODS,
+                                                    INTERPOLATORS)))
+    def test_stack(self, tmpdir, edge_method, interpolator):
+        prng = np.random.RandomState(12345)
+        data = prng.normal(10., 2., size=(3, 101, 103))
+        mask = np.zeros(data.shape[1:], dtype=bool)
+        mask[20:50, 20:50] = True
+        b3d = Background2D(data, (23, 22), mask=mask, filter_size=(3, 3),
+                           edge_method=edge_method,
+                           interpolator=interpolator)
+        assert b3d.background.shape == data.shape
+        assert b3d.background_median.shape == (3,)
+        assert len(b3d.mesh_idx) < b3d.nyboxes * b3d.nxboxes
+        output = np.empty(data.shape)
+        assert b3d._resize_mesh(b3d.background_mesh,
+                                output=output) is output
+        assert_allclose(output, b3d.background)
+
+        for i, img in enumerate(data):
+            b2d = Background2D(img, (23, 22), mask=mask, filter_size=(3, 3),
+                               edge_method=edge_method,
+                               interpolator=interpolator)
+            assert_allclose(b3d.background_mesh[i], b2d.background_mesh)
+            assert_allclose(b3d.mesh_nmasked[i], b2d.mesh_nmasked)
+            assert_allclose(b3d.background[i], b2d.background)
+            assert_allclose(b3d.background_rms[i], b2d.background_rms)
+            assert_allclose(b3d.background_median[i], b2d.background_median)
+
+        filename = str(tmpdir.join('bkg.fits'))
+        b3d.write(filename)
+        b3d_read = Background2D.read(filename)
+        assert_allclose(b3d_read.background, b3d.background)
+
+    def test_stack_mask_badshape(self):
+        with pytest.raises(ValueError):
+            Background2D(np.ones((2, 100, 100)), (25, 25),
+                         mask=np.zeros((2, 100, 100), dtype=bool))
+
+    def test_data_baddim(self):
+        with pytest.raises(ValueError):
+            Background2D(np.ones(100), (25, 25))
+
+    def test_mesh_data(self):
+        data = np.arange(100 * 100.).reshape(100, 100)
+        mask = np.zeros(data.shape, dtype=bool)
+        mask[0:25, 0:25] = True
+        b = Background2D(data, (25, 25), mask=mask)
+        assert b.mesh_data.shape == (15, 625)
+        assert_allclose(b.mesh_data[0], data[0:25, 25:50].ravel())
+        assert not np.any(b.mesh_data.mask)
+
+    @pytest.mark.parametrize(('filename', 'interpolator'),
+                             list(itertools.product(['sub.fits', 'sub.npy'],
+                                                    INTERPOLATORS)))
+    def test_write_subtracted(self, tmpdir, filename, interpolator):
+        from astropy.io import fits
+
+        prng = np.random.RandomState(12345)
+        data = prng.normal(10., 2., size=(101, 103))
+        b = Background2D(data, (23, 22), interpolator=interpolator)
+        rms_filename = str(tmpdir.join(filename.replace('sub', 'rms')))
+        filename = str(tmpdir.join(filename))
+        b.write_subtracted(filename, rms_filename=rms_filename)
+        if filename.endswith('.npy'):
+            subtracted = np.load(filename)
+            rms = np.load(rms_filename)
+        else:
+            subtracted = fits.getdata(filename)
+            rms = fits.getdata(rms_filename)
+        assert_allclose(subtracted, data - b.background)
+        assert_allclose(rms, b.background_rms)
+
+        with pytest.raises(IOError):
+            b.write_subtracted(filename)
+        with pytest.raises(ValueError):
+            b.write_subtracted(filename, data=np.ones((10, 10)),
+                               overwrite=True)
+
+    def test_write_subtracted_from_meshes(self, tmpdir):
+        b = Background2D.from_meshes(DATA.shape, (25, 25), BKG_MESH,
+                                     BKG_RMS_MESH)
+        filename = str(tmpdir.join('sub.npy'))
+        with pytest.raises(ValueError):
+            b.write_subtracted(filename)
+        b.write_subtracted(filename, data=DATA)
+        assert_allclose(np.load(filename), 0.)
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+class TestBkgSplineInterpolator(object):
+    @pytest.mark.parametrize(('edge_method', 'order', 'mode'),
+                             list(itertools.product(EDGE_METHODS,
+                                                    [0, 1, 3],
+                                                    ['reflect', 'wrap'])))
+    def test_zoom(self, edge_method, order, mode):
+        prng = np.random.RandomState(12345)
+        data = prng.normal(10., 2., size=(101, 103))
+        data += np.arange(103) / 10.
+        data += np.arange(101)[:, np.newaxis] / 10.
+        interp = BkgZoomInterpolator(order=order, mode=mode)
+        b = Background2D(data, (23, 22), edge_method=edge_method,
+                         interpolator=interp)
+        interp = BkgSplineInterpolator(order=order, mode=mode)
+        assert_allclose(interp(b.background_mesh, b), b.background)
+        assert_allclose(interp(b.background_rms_mesh, b), b.background_rms)
+
+    def test_change_order(self):
+        prng = np.random.RandomState(12345)
+        data = prng.normal(10., 2., size=(101, 103))
+        b = Background2D(data, (23, 22))
+        interp = BkgSplineInterpolator(order=3)
+        interp(b.background_mesh, b)
+        interp.order = 1
+        assert_allclose(interp(b.background_mesh, b),
+                        BkgSplineInterpolator(order=1)(b.background_mesh, b))
+
+    def test_order1_wrap(self):
+        """
+        Test the order=1 row weights when they wrap around the mesh
+        edges.
+        """
+
+        prng = np.random.RandomState(12345)
+        data = prng.normal(10., 2., size=(100, 100))
+        b = Background2D(data, (25, 25))
+        interp = BkgSplineInterpolator(order=1, mode='wrap')
+        yweights = interp._axis_weights(4, 100, 25.)
+        yweights[-10:] = 0.
+        yweights[-10:, 0] = np.linspace(0.05, 0.5, 10)
+        yweights[-10:, -1] = 1. - yweights[-10:, 0]
+        # use the same weights with the dense (order != 1) calculation
+        dense_interp = BkgSplineInterpolator(order=3, mode='wrap')
+        dense_interp._weights = {(4, 100, 25., 3, 'wrap', 0.0): yweights}
+        assert_allclose(interp(b.background_mesh, b),
+                        dense_interp(b.background_mesh, b))
+
+    def test_output(self, tmpdir):
+        data = np.copy(DATA)
+        data[25:50, 50:75] = 10.
+        b = Background2D(data, (25, 25))
+        filename = str(tmpdir.join('bkg.dat'))
+        output = np.memmap(filename, dtype=float, mode='w+',
+                           shape=data.shape)
+        interp = BkgSplineInterpolator()
+        result = interp(b.background_mesh, b, output=output)
+        assert result is output
+        assert_allclose(output, b.background)
+
+    def test_output_badshape(self):
+        b = Background2D(DATA, (25, 25))
+        interp = BkgSplineInterpolator()
+        with pytest.raises(ValueError):
+            interp(b.background_mesh, b, output=np.zeros((10, 10)))
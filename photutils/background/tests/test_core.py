@@ -3,7 +3,7 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import numpy as np
-from numpy.testing import assert_allclose
+from numpy.testing import assert_allclose, assert_array_equal
 from astropy.tests.helper import pytest
 
 from ...datasets.make import make_noise_image
@@ -11,7 +11,8 @@ from ..core import (SigmaClip, MeanBackground, MedianBackground,
                     ModeEstimatorBackground, MMMBackground,
                     SExtractorBackground, BiweightLocationBackground,
                     StdBackgroundRMS, MADStdBackgroundRMS,
-                    BiweightMidvarianceBackgroundRMS)
+                    BiweightMidvarianceBackgroundRMS, _histogram_median,
+                    _histogram_sigma_clip, _masked_median)
 
 
 BKG = 0.0
@@ -82,6 +83,67 @@ def test_sextrator_background_skew():
     assert_allclose(bkg.calc_background(data), np.median(data))
 
 
+@pytest.mark.parametrize('bkg_class', BKG_CLASS0)
+def test_background_histogram(bkg_class):
+    data = make_noise_image((100, 100), type='poisson', mean=100.,
+                            random_state=12345).astype(np.uint16)
+    data[10, 10] = 60000
+    mask = np.zeros(data.shape, dtype=bool)
+    mask[20:30, :] = True
+    mask[:, 50] = True
+    data = np.ma.masked_array(data, mask=mask)
+    bkg1 = bkg_class(sigma_clip=SIGMA_CLIP, histogram=True)
+    bkg2 = bkg_class(sigma_clip=SIGMA_CLIP, histogram=False)
+    assert_allclose(bkg1(data), bkg2(data))
+    for axis in [0, 1]:
+        assert_allclose(bkg1(data, axis=axis), bkg2(data, axis=axis))
+
+
+def test_histogram_median_rows():
+    """
+    Test rows with different value ranges, some larger than the number
+    of values per row.
+    """
+
+    prng = np.random.RandomState(12345)
+    data = prng.poisson(100., size=(20, 50)).astype(np.uint16)
+    data += (np.arange(20) * 1000).astype(np.uint16)[:, np.newaxis]
+    data[3, 5] = 60000
+    data[7, :] = 5
+    mask = np.zeros(data.shape, dtype=bool)
+    mask[9, :] = True
+    mask[11, ::2] = True
+    data = np.ma.masked_array(data, mask=mask)
+    result = _histogram_median(data, axis=1)
+    expected = _masked_median(data, axis=1)
+    assert_allclose(result, expected)
+    assert_array_equal(result.mask, expected.mask)
+
+
+@pytest.mark.parametrize('axis', [None, 0, 1])
+@pytest.mark.parametrize('iters', [None, 1, 5])
+def test_histogram_sigma_clip(axis, iters):
+    prng = np.random.RandomState(12345)
+    data = prng.poisson(100., size=(50, 60)).astype(np.uint16)
+    data[3, 5] = 60000
+    data[10:15, 20] = 1000
+    mask = np.zeros(data.shape, dtype=bool)
+    mask[9, :] = True
+    mask[:, 11] = True
+    data = np.ma.masked_array(data, mask=mask)
+    sigclip = SigmaClip(sigma_lower=2., sigma_upper=2.5, iters=iters)
+    result = _histogram_sigma_clip(data, sigclip, axis=axis)
+    expected = sigclip(data, axis=axis)
+    assert_array_equal(result.mask, expected.mask)
+    assert_array_equal(result.data, data.data)
+
+
+def test_histogram_sigma_clip_float():
+    sigclip = SigmaClip(sigma=3.)
+    result = _histogram_sigma_clip(DATA, sigclip, axis=1)
+    assert_array_equal(result.mask, sigclip(DATA, axis=1).mask)
+
+
 @pytest.mark.parametrize('rms_class', RMS_CLASS)
 def test_background_rms(rms_class):
     bkgrms = rms_class(sigma_clip=SIGMA_CLIP)
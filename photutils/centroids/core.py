@@ -255,6 +255,292 @@ def fit_2dgaussian(data, error=None, mask=None):
     return gfit
 
 
+def _gaussianconst2d_init(data, mask):
+    """
+    Vectorized version of the initial parameter estimates used by
+    `fit_2dgaussian`, computed for a stack of 2D images.
+
+    ``data`` must already have its masked pixels set to zero.  The
+    moments are computed exactly as in
+    `~photutils.morphology.data_properties`.
+    """
+
+    ny, nx = data.shape[1:]
+    y, x = np.indices((ny, nx))
+    dmin = data.reshape(len(data), -1).min(axis=1)
+    amplitude = data.reshape(len(data), -1).max(axis=1) - dmin
+
+    mdata = data - dmin[:, np.newaxis, np.newaxis]
+    mdata[mask] = 0.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        m00 = mdata.sum(axis=(1, 2))
+        xcen = np.einsum('kij,ij->k', mdata, x) / m00
+        ycen = np.einsum('kij,ij->k', mdata, y) / m00
+        dx = x - xcen[:, np.newaxis, np.newaxis]
+        dy = y - ycen[:, np.newaxis, np.newaxis]
+        cxx = (mdata * dx**2).sum(axis=(1, 2)) / m00
+        cxy = (mdata * dx * dy).sum(axis=(1, 2)) / m00
+        cyy = (mdata * dy**2).sum(axis=(1, 2)) / m00
+
+    # SExtractor prescription for "infinitely" thin detections (see
+    # SourceProperties._check_covariance)
+    p = 1. / 12
+    with np.errstate(invalid='ignore'):
+        thin = (cxx * cyy - cxy**2) < p**2
+        while np.any(thin):
+            cxx[thin] += p
+            cyy[thin] += p
+            thin[thin] = (cxx[thin] * cyy[thin] - cxy[thin]**2) < p**2
+
+        half_trace = 0.5 * (cxx + cyy)
+        delta = np.sqrt(0.25 * (cxx - cyy)**2 + cxy**2)
+        eigval_max = half_trace + delta
+        eigval_min = half_trace - delta
+        badvar = (eigval_min < 0) | (cxx < 0) | (cyy < 0)
+        x_stddev = np.sqrt(eigval_max)
+        y_stddev = np.sqrt(eigval_min)
+        theta = 0.5 * np.arctan2(2. * cxy, (cxx - cyy))
+    x_stddev[badvar] = np.nan
+    y_stddev[badvar] = np.nan
+    theta[badvar] = np.nan
+
+    constant = np.zeros(len(data))
+
+    return np.column_stack([constant, amplitude, xcen, ycen, x_stddev,
+                            y_stddev, theta])
+
+
+def _gaussianconst2d_deriv(x, y, params):
+    """
+    Evaluate `GaussianConst2D` and its analytic derivatives with respect
+    to each parameter for a stack of parameter sets.
+
+    Returns the model with shape ``(n, npix)`` and the Jacobian with
+    shape ``(n, npix, 7)``.
+    """
+
+    (constant, amplitude, x_mean, y_mean, x_stddev, y_stddev,
+     theta) = [params[:, i, np.newaxis] for i in range(7)]
+
+    cost = np.cos(theta)
+    sint = np.sin(theta)
+    cost2 = cost**2
+    sint2 = sint**2
+    cos2t = np.cos(2. * theta)
+    sin2t = np.sin(2. * theta)
+    xstd2 = x_stddev**2
+    ystd2 = y_stddev**2
+    xstd3 = x_stddev**3
+    ystd3 = y_stddev**3
+    xdiff = x - x_mean
+    ydiff = y - y_mean
+    xdiff2 = xdiff**2
+    ydiff2 = ydiff**2
+    xydiff = xdiff * ydiff
+    a = 0.5 * ((cost2 / xstd2) + (sint2 / ystd2))
+    b = 0.5 * ((sin2t / xstd2) - (sin2t / ystd2))
+    c = 0.5 * ((sint2 / xstd2) + (cost2 / ystd2))
+    expo = np.exp(-((a * xdiff2) + (b * xydiff) + (c * ydiff2)))
+    g = amplitude * expo
+
+    da_dtheta = sint * cost * ((1. / ystd2) - (1. / xstd2))
+    db_dtheta = (cos2t / xstd2) - (cos2t / ystd2)
+
+    jac = np.empty(g.shape + (7,))
+    jac[..., 0] = 1.
+    jac[..., 1] = expo
+    jac[..., 2] = g * ((2. * a * xdiff) + (b * ydiff))
+    jac[..., 3] = g * ((b * xdiff) + (2. * c * ydiff))
+    jac[..., 4] = g * ((cost2 * xdiff2 + sin2t * xydiff + sint2 * ydiff2) /
+                       xstd3)
+    jac[..., 5] = g * ((sint2 * xdiff2 - sin2t * xydiff + cost2 * ydiff2) /
+                       ystd3)
+    jac[..., 6] = -g * (da_dtheta * (xdiff2 - ydiff2) + db_dtheta * xydiff)
+
+    return constant + g, jac
+
+
+def _solve_lm_step(hess, grad, lam):
+    """
+    Solve the damped normal equations of a Levenberg-Marquardt step
+    for a stack of problems.
+    """
+
+    diag = np.einsum('kii->ki', hess).copy()
+    diag[diag <= 0] = 1.
+    damped = hess.copy()
+    idx = np.arange(hess.shape[1])
+    damped[:, idx, idx] += lam[:, np.newaxis] * diag
+
+    try:
+        return np.linalg.solve(damped, grad)
+    except np.linalg.LinAlgError:
+        # fall back to a least-squares solution for each problem
+        return np.array([np.linalg.lstsq(dmp, grd, rcond=-1)[0]
+                         for (dmp, grd) in zip(damped, grad)])
+
+
+def _fit_2dgaussian_stack(data, error=None, mask=None, maxiter=100,
+                          acc=1.e-7, chunk_size=2**20):
+    """
+    Fit a 2D Gaussian plus a constant to each image in a stack of 2D
+    images.
+
+    This is a batched equivalent of `fit_2dgaussian`.  The initial
+    parameters are estimated in the same way, but all the fits are
+    solved simultaneously with a vectorized Levenberg-Marquardt
+    algorithm using the analytic derivatives of the model.
+
+    Parameters
+    ----------
+    data : array_like
+        The 3D ``(n, ny, nx)`` stack of images.
+
+    error : array_like, optional
+        The 3D stack of the 1-sigma errors of the input ``data``.
+
+    mask : array_like (bool), optional
+        A boolean mask, with the same shape as ``data``, where a `True`
+        value indicates the corresponding element of ``data`` is masked.
+
+    maxiter : int, optional
+        The maximum number of iterations for each fit.
+
+    acc : float, optional
+        The relative tolerance in both the sum of squares and the
+        parameter values used to define convergence.
+
+    chunk_size : int, optional
+        The approximate maximum number of pixels that are fit at once.
+        Larger stacks are processed in chunks to limit the memory used
+        by the Jacobian.
+
+    Returns
+    -------
+    params : `~numpy.ndarray`
+        A ``(n, 7)`` array of the best-fit parameters of each image, in
+        the order of `GaussianConst2D.param_names`.  Fits that could
+        not be computed are set to NaN.
+
+    converged : `~numpy.ndarray` (bool)
+        A ``(n,)`` array that is `True` where the corresponding fit
+        converged within ``maxiter`` iterations.
+    """
+
+    data = np.asanyarray(data, dtype=float)
+    if data.ndim != 3:
+        raise ValueError('data must be a 3D array.')
+
+    if mask is None or mask is np.ma.nomask:
+        mask = np.zeros(data.shape, dtype=bool)
+    else:
+        mask = np.asanyarray(mask)
+        if data.shape != mask.shape:
+            raise ValueError('data and mask must have the same shape.')
+
+    badmask = ~np.isfinite(data)
+    if np.any(badmask):
+        warnings.warn('Input data contains input values (e.g. NaNs or infs), '
+                      'which were automatically masked.', AstropyUserWarning)
+        mask = mask | badmask
+
+    if error is not None:
+        error = np.asanyarray(error, dtype=float)
+        if data.shape != error.shape:
+            raise ValueError('data and error must have the same shape.')
+        mask = mask | ~np.isfinite(error)
+        with np.errstate(invalid='ignore'):
+            weights = 1.0 / error.clip(min=1.e-30)
+    else:
+        weights = np.ones(data.shape)
+
+    if np.any((~mask).sum(axis=(1, 2)) < 7):
+        raise ValueError('Input data must have a least 7 unmasked values to '
+                         'fit a 2D Gaussian plus a constant.')
+
+    weights[mask] = 0.
+    data = np.where(mask, 0., data)
+
+    nfit = len(data)
+    npix = data.shape[1] * data.shape[2]
+    params = np.empty((nfit, 7))
+    converged = np.zeros(nfit, dtype=bool)
+    y, x = [i.ravel() for i in np.indices(data.shape[1:])]
+    step = max(chunk_size // npix, 1)
+    for i in range(0, nfit, step):
+        slc = slice(i, i + step)
+        params[slc], converged[slc] = _lm_fit_stack(
+            x, y, data[slc], weights[slc], mask[slc], maxiter, acc)
+
+    return params, converged
+
+
+def _lm_fit_stack(x, y, data, weights, mask, maxiter, acc):
+    """
+    Vectorized Levenberg-Marquardt fit of `GaussianConst2D` to a stack
+    of images.  See `_fit_2dgaussian_stack`.
+    """
+
+    params = _gaussianconst2d_init(data, mask)
+    data = data.reshape(len(data), -1)
+    weights = weights.reshape(len(data), -1)
+    nfit = len(data)
+
+    def _chisq(idx, pars):
+        model, jac = _gaussianconst2d_deriv(x, y, pars)
+        resid = weights[idx] * (data[idx] - model)
+        return (resid**2).sum(axis=1), resid, jac
+
+    converged = np.zeros(nfit, dtype=bool)
+    active = np.isfinite(params).all(axis=1)
+    lam = np.full(nfit, 1.e-3)
+    chisq = np.full(nfit, np.nan)
+    idx = active.nonzero()[0]
+    chisq[idx], resid, jac = _chisq(idx, params[idx])
+
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        for _ in range(maxiter):
+            idx = active.nonzero()[0]
+            if len(idx) == 0:
+                break
+            wjac = weights[idx, :, np.newaxis] * jac
+            hess = np.einsum('kpi,kpj->kij', wjac, wjac)
+            grad = np.einsum('kpi,kp->ki', wjac, resid)
+            delta = _solve_lm_step(hess, grad, lam[idx])
+
+            trial = params[idx] + delta
+            trial_chisq, trial_resid, trial_jac = _chisq(idx, trial)
+            better = trial_chisq <= chisq[idx]
+
+            good = idx[better]
+            dchisq = chisq[good] - trial_chisq[better]
+            dparams = np.abs(delta[better])
+            params[good] = trial[better]
+            lam[good] *= 0.1
+            lam[idx[~better]] *= 10.
+
+            done = ((dchisq <= acc * trial_chisq[better]) |
+                    np.all(dparams <= acc * (np.abs(trial[better]) + acc),
+                           axis=1))
+            converged[good[done]] = True
+            chisq[good] = trial_chisq[better]
+
+            # stop fits that can no longer make progress
+            stuck = idx[~np.isfinite(chisq[idx]) | (lam[idx] > 1.e16)]
+            active[good[done]] = False
+            active[stuck] = False
+
+            # keep the residuals and Jacobian of the still-active fits
+            keep = active[idx]
+            resid = np.where(better[:, np.newaxis], trial_resid, resid)[keep]
+            jac = np.where(better[:, np.newaxis, np.newaxis], trial_jac,
+                           jac)[keep]
+
+    params[~np.isfinite(params).all(axis=1)] = np.nan
+
+    return params, converged
+
+
 def centroid_1dg(data, error=None, mask=None):
     """
     Calculate the centroid of a 2D array by fitting 1D Gaussians to the
@@ -9,7 +9,7 @@ from astropy.modeling.models import Gaussian1D, Gaussian2D
 from astropy.tests.helper import pytest
 
 from ..core import (centroid_com, centroid_1dg, centroid_2dg,
-                    gaussian1d_moments, fit_2dgaussian)
+                    gaussian1d_moments, fit_2dgaussian, _fit_2dgaussian_stack)
 
 try:
     import skimage
@@ -187,3 +187,31 @@ def test_fit2dgaussian_dof():
     data = np.ones((2, 2))
     with pytest.raises(ValueError):
         fit_2dgaussian(data)
+
+
+@pytest.mark.skipif('not HAS_SKIMAGE')
+def test_fit2dgaussian_stack():
+    y, x = np.mgrid[0:15, 0:15]
+    params = [(2.4, 7.3, 6.8, 1.5, 2.2, 0.5),
+              (10., 6.1, 7.9, 2.5, 1.8, -0.3)]
+    data = np.array([Gaussian2D(*par)(x, y) + 1. for par in params])
+    mask = np.zeros(data.shape, dtype=bool)
+    mask[0, 0:3] = True
+    data[0, 0:3] = 1.e5
+    fit_params, converged = _fit_2dgaussian_stack(data, mask=mask)
+    assert np.all(converged)
+
+    for i, par in enumerate(params):
+        # x_stddev, y_stddev, and theta are degenerate, so compare only
+        # the constant, amplitude, and centroid
+        gfit = fit_2dgaussian(data[i], mask=mask[i])
+        assert_allclose(fit_params[i, 0:4], gfit.parameters[0:4], rtol=0,
+                        atol=1.e-6)
+        assert_allclose(fit_params[i, 0:4], (1., ) + par[0:3], rtol=0,
+                        atol=1.e-6)
+
+
+def test_fit2dgaussian_stack_dof():
+    data = np.ones((2, 2, 2))
+    with pytest.raises(ValueError):
+        _fit_2dgaussian_stack(data)
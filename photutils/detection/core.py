@@ -7,7 +7,6 @@ from __future__ import (absolute_import, division, print_function,
 import numpy as np
 from astropy.table import Column, Table
 
-from ..utils.cutouts import cutout_footprint
 from ..utils.wcs_helpers import pixel_to_icrs_coords
 from ..extern.sigma_clipping import sigma_clipped_stats
 
@@ -30,22 +29,29 @@ def detect_threshold(data, snr, background=None, error=None, mask=None,
         The signal-to-noise ratio per pixel above the ``background`` for
         which to consider a pixel as possibly being part of a source.
 
-    background : float or array_like, optional
+    background : float, array_like, or `~photutils.Background2D`, optional
         The background value(s) of the input ``data``.  ``background``
-        may either be a scalar value or a 2D image with the same shape
-        as the input ``data``.  If the input ``data`` has been
-        background-subtracted, then set ``background`` to ``0.0``.  If
-        `None`, then a scalar background value will be estimated using
-        sigma-clipped statistics.
+        may either be a scalar value, a 2D image with the same shape as
+        the input ``data`` (or an array that can be broadcast to it), or
+        a `~photutils.background.Background2D` object.  If the input
+        ``data`` has been background-subtracted, then set
+        ``background`` to ``0.0``.  If `None`, then a scalar background
+        value will be estimated using sigma-clipped statistics.  For a
+        `~photutils.background.Background2D` object, if ``error`` is
+        `None` the background RMS meshes of the object are used for the
+        error.  For the (linear) photutils interpolators, the threshold
+        is then computed on the low-resolution background meshes and
+        resized once to the full image.
 
     error : float or array_like, optional
         The Gaussian 1-sigma standard deviation of the background noise
         in ``data``.  ``error`` should include all sources of
         "background" error, but *exclude* the Poisson error of the
         sources.  If ``error`` is a 2D image, then it should represent
-        the 1-sigma background error in each pixel of ``data``.  If
-        `None`, then a scalar background rms value will be estimated
-        using sigma-clipped statistics.
+        the 1-sigma background error in each pixel of ``data``.  An
+        array that can be broadcast to the shape of ``data`` is also
+        allowed.  If `None`, then a scalar background rms value will be
+        estimated using sigma-clipped statistics.
 
     mask : array_like, bool, optional
         A boolean mask with the same shape as ``data``, where a `True`
@@ -72,7 +78,10 @@ def detect_threshold(data, snr, background=None, error=None, mask=None,
     -------
     threshold : 2D `~numpy.ndarray`
         A 2D image with the same shape as ``data`` containing the
-        pixel-wise threshold values.
+        pixel-wise threshold values.  If ``background`` and ``error``
+        are scalars (or broadcastable arrays), then a read-only
+        broadcast view is returned instead of a full-sized image.  Use
+        ``np.array(threshold)`` to get a writable copy.
 
     See Also
     --------
@@ -88,36 +97,72 @@ def detect_threshold(data, snr, background=None, error=None, mask=None,
     are ignored.
     """
 
+    # prevents circular import
+    from ..background import (Background2D, BkgZoomInterpolator,
+                              BkgSplineInterpolator, BkgIDWInterpolator)
+
+    if isinstance(background, Background2D):
+        bkg2d = background
+        if np.shape(data) != bkg2d._stack_shape + bkg2d._data_shape:
+            raise ValueError('The input Background2D object must have the '
+                             'same shape as the input data.')
+        if error is None:
+            if isinstance(bkg2d.interpolator,
+                          (BkgZoomInterpolator, BkgSplineInterpolator,
+                           BkgIDWInterpolator)):
+                # these interpolators are linear, so the threshold mesh
+                # can be resized directly instead of resizing both the
+                # background and background RMS meshes
+                return bkg2d._resize_mesh(bkg2d.background_mesh +
+                                          (bkg2d.background_rms_mesh * snr))
+
+            threshold = bkg2d._resize_mesh(bkg2d.background_mesh)
+            threshold += bkg2d._resize_mesh(bkg2d.background_rms_mesh) * snr
+            return threshold
+
+        threshold = bkg2d._resize_mesh(bkg2d.background_mesh)
+        threshold += _broadcast_image(error, np.shape(data), 'error') * snr
+        return threshold
+
     if background is None or error is None:
         data_mean, data_median, data_std = sigma_clipped_stats(
             data, mask=mask, mask_value=mask_value, sigma=sigclip_sigma,
             iters=sigclip_iters)
-        bkgrd_image = np.zeros_like(data) + data_mean
-        bkgrdrms_image = np.zeros_like(data) + data_std
 
     if background is None:
-        background = bkgrd_image
+        background = data_mean
     else:
-        if np.isscalar(background):
-            background = np.zeros_like(data) + background
-        else:
-            if background.shape != data.shape:
-                raise ValueError('If input background is 2D, then it '
-                                 'must have the same shape as the input '
-                                 'data.')
+        background = _broadcast_image(background, np.shape(data),
+                                      'background')
 
     if error is None:
-        error = bkgrdrms_image
+        error = data_std
     else:
-        if np.isscalar(error):
-            error = np.zeros_like(data) + error
-        else:
-            if error.shape != data.shape:
-                raise ValueError('If input error is 2D, then it '
-                                 'must have the same shape as the input '
-                                 'data.')
+        error = _broadcast_image(error, np.shape(data), 'error')
+
+    threshold = background + (error * snr)
+    if np.shape(threshold) != np.shape(data):
+        # scalar or broadcastable inputs give a read-only broadcast view
+        threshold = np.broadcast_to(threshold, np.shape(data))
+
+    return threshold
+
 
-    return background + (error * snr)
+def _broadcast_image(value, shape, name):
+    """
+    Check that ``value`` is a scalar or an array that can be broadcast
+    to ``shape``, returning it without creating a full-sized array.
+    """
+
+    value = np.asanyarray(value)
+    try:
+        np.broadcast_to(value, shape)
+    except ValueError:
+        raise ValueError('If input {0} is an array, then it must have the '
+                         'same shape as the input data (or be '
+                         'broadcastable to it).'.format(name))
+
+    return value
 
 
 def find_peaks(data, threshold, box_size=3, footprint=None, mask=None,
@@ -144,7 +189,9 @@ def find_peaks(data, threshold, box_size=3, footprint=None, mask=None,
     on each peak and fit with a 2D Gaussian (plus a constant).  In this
     case, the fitted local centroid and peak value (the Gaussian
     amplitude plus the background constant) will also be returned in the
-    output table.
+    output table.  The fits for all peaks are performed simultaneously
+    with a vectorized Levenberg-Marquardt solver, and a flag indicating
+    whether each fit converged is also returned.
 
     Parameters
     ----------
@@ -208,7 +255,8 @@ def find_peaks(data, threshold, box_size=3, footprint=None, mask=None,
     output : `~astropy.table.Table`
         A table containing the x and y pixel location of the peaks and
         their values.  If ``subpixel=True``, then the table will also
-        contain the local centroid and fitted peak value.
+        contain the local centroid, the fitted peak value, and a
+        ``fit_converged`` flag.
     """
 
     from scipy import ndimage
@@ -216,63 +264,68 @@ def find_peaks(data, threshold, box_size=3, footprint=None, mask=None,
     if np.all(data == data.flat[0]):
         return []
 
-    if footprint is not None:
-        data_max = ndimage.maximum_filter(data, footprint=footprint,
-                                          mode='constant', cval=0.0)
-    else:
-        data_max = ndimage.maximum_filter(data, size=box_size,
-                                          mode='constant', cval=0.0)
-
-    peak_goodmask = (data == data_max)    # good pixels are True
-
     if mask is not None:
         mask = np.asanyarray(mask)
         if data.shape != mask.shape:
             raise ValueError('data and mask must have the same shape')
-        peak_goodmask = np.logical_and(peak_goodmask, ~mask)
-
-    if border_width is not None:
-        for i in range(peak_goodmask.ndim):
-            peak_goodmask = peak_goodmask.swapaxes(0, i)
-            peak_goodmask[:border_width] = False
-            peak_goodmask[-border_width:] = False
-            peak_goodmask = peak_goodmask.swapaxes(0, i)
 
-    peak_goodmask = np.logical_and(peak_goodmask, (data > threshold))
+    # when only a small fraction of the pixels are above the threshold,
+    # check only those candidate pixels for being local maxima instead
+    # of filtering the whole image
+    peak_goodmask = (data > threshold)
+    region = _make_footprint(box_size, footprint)
+    sparse = (4 * np.count_nonzero(peak_goodmask) * region.sum() <
+              data.size)
+    if not sparse:
+        if footprint is not None:
+            data_max = ndimage.maximum_filter(data, footprint=footprint,
+                                              mode='constant', cval=0.0)
+        else:
+            data_max = ndimage.maximum_filter(data, size=box_size,
+                                              mode='constant', cval=0.0)
+        peak_goodmask &= (data == data_max)
     y_peaks, x_peaks = peak_goodmask.nonzero()
+
+    good = np.ones(len(y_peaks), dtype=bool)
+    if mask is not None:
+        good &= ~mask[y_peaks, x_peaks]
+    if border_width is not None:
+        ny, nx = data.shape
+        good &= ((y_peaks >= border_width) & (y_peaks < ny - border_width) &
+                 (x_peaks >= border_width) & (x_peaks < nx - border_width))
+    y_peaks, x_peaks = y_peaks[good], x_peaks[good]
     peak_values = data[y_peaks, x_peaks]
 
+    if sparse:
+        good = (peak_values == _local_max(data, y_peaks, x_peaks, region))
+        y_peaks, x_peaks = y_peaks[good], x_peaks[good]
+        peak_values = peak_values[good]
+
     if len(x_peaks) > npeaks:
-        idx = np.argsort(peak_values)[::-1][:npeaks]
+        npeaks = int(npeaks)
+        idx = np.argpartition(peak_values, -npeaks)[-npeaks:]
+        idx = idx[np.argsort(peak_values[idx])[::-1]]
         x_peaks = x_peaks[idx]
         y_peaks = y_peaks[idx]
         peak_values = peak_values[idx]
 
     if subpixel:
-        from ..centroids import fit_2dgaussian    # prevents circular import
-
-        x_centroid, y_centroid = [], []
-        fit_peak_values = []
-        for (y_peak, x_peak) in zip(y_peaks, x_peaks):
-            rdata, rmask, rerror, slc = cutout_footprint(
-                data, (x_peak, y_peak), box_size=box_size,
-                footprint=footprint, mask=mask, error=error)
-            gaussian_fit = fit_2dgaussian(rdata, mask=rmask, error=rerror)
-            if gaussian_fit is None:
-                x_cen, y_cen, fit_peak_value = np.nan, np.nan, np.nan
-            else:
-                x_cen = slc[1].start + gaussian_fit.x_mean.value
-                y_cen = slc[0].start + gaussian_fit.y_mean.value
-                fit_peak_value = (gaussian_fit.constant.value +
-                                  gaussian_fit.amplitude.value)
-            x_centroid.append(x_cen)
-            y_centroid.append(y_cen)
-            fit_peak_values.append(fit_peak_value)
+        # prevents circular import
+        from ..centroids.core import _fit_2dgaussian_stack
+
+        rdata, rmask, rerror, origin = _peak_cutouts(
+            data, x_peaks, y_peaks, box_size=box_size,
+            footprint=footprint, mask=mask, error=error)
+        params, fit_converged = _fit_2dgaussian_stack(rdata, mask=rmask,
+                                                      error=rerror)
+        x_centroid = origin[1] + params[:, 2]
+        y_centroid = origin[0] + params[:, 3]
+        fit_peak_values = params[:, 0] + params[:, 1]
 
         columns = (x_peaks, y_peaks, peak_values, x_centroid, y_centroid,
-                   fit_peak_values)
+                   fit_peak_values, fit_converged)
         names = ('x_peak', 'y_peak', 'peak_value', 'x_centroid', 'y_centroid',
-                 'fit_peak_value')
+                 'fit_peak_value', 'fit_converged')
     else:
         columns = (x_peaks, y_peaks, peak_values)
         names = ('x_peak', 'y_peak', 'peak_value')
@@ -295,3 +348,89 @@ def find_peaks(data, threshold, box_size=3, footprint=None, mask=None,
                                     name='icrs_dec_centroid'), index=idx+2)
 
     return table
+
+
+def _make_footprint(box_size=3, footprint=None):
+    """
+    Return the boolean footprint array defined by the ``box_size`` or
+    ``footprint`` keywords of `find_peaks`.
+    """
+
+    if footprint is None:
+        shape = np.atleast_1d(box_size).astype(int)
+        if len(shape) == 1:
+            shape = np.repeat(shape, 2)
+        return np.ones(shape, dtype=bool)
+    else:
+        return np.asanyarray(footprint, dtype=bool)
+
+
+def _local_max(data, y, x, footprint):
+    """
+    Calculate the maximum of ``data`` within the ``footprint`` centered
+    on each of the ``(y, x)`` pixels.
+
+    This gives the same values as ``scipy.ndimage.maximum_filter``
+    (with ``mode='constant'`` and ``cval=0``) evaluated at only the
+    input pixels.
+    """
+
+    ny, nx = data.shape
+    data_max = np.full(len(y), -np.inf, dtype=np.result_type(data, float))
+    for dy, dx in zip(*np.nonzero(footprint)):
+        yy = y + (dy - footprint.shape[0] // 2)
+        xx = x + (dx - footprint.shape[1] // 2)
+        inside = (yy >= 0) & (yy < ny) & (xx >= 0) & (xx < nx)
+        values = np.zeros(len(y), dtype=data_max.dtype)    # cval=0
+        values[inside] = data[yy[inside], xx[inside]]
+        np.maximum(data_max, values, out=data_max)
+
+    return data_max
+
+
+def _peak_cutouts(data, x_peaks, y_peaks, box_size=3, footprint=None,
+                  mask=None, error=None):
+    """
+    Extract a stack of equally-sized cutouts centered on each peak.
+
+    This is the vectorized equivalent of calling
+    `~photutils.utils.cutout_footprint` for each peak, except that
+    pixels that lie outside of ``data`` are masked (and set to zero)
+    instead of being trimmed from the cutout.
+
+    Returns
+    -------
+    cutout_data, cutout_mask, cutout_error : `~numpy.ndarray`
+        The ``(npeaks, ny, nx)`` cutout stacks.  ``cutout_error`` is
+        `None` if ``error`` is `None`.
+
+    origin : tuple of `~numpy.ndarray`
+        The ``(y, x)`` pixel coordinates in ``data`` of the lower-left
+        pixel of each cutout.
+    """
+
+    footprint = _make_footprint(box_size, footprint)
+    ny, nx = footprint.shape
+    y0 = np.asarray(y_peaks) - (ny // 2)
+    x0 = np.asarray(x_peaks) - (nx // 2)
+    yy = y0[:, np.newaxis] + np.arange(ny)
+    xx = x0[:, np.newaxis] + np.arange(nx)
+    ybad = (yy < 0) | (yy >= data.shape[0])
+    xbad = (xx < 0) | (xx >= data.shape[1])
+    idx = (np.clip(yy, 0, data.shape[0] - 1)[:, :, np.newaxis],
+           np.clip(xx, 0, data.shape[1] - 1)[:, np.newaxis, :])
+
+    outside = ybad[:, :, np.newaxis] | xbad[:, np.newaxis, :]
+    cutout_mask = outside | ~footprint
+    if mask is not None:
+        cutout_mask |= mask[idx]
+
+    cutout_data = data[idx].astype(float)
+    cutout_data[outside] = 0.
+
+    if error is not None:
+        cutout_error = np.asanyarray(error)[idx].astype(float)
+    else:
+        cutout_error = None
+
+    return cutout_data, cutout_mask, cutout_error, (y0, x0)
@@ -9,25 +9,25 @@ image.
 
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
-from collections import defaultdict
 import warnings
 import math
 import abc
 
 import numpy as np
 from astropy.extern import six
-from astropy.table import Column, Table
+from astropy.table import Column, Table, vstack
 from astropy.utils.exceptions import AstropyUserWarning
 from astropy.utils import deprecated
 from astropy.utils.misc import InheritDocstrings
 from astropy.stats import gaussian_fwhm_to_sigma
 
 from .core import find_peaks
-from ..utils.convolution import filter_data
+from ..utils.convolution import filter_data, _filter_data_multi
+from ..utils.tiling import _map_tiles
 
 
-__all__ = ['DAOStarFinder', 'IRAFStarFinder', 'StarFinderBase',
-           'daofind', 'irafstarfind']
+__all__ = ['DAOStarFinder', 'IRAFStarFinder', 'MultiScaleDAOStarFinder',
+           'StarFinderBase', 'daofind', 'irafstarfind']
 
 
 class _ABCMetaAndInheritDocstrings(InheritDocstrings, abc.ABCMeta):
@@ -64,7 +64,7 @@ class StarFinderBase(object):
         return self.find_stars(data)
 
     @abc.abstractmethod
-    def find_stars(self, data):
+    def find_stars(self, data, convolved_data=None):
         """
         Find stars in an astronomical image.
 
@@ -73,6 +73,21 @@ class StarFinderBase(object):
         data : array_like
             The 2D image array.
 
+        convolved_data : array_like or dict, optional
+            The 2D image convolved with the finder kernel (with the
+            same ``fwhm``, ``ratio``, ``theta``, and ``sigma_radius``),
+            which is used instead of convolving ``data``.
+            ``convolved_data`` may also be a (initially empty) `dict`
+            used as a cache of the convolved images of ``data``, keyed
+            by the kernel parameters.  A convolved image missing from
+            the cache is computed and added to it, so that other finders
+            (e.g. a `~photutils.detection.DAOStarFinder` and an
+            `~photutils.detection.IRAFStarFinder` with the same
+            ``fwhm``) run on the same ``data`` with the same cache reuse
+            the convolved image.  The convolved images can then be
+            retrieved from the cache.  A cache must be used with only
+            one ``data`` image.
+
         Returns
         -------
         table : `~astropy.table.Table`
@@ -126,6 +141,203 @@ class StarFinderBase(object):
 
         raise NotImplementedError
 
+    @property
+    def _tile_halo(self):
+        """
+        The width (in pixels) of the overlap region (halo) around each
+        tile needed to find the stars whose centroids are in the tile
+        in the same way as in the full image.
+        """
+
+        raise NotImplementedError('{0} does not support tiled star '
+                                  'finding'.format(self.__class__.__name__))
+
+    def _find_stars(self, data, convolved_data=None):
+        """
+        Find stars in an astronomical image without issuing warnings.
+
+        Returns the `find_stars` table and a `bool` indicating whether
+        any sources were found before the sharpness and roundness
+        criteria were applied.
+        """
+
+        raise NotImplementedError('{0} does not support tiled star '
+                                  'finding'.format(self.__class__.__name__))
+
+    def find_stars_tiled(self, data, tile_size=1024, n_jobs=1,
+                         use_processes=False):
+        """
+        Find stars in an astronomical image by processing overlapping
+        tiles of the image in parallel.
+
+        The image is split into tiles of ``tile_size`` pixels on a side.
+        Each tile is extended by a halo (which depends on the
+        convolution kernel size and the minimum separation of sources)
+        and `find_stars` is run on each extended tile.  The results are
+        merged, keeping each source only in the tile that contains its
+        (rounded) centroid.  The halo is wide enough that the source
+        properties are the same as those found in the full image.
+
+        Parameters
+        ----------
+        data : array_like
+            The 2D image array.
+
+        tile_size : int, optional
+            The size (in pixels) of the tiles along both axes, excluding
+            the halo.
+
+        n_jobs : int, optional
+            The number of worker threads (or processes) used to process
+            the tiles.  If 1, the tiles are processed serially.
+
+        use_processes : bool, optional
+            If `True`, use a pool of worker processes instead of
+            threads.  The finder object and each extended tile are
+            copied to the worker processes, so the memory used by each
+            worker is bounded by the tile size.
+
+        Returns
+        -------
+        table : `~astropy.table.Table`
+            A table of found objects with the same columns as the
+            `find_stars` output.  The sources are ordered by tile.
+        """
+
+        data = np.asanyarray(data)
+        ny, nx = data.shape
+        tiles = list(_map_tiles(
+            _find_stars_tile, data.shape, tile_size, self._tile_halo,
+            lambda core, ext: (self, data[ext[0]:ext[1], ext[2]:ext[3]]),
+            n_jobs=n_jobs, use_processes=use_processes))
+
+        results = []
+        for (y0, y1, x0, x1), (ty0, _, tx0, _), (tbl, found) in tiles:
+            if not found:
+                continue
+            tbl['xcentroid'] += tx0
+            tbl['ycentroid'] += ty0
+            xpix = np.clip(np.floor(tbl['xcentroid'] + 0.5), 0, nx - 1)
+            ypix = np.clip(np.floor(tbl['ycentroid'] + 0.5), 0, ny - 1)
+            keep = (xpix >= x0) & (xpix < x1) & (ypix >= y0) & (ypix < y1)
+            tbl.remove_column('id')
+            results.append(tbl[keep])
+
+        if len(results) == 0:
+            tbl = tiles[0][2][0]    # empty table
+        else:
+            tbl = vstack(results)
+            idcol = Column(name='id', data=np.arange(len(tbl)) + 1)
+            tbl.add_column(idcol, 0)
+        _warn_no_sources(tbl, len(results) > 0)
+        return tbl
+
+    @property
+    def _kernels(self):
+        """
+        The list of `_FindObjKernel` objects used by `find_stars` to
+        convolve the image, or `None` if the convolved images cannot be
+        passed to `find_stars` via its ``convolved_data`` cache.
+        """
+
+        return None
+
+    def find_stars_stack(self, data):
+        """
+        Find stars in each frame of a 3D stack of images (e.g. a time
+        series).
+
+        This is a generator that yields the table of found objects for
+        each frame, so that long sequences (e.g. a `numpy.memmap`) can
+        be processed with constant memory.  The finder kernels, the
+        convolved-image arrays, and the FFT buffers (including the
+        kernel FFTs) are created once and reused for all the frames.
+
+        Parameters
+        ----------
+        data : array_like
+            The 3D ``(nframes, ny, nx)`` stack of images.  Each frame
+            is converted to a float64 array before finding the stars.
+
+        Yields
+        ------
+        table : `~astropy.table.Table`
+            The table of found objects for each frame, with the same
+            columns as the `find_stars` output.
+        """
+
+        data = np.asanyarray(data)
+        if data.ndim != 3:
+            raise ValueError('data must be a 3D array.')
+
+        kernels = self._kernels
+        if kernels is None:
+            for frame in data:
+                yield self.find_stars(frame)
+            return
+
+        frame_data = np.empty(data.shape[1:])
+        keys = [_convolved_data_key(kernel, self.exclude_border)
+                for kernel in kernels]
+        convolved_data = [np.empty(data.shape[1:]) for _ in kernels]
+        workspace = {}
+        for frame in data:
+            frame_data[...] = frame
+            _filter_data_multi(frame_data, [kernel.kern for kernel in kernels],
+                               mode='constant', fill_value=0.0,
+                               output=convolved_data, workspace=workspace)
+            yield self.find_stars(frame_data,
+                                  convolved_data=dict(zip(keys,
+                                                          convolved_data)))
+
+
+def _find_stars_tile(args):
+    """
+    Find stars in a single (extended) image tile.
+
+    This is a module-level function so that it can be used with a pool
+    of worker processes.
+
+    Parameters
+    ----------
+    args : tuple
+        A tuple of the star finder object and the 2D tile array.
+
+    Returns
+    -------
+    table : `~astropy.table.Table`
+        The table of found objects.
+
+    found : bool
+        Whether any sources were found before the sharpness and
+        roundness criteria were applied.
+    """
+
+    # the warnings are issued once for the merged table
+    finder, data = args
+    return finder._find_stars(data)
+
+
+def _warn_no_sources(table, found):
+    """
+    Warn if the table of found objects is empty.
+
+    Parameters
+    ----------
+    table : `~astropy.table.Table`
+        The table of found objects.
+
+    found : bool
+        Whether any sources were found before the sharpness and
+        roundness criteria were applied.
+    """
+
+    if not found:
+        warnings.warn('No sources were found.', AstropyUserWarning)
+    elif len(table) == 0:
+        warnings.warn('Sources were found, but none pass the sharpness '
+                      'and roundness criteria.', AstropyUserWarning)
+
 
 class DAOStarFinder(StarFinderBase):
     """
@@ -233,17 +445,37 @@ class DAOStarFinder(StarFinderBase):
         self.sky = sky
         self.exclude_border = exclude_border
 
-    def find_stars(self, data):
+    @property
+    def _tile_halo(self):
+        # the centroid is within (kernel radius + 1) of the peak, and
+        # the peak search (with the kernel footprint) and the cutouts
+        # depend on the data within twice the kernel radius of the peak
+        daofind_kernel = _FindObjKernel(self.fwhm, self.ratio, self.theta,
+                                        self.sigma_radius)
+        radius = max(daofind_kernel.shape) // 2
+        return 3 * radius + 1
+
+    @property
+    def _kernels(self):
+        return [_FindObjKernel(self.fwhm, self.ratio, self.theta,
+                               self.sigma_radius)]
+
+    def find_stars(self, data, convolved_data=None):
+        tbl, found = self._find_stars(data, convolved_data=convolved_data)
+        _warn_no_sources(tbl, found)
+        return tbl
+
+    def _find_stars(self, data, convolved_data=None):
         daofind_kernel = _FindObjKernel(self.fwhm, self.ratio, self.theta,
                                         self.sigma_radius)
-        self.threshold *= daofind_kernel.relerr
-        objs = _findobjs(data, self.threshold, daofind_kernel,
-                         exclude_border=self.exclude_border)
-        tbl = _daofind_properties(objs, self.threshold, daofind_kernel,
+        threshold = self.threshold * daofind_kernel.relerr
+        objs = _findobjs(data, threshold, daofind_kernel,
+                         exclude_border=self.exclude_border,
+                         convolved_data=convolved_data)
+        tbl = _daofind_properties(objs, threshold, daofind_kernel,
                                   self.sky)
         if len(objs) == 0:
-            warnings.warn('No sources were found.', AstropyUserWarning)
-            return tbl     # empty table
+            return tbl, False     # empty table
         table_mask = ((tbl['sharpness'] > self.sharplo) &
                       (tbl['sharpness'] < self.sharphi) &
                       (tbl['roundness1'] > self.roundlo) &
@@ -253,10 +485,7 @@ class DAOStarFinder(StarFinderBase):
         tbl = tbl[table_mask]
         idcol = Column(name='id', data=np.arange(len(tbl)) + 1)
         tbl.add_column(idcol, 0)
-        if len(tbl) == 0:
-            warnings.warn('Sources were found, but none pass the sharpness '
-                          'and roundness criteria.', AstropyUserWarning)
-        return tbl
+        return tbl, True
 
 
 class IRAFStarFinder(StarFinderBase):
@@ -301,6 +530,17 @@ class IRAFStarFinder(StarFinderBase):
         Set to `True` to exclude sources found within half the size of
         the convolution kernel from the image borders.  The default is
         `False`, which is the mode used by `starfind`_.
+    minsep_method : {'footprint', 'kdtree'}, optional
+        The method used to enforce the minimum separation of the
+        detected objects.  ``'footprint'`` finds the local maxima
+        within a circular footprint with a radius of the minimum
+        separation, as in `starfind`_.  ``'kdtree'`` first finds the
+        local maxima within a 3x3 footprint and then, using a KD-tree,
+        removes those that have a brighter local maximum within the
+        minimum separation.  The ``'kdtree'`` method is much faster for
+        large separations, but may keep some objects that are close to
+        brighter pixels that are not local maxima themselves.  The
+        default is ``'footprint'``.
 
     See Also
     --------
@@ -315,7 +555,10 @@ class IRAFStarFinder(StarFinderBase):
 
     def __init__(self, threshold, fwhm, sigma_radius=1.5, minsep_fwhm=2.5,
                  sharplo=0.5, sharphi=2.0, roundlo=0.0, roundhi=0.2, sky=None,
-                 exclude_border=False):
+                 exclude_border=False, minsep_method='footprint'):
+        if minsep_method not in ('footprint', 'kdtree'):
+            raise ValueError('minsep_method must be "footprint" or '
+                             '"kdtree"')
         self.threshold = threshold
         self.fwhm = fwhm
         self.sigma_radius = sigma_radius
@@ -326,18 +569,42 @@ class IRAFStarFinder(StarFinderBase):
         self.roundhi = roundhi
         self.sky = sky
         self.exclude_border = exclude_border
+        self.minsep_method = minsep_method
 
-    def find_stars(self, data):
+    @property
+    def _tile_halo(self):
+        # the centroid is within (kernel radius + 1) of the peak, and
+        # the peak search (with a min_separation footprint) and the
+        # cutouts depend on the data within (kernel radius +
+        # max(min_separation, kernel radius)) of the peak
+        starfind_kernel = _FindObjKernel(self.fwhm, ratio=1.0, theta=0.0,
+                                         sigma_radius=self.sigma_radius)
+        radius = max(starfind_kernel.shape) // 2
+        min_separation = max(2, int((self.fwhm * self.minsep_fwhm) + 0.5))
+        return 2 * radius + 1 + max(min_separation, radius)
+
+    @property
+    def _kernels(self):
+        return [_FindObjKernel(self.fwhm, ratio=1.0, theta=0.0,
+                               sigma_radius=self.sigma_radius)]
+
+    def find_stars(self, data, convolved_data=None):
+        tbl, found = self._find_stars(data, convolved_data=convolved_data)
+        _warn_no_sources(tbl, found)
+        return tbl
+
+    def _find_stars(self, data, convolved_data=None):
         starfind_kernel = _FindObjKernel(self.fwhm, ratio=1.0, theta=0.0,
                                          sigma_radius=self.sigma_radius)
         min_separation = max(2, int((self.fwhm * self.minsep_fwhm) + 0.5))
         objs = _findobjs(data, self.threshold, starfind_kernel,
                          min_separation=min_separation,
-                         exclude_border=self.exclude_border)
+                         exclude_border=self.exclude_border,
+                         convolved_data=convolved_data,
+                         minsep_method=self.minsep_method)
         tbl = _irafstarfind_properties(objs, starfind_kernel, self.sky)
         if len(objs) == 0:
-            warnings.warn('No sources were found.', AstropyUserWarning)
-            return tbl     # empty table
+            return tbl, False     # empty table
         table_mask = ((tbl['sharpness'] > self.sharplo) &
                       (tbl['sharpness'] < self.sharphi) &
                       (tbl['roundness'] > self.roundlo) &
@@ -345,14 +612,247 @@ class IRAFStarFinder(StarFinderBase):
         tbl = tbl[table_mask]
         idcol = Column(name='id', data=np.arange(len(tbl)) + 1)
         tbl.add_column(idcol, 0)
+        return tbl, True
+
+
+class MultiScaleDAOStarFinder(StarFinderBase):
+    """
+    Detect stars in an image using the DAOFIND algorithm with several
+    kernel sizes and detection thresholds at once.
+
+    This is equivalent to running `DAOStarFinder` for each combination
+    of the input ``fwhm`` and ``threshold`` values and merging the
+    results, but the image is convolved only once for each ``fwhm``
+    (sharing the FFTs of the image between the kernels) and the sources
+    for all thresholds are found from a single convolved image.
+
+    Each source is listed with the properties found by `DAOStarFinder`
+    at the highest ``threshold`` it exceeds.  Sources found with
+    different ``fwhm`` values whose centroids are within
+    ``merge_radius`` of each other are considered to be the same star,
+    and only the most significant detection (i.e. the one with the
+    highest peak density in the convolved image relative to its noise)
+    is kept.
+
+    Parameters
+    ----------
+    threshold : float or array_like
+        The absolute image value(s) above which to select sources.
+    fwhm : array_like
+        The full-width half-maximum (FWHM) values of the major axis of
+        the Gaussian kernels in units of pixels.
+    ratio : float, optional
+        The ratio of the minor to major axis standard deviations of the
+        Gaussian kernels.  ``ratio`` must be strictly positive and less
+        than or equal to 1.0.  The default is 1.0 (i.e., circular
+        Gaussian kernels).
+    theta : float, optional
+        The position angle (in degrees) of the major axis of the
+        Gaussian kernels measured counter-clockwise from the positive x
+        axis.
+    sigma_radius : float, optional
+        The truncation radius of the Gaussian kernels in units of sigma
+        (standard deviation) [``1 sigma = FWHM /
+        (2.0*sqrt(2.0*log(2.0)))``].
+    sharplo : float, optional
+        The lower bound on sharpness for object detection.
+    sharphi : float, optional
+        The upper bound on sharpness for object detection.
+    roundlo : float, optional
+        The lower bound on roundess for object detection.
+    roundhi : float, optional
+        The upper bound on roundess for object detection.
+    sky : float, optional
+        The background sky level of the image.  Setting ``sky`` affects
+        only the output values of the object ``peak``, ``flux``, and
+        ``mag`` values.
+    exclude_border : bool, optional
+        Set to `True` to exclude sources found within half the size of
+        the convolution kernels from the image borders.
+    merge_radius : float, optional
+        The maximum distance (in pixels) between the centroids of
+        sources found with different ``fwhm`` values for them to be
+        merged.  If `None`, then the smallest ``fwhm`` is used.
+
+    See Also
+    --------
+    DAOStarFinder
+    """
+
+    def __init__(self, threshold, fwhm, ratio=1.0, theta=0.0,
+                 sigma_radius=1.5, sharplo=0.2, sharphi=1.0, roundlo=-1.0,
+                 roundhi=1.0, sky=0.0, exclude_border=False,
+                 merge_radius=None):
+        self.threshold = threshold
+        self.fwhm = fwhm
+        self.ratio = ratio
+        self.theta = theta
+        self.sigma_radius = sigma_radius
+        self.sharplo = sharplo
+        self.sharphi = sharphi
+        self.roundlo = roundlo
+        self.roundhi = roundhi
+        self.sky = sky
+        self.exclude_border = exclude_border
+        self.merge_radius = merge_radius
+
+    @property
+    def _kernels(self):
+        return [_FindObjKernel(fwhm, self.ratio, self.theta,
+                               self.sigma_radius)
+                for fwhm in np.atleast_1d(self.fwhm)]
+
+    def find_stars(self, data, convolved_data=None):
+        """
+        Find stars in an astronomical image.
+
+        Parameters
+        ----------
+        data : array_like
+            The 2D image array.
+
+        convolved_data : dict, optional
+            A (initially empty) `dict` used as a cache of the convolved
+            images of ``data``, keyed by the kernel parameters.  It can
+            be shared with `DAOStarFinder` and `IRAFStarFinder` objects
+            run on the same ``data`` (see
+            `StarFinderBase.find_stars`).
+
+        Returns
+        -------
+        table : `~astropy.table.Table`
+            A table of found objects with the same columns as the
+            `DAOStarFinder` output, plus the ``fwhm`` and ``threshold``
+            with which each object was found.
+        """
+
+        from scipy.spatial import cKDTree
+
+        if convolved_data is None:
+            convolved_data = {}
+        elif not isinstance(convolved_data, dict):
+            raise ValueError('convolved_data must be a dict cache of '
+                             'convolved images.')
+
+        fwhms = np.atleast_1d(self.fwhm)
+        thresholds = np.sort(np.atleast_1d(self.threshold))
+        kernels = self._kernels
+
+        if not self.exclude_border:
+            data = np.asanyarray(data, dtype=np.float64)
+        keys = [_convolved_data_key(kernel, self.exclude_border)
+                for kernel in kernels]
+        missing = [i for i, key in enumerate(keys)
+                   if key not in convolved_data]
+        convolved = _filter_data_multi(
+            data, [kernels[i].kern for i in missing], mode='constant',
+            fill_value=0.0)
+        for i, conv_data in zip(missing, convolved):
+            convolved_data[keys[i]] = conv_data
+
+        tables = []
+        significance = []
+        for kernel in kernels:
+            tbl, snr = self._find_stars_kernel(data, kernel, thresholds,
+                                               convolved_data)
+            tables.append(tbl)
+            significance.append(snr)
+
+        tbl = vstack(tables)
         if len(tbl) == 0:
-            warnings.warn('Sources were found, but none pass the sharpness '
-                          'and roundness criteria.', AstropyUserWarning)
+            warnings.warn('No sources were found.', AstropyUserWarning)
+            return tbl     # empty table
+
+        # merge the detections of the same star found with different
+        # kernels, keeping the most significant detection
+        merge_radius = self.merge_radius
+        if merge_radius is None:
+            merge_radius = np.min(fwhms)
+        significance = np.concatenate(significance)
+        kernel_idx = np.concatenate([np.zeros(len(tbl_), dtype=int) + i
+                                     for i, tbl_ in enumerate(tables)])
+        positions = np.transpose([tbl['xcentroid'], tbl['ycentroid']])
+        neighbors = cKDTree(positions).query_ball_point(positions,
+                                                        merge_radius)
+        keep = np.zeros(len(tbl), dtype=bool)
+        rejected = np.zeros(len(tbl), dtype=bool)
+        for idx in np.argsort(-significance, kind='mergesort'):
+            if rejected[idx]:
+                continue
+            keep[idx] = True
+            nearby = np.array(neighbors[idx], dtype=int)
+            rejected[nearby[kernel_idx[nearby] != kernel_idx[idx]]] = True
+
+        tbl = tbl[keep]
+        idcol = Column(name='id', data=np.arange(len(tbl)) + 1)
+        tbl.add_column(idcol, 0)
         return tbl
 
+    def _find_stars_kernel(self, data, kernel, thresholds, convolved_data):
+        """
+        Find the stars for a single kernel and all thresholds.
+
+        The sources are found once at the lowest threshold.  Because
+        the peaks found at a higher threshold are the subset of those
+        with a higher peak density, each source is assigned to the
+        highest threshold it exceeds and its properties are calculated
+        with that threshold.
+
+        Returns the table of sources that pass the sharpness and
+        roundness criteria and their detection significance.
+        """
+
+        conv_thresholds = thresholds * kernel.relerr
+        objs = _findobjs(data, conv_thresholds[0], kernel,
+                         exclude_border=self.exclude_border,
+                         convolved_data=convolved_data)
+
+        ykcen, xkcen = kernel.center
+        convpeak = np.array([obj.convdata[ykcen, xkcen] for obj in objs])
+        level = np.searchsorted(conv_thresholds, convpeak, side='left') - 1
+
+        tables = []
+        order = []
+        for lvl in np.unique(level):
+            idx = np.nonzero(level == lvl)[0]
+            tbl = _daofind_properties([objs[i] for i in idx],
+                                      conv_thresholds[lvl], kernel, self.sky)
+            tbl['fwhm'] = np.zeros(len(tbl)) + kernel.fwhm
+            tbl['threshold'] = np.zeros(len(tbl)) + thresholds[lvl]
+            tables.append(tbl)
+            order.append(idx)
+
+        if len(tables) == 0:
+            tbl = _daofind_properties([], conv_thresholds[0], kernel,
+                                      self.sky)
+            tbl['fwhm'] = np.zeros(0)
+            tbl['threshold'] = np.zeros(0)
+            return tbl, np.zeros(0)
+
+        tbl = vstack(tables)[np.argsort(np.concatenate(order))]
+        table_mask = ((tbl['sharpness'] > self.sharplo) &
+                      (tbl['sharpness'] < self.sharphi) &
+                      (tbl['roundness1'] > self.roundlo) &
+                      (tbl['roundness1'] < self.roundhi) &
+                      (tbl['roundness2'] > self.roundlo) &
+                      (tbl['roundness2'] < self.roundhi))
+
+        return tbl[table_mask], (convpeak / kernel.relerr)[table_mask]
+
+
+def _convolved_data_key(kernel, exclude_border):
+    """
+    The key of the convolved image made with ``kernel`` in a
+    ``convolved_data`` cache.
+    """
+
+    return (kernel.fwhm, kernel.ratio, kernel.theta, kernel.sigma_radius,
+            exclude_border)
+
 
 def _findobjs(data, threshold, kernel, min_separation=None,
-              exclude_border=False, local_peaks=True):
+              exclude_border=False, local_peaks=True, convolved_data=None,
+              minsep_method='footprint'):
     """
     Find sources in an image by convolving the image with the input
     kernel and selecting connected pixels above a given threshold.
@@ -382,6 +882,15 @@ def _findobjs(data, threshold, kernel, min_separation=None,
         local peaks.  If `False`, then only one peak per thresholded
         segment will be used.
 
+    convolved_data : array_like or dict, optional
+        The precomputed convolved image, or a `dict` cache of convolved
+        images keyed by the kernel parameters (see
+        `StarFinderBase.find_stars`).
+
+    minsep_method : {'footprint', 'kdtree'}, optional
+        The method used to enforce ``min_separation`` (see
+        `IRAFStarFinder`).
+
     Returns
     -------
     objects : list of `_ImgCutout`
@@ -399,23 +908,28 @@ def _findobjs(data, threshold, kernel, min_separation=None,
     y_kernradius = kernel.kern.shape[0] // 2
 
     if not exclude_border:
-        # create a larger image padded by zeros
-        ysize = int(data.shape[0] + (2. * y_kernradius))
-        xsize = int(data.shape[1] + (2. * x_kernradius))
-        data_padded = np.zeros((ysize, xsize))
-        data_padded[y_kernradius:y_kernradius + data.shape[0],
-                    x_kernradius:x_kernradius + data.shape[1]] = data
-        data = data_padded
-
-    convolved_data = filter_data(data, kernel.kern, mode='constant',
-                                 fill_value=0.0, check_normalization=False)
-
-    if not exclude_border:
-        # keep border=0 in convolved data
-        convolved_data[:y_kernradius, :] = 0.
-        convolved_data[-y_kernradius:, :] = 0.
-        convolved_data[:, :x_kernradius] = 0.
-        convolved_data[:, -x_kernradius:] = 0.
+        # the image is treated as if it were padded by zeros (using the
+        # convolution mode and the cutout extraction below) and the
+        # convolution is performed in floating point
+        data = np.asanyarray(data, dtype=np.float64)
+
+    cache = None
+    if isinstance(convolved_data, dict):
+        cache = convolved_data
+        cache_key = _convolved_data_key(kernel, exclude_border)
+        convolved_data = cache.get(cache_key)
+
+    if convolved_data is None:
+        convolved_data = filter_data(data, kernel.kern, mode='constant',
+                                     fill_value=0.0,
+                                     check_normalization=False)
+        if cache is not None:
+            cache[cache_key] = convolved_data
+    else:
+        convolved_data = np.asanyarray(convolved_data)
+        if convolved_data.shape != np.shape(data):
+            raise ValueError('convolved_data and data must have the same '
+                             'shape')
 
     selem = ndimage.generate_binary_structure(2, 2)
     object_labels, nobjects = ndimage.label(convolved_data > threshold,
@@ -429,10 +943,17 @@ def _findobjs(data, threshold, kernel, min_separation=None,
         # footprint overrides min_separation in find_peaks
         if min_separation is None:   # daofind
             footprint = kernel.mask.astype(np.bool)
+            tbl = find_peaks(convolved_data, threshold, footprint=footprint)
+        elif minsep_method == 'kdtree':
+            tbl = find_peaks(convolved_data, threshold, box_size=3)
+            if len(tbl) > 0:
+                tbl = tbl[_min_separation_mask(tbl['x_peak'], tbl['y_peak'],
+                                               tbl['peak_value'],
+                                               min_separation)]
         else:
             from skimage.morphology import disk
             footprint = disk(min_separation)
-        tbl = find_peaks(convolved_data, threshold, footprint=footprint)
+            tbl = find_peaks(convolved_data, threshold, footprint=footprint)
         coords = np.transpose([tbl['y_peak'], tbl['x_peak']])
     else:
         object_slices = ndimage.find_objects(object_labels)
@@ -453,26 +974,75 @@ def _findobjs(data, threshold, kernel, min_separation=None,
         x1 = xpeak + x_kernradius + 1
         y0 = ypeak - y_kernradius
         y1 = ypeak + y_kernradius + 1
-        if x0 < 0 or x1 > data.shape[1]:
-            continue    # pragma: no cover (isolated continue is never tested)
-        if y0 < 0 or y1 > data.shape[0]:
-            continue    # pragma: no cover (isolated continue is never tested)
-        object_data = data[y0:y1, x0:x1]
-        object_convolved_data = convolved_data[y0:y1, x0:x1].copy()
-        if not exclude_border:
-            # correct for image padding
-            x0 -= x_kernradius
-            y0 -= y_kernradius
+        if exclude_border:
+            if x0 < 0 or x1 > data.shape[1]:
+                continue    # pragma: no cover
+            if y0 < 0 or y1 > data.shape[0]:
+                continue    # pragma: no cover
+            object_data = data[y0:y1, x0:x1]
+            object_convolved_data = convolved_data[y0:y1, x0:x1].copy()
+        else:
+            # cutout pixels outside of the image are zero
+            object_data = np.zeros(kernel.shape)
+            object_convolved_data = np.zeros(kernel.shape)
+            ys0, ys1 = max(y0, 0), min(y1, data.shape[0])
+            xs0, xs1 = max(x0, 0), min(x1, data.shape[1])
+            cutout_slc = (slice(ys0 - y0, ys1 - y0),
+                          slice(xs0 - x0, xs1 - x0))
+            object_data[cutout_slc] = data[ys0:ys1, xs0:xs1]
+            object_convolved_data[cutout_slc] = convolved_data[ys0:ys1,
+                                                               xs0:xs1]
         imgcutout = _ImgCutout(object_data, object_convolved_data, x0, y0)
         objects.append(imgcutout)
     return objects
 
 
+def _min_separation_mask(x, y, values, min_separation):
+    """
+    Find the peaks that do not have a brighter peak within
+    ``min_separation`` pixels.
+
+    Parameters
+    ----------
+    x, y : array_like
+        The pixel coordinates of the peaks.
+
+    values : array_like
+        The peak values.
+
+    min_separation : float
+        The minimum separation (in pixels) between peaks.
+
+    Returns
+    -------
+    mask : `~numpy.ndarray` (bool)
+        A boolean array that is `True` for the peaks to keep.
+    """
+
+    from scipy.spatial import cKDTree
+
+    values = np.asanyarray(values)
+    pairs = cKDTree(np.transpose([x, y])).query_pairs(
+        min_separation, output_type='ndarray')
+    mask = np.ones(len(values), dtype=bool)
+    if len(pairs) > 0:
+        vals1 = values[pairs[:, 0]]
+        vals2 = values[pairs[:, 1]]
+        mask[pairs[:, 0][vals1 < vals2]] = False
+        mask[pairs[:, 1][vals2 < vals1]] = False
+
+    return mask
+
+
 def _irafstarfind_properties(imgcutouts, kernel, sky=None):
     """
     Find the properties of each detected source, as defined by IRAF's
     ``starfind``.
 
+    The image cutouts of all sources are stacked into 3D arrays so that
+    the sky levels and image moments are computed with array operations
+    over all sources at once.
+
     Parameters
     ----------
     imgcutouts : list of `_ImgCutout`
@@ -494,82 +1064,101 @@ def _irafstarfind_properties(imgcutouts, kernel, sky=None):
         A table of the objects' properties.
     """
 
-    result = defaultdict(list)
-    for imgcutout in imgcutouts:
-        if sky is None:
-            skymask = ~kernel.mask.astype(np.bool)   # 1=sky, 0=obj
-            nsky = np.count_nonzero(skymask)
-            if nsky == 0:
-                meansky = imgcutout.data.max() - imgcutout.convdata.max()
-            else:
-                meansky = (imgcutout.data * skymask).sum() / nsky
-        else:
-            meansky = sky
-        objvals = _irafstarfind_moments(imgcutout, kernel, meansky)
-        for key, val in objvals.items():
-            result[key].append(val)
     names = ['xcentroid', 'ycentroid', 'fwhm', 'sharpness', 'roundness',
              'pa', 'npix', 'sky', 'peak', 'flux', 'mag']
-    if len(result) == 0:
-        for name in names:
-            result[name] = []
+    if len(imgcutouts) == 0:
+        return Table({name: [] for name in names}, names=names)
+
+    # (nsources, ny, nx) stacks of the cutouts
+    data = np.array([imgcutout.data for imgcutout in imgcutouts])
+    x0 = np.array([imgcutout.x0 for imgcutout in imgcutouts])
+    y0 = np.array([imgcutout.y0 for imgcutout in imgcutouts])
+
+    if sky is None:
+        skymask = ~kernel.mask.astype(np.bool)   # 1=sky, 0=obj
+        nsky = np.count_nonzero(skymask)
+        if nsky == 0:
+            convdata = np.array([imgcutout.convdata
+                                 for imgcutout in imgcutouts])
+            meansky = (data.max(axis=(1, 2)) -
+                       convdata.max(axis=(1, 2)))
+        else:
+            meansky = (data * skymask).sum(axis=(1, 2)) / nsky
+    else:
+        meansky = np.zeros(len(imgcutouts)) + sky
+
+    result = _irafstarfind_moments(data, kernel, meansky)
+
+    # starfind discards sources with less than two positive pixels
+    good = result.pop('good')
+    result['sky'] = meansky[good]
+    result['xcentroid'] += x0[good]
+    result['ycentroid'] += y0[good]
+
     table = Table(result, names=names)
     return table
 
 
-def _irafstarfind_moments(imgcutout, kernel, sky):
+def _irafstarfind_moments(data, kernel, sky):
     """
     Find the properties of each detected source, as defined by IRAF's
     ``starfind``.
 
     Parameters
     ----------
-    imgcutout : `_ImgCutout`
-        The image cutout for a single detected source.
+    data : 3D `~numpy.ndarray`
+        The ``(nsources, ny, nx)`` stack of the image cutouts of the
+        detected sources.
 
     kernel : `_FindObjKernel`
         The convolution kernel.  The dimensions should match those of
-        ``imgcutout``.  ``kernel.gkernel`` should have a peak pixel
-        value of 1.0 and not contain any masked pixels.
+        the cutouts.  ``kernel.gkernel`` should have a peak pixel value
+        of 1.0 and not contain any masked pixels.
 
-    sky : float
-        The local sky level around the source.
+    sky : 1D `~numpy.ndarray`
+        The local sky level around each source.
 
     Returns
     -------
     result : dict
-        A dictionary of the object parameters.
+        A dictionary of the object parameters.  The parameters are
+        1D arrays for the sources with more than one positive pixel
+        (as given by the boolean ``good`` array, also in ``result``).
+        The centroids are relative to the cutouts.
     """
 
-    from skimage.measure import moments, moments_central
-
-    result = defaultdict(list)
-    img = np.array((imgcutout.data - sky) * kernel.mask)
+    img = (data - sky[:, np.newaxis, np.newaxis]) * kernel.mask
     img = np.where(img > 0, img, 0)    # starfind discards negative pixels
-    if np.count_nonzero(img) <= 1:
-        return {}
-    m = moments(img, 1)
-    result['xcentroid'] = m[1, 0] / m[0, 0]
-    result['ycentroid'] = m[0, 1] / m[0, 0]
-    result['npix'] = float(np.count_nonzero(img))   # float for easier testing
-    result['sky'] = sky
-    result['peak'] = np.max(img)
-    flux = img.sum()
+    npix = (img > 0).sum(axis=(1, 2))
+    good = (npix > 1)
+    img = img[good]
+
+    result = {'good': good}
+    yy, xx = np.mgrid[0:img.shape[1], 0:img.shape[2]]
+    flux = img.sum(axis=(1, 2))
+    xcentroid = (img * xx).sum(axis=(1, 2)) / flux
+    ycentroid = (img * yy).sum(axis=(1, 2)) / flux
+    result['xcentroid'] = xcentroid
+    result['ycentroid'] = ycentroid
+    result['npix'] = npix[good].astype(float)   # float for easier testing
+    result['peak'] = img.max(axis=(1, 2))
     result['flux'] = flux
     result['mag'] = -2.5 * np.log10(flux)
-    mu = moments_central(
-        img, result['ycentroid'], result['xcentroid'], 2) / m[0, 0]
-    musum = mu[2, 0] + mu[0, 2]
-    mudiff = mu[2, 0] - mu[0, 2]
+
+    # second-order central moments
+    dx = xx - xcentroid[:, np.newaxis, np.newaxis]
+    dy = yy - ycentroid[:, np.newaxis, np.newaxis]
+    mu_xx = (img * dx**2).sum(axis=(1, 2)) / flux
+    mu_yy = (img * dy**2).sum(axis=(1, 2)) / flux
+    mu_xy = (img * dx * dy).sum(axis=(1, 2)) / flux
+    musum = mu_xx + mu_yy
+    mudiff = mu_xx - mu_yy
     result['fwhm'] = 2.0 * np.sqrt(np.log(2.0) * musum)
     result['sharpness'] = result['fwhm'] / kernel.fwhm
-    result['roundness'] = np.sqrt(mudiff**2 + 4.0*mu[1, 1]**2) / musum
-    pa = 0.5 * np.arctan2(2.0 * mu[1, 1], mudiff) * (180.0 / np.pi)
-    if pa < 0.0:
-        pa += 180.0
+    result['roundness'] = np.sqrt(mudiff**2 + 4.0*mu_xy**2) / musum
+    pa = 0.5 * np.arctan2(2.0 * mu_xy, mudiff) * (180.0 / np.pi)
+    pa[pa < 0.0] += 180.0
     result['pa'] = pa
-    result['xcentroid'] += imgcutout.x0
-    result['ycentroid'] += imgcutout.y0
     return result
 
 
@@ -578,6 +1167,10 @@ def _daofind_properties(imgcutouts, threshold, kernel, sky=0.0):
     Find the properties of each detected source, as defined by
     `DAOFIND`_.
 
+    The image cutouts of all sources are stacked into 3D arrays so that
+    the source properties are computed with array operations over all
+    sources at once.
+
     Parameters
     ----------
     imgcutouts : list of `_ImgCutout`
@@ -604,49 +1197,53 @@ def _daofind_properties(imgcutouts, threshold, kernel, sky=0.0):
     .. _DAOFIND: http://stsdas.stsci.edu/cgi-bin/gethelp.cgi?daofind
     """
 
-    result = defaultdict(list)
-    ykcen, xkcen = kernel.center
-    for imgcutout in imgcutouts:
-        convobj = imgcutout.convdata.copy()
-        convobj[ykcen, xkcen] = 0.0
-        q1 = convobj[0:ykcen+1, xkcen+1:]
-        q2 = convobj[0:ykcen, 0:xkcen+1]
-        q3 = convobj[ykcen:, 0:xkcen]
-        q4 = convobj[ykcen+1:, xkcen:]
-        sum2 = -q1.sum() + q2.sum() - q3.sum() + q4.sum()
-        sum4 = np.abs(convobj).sum()
-        result['roundness1'].append(2.0 * sum2 / sum4)
-
-        obj = imgcutout.data
-        objpeak = obj[ykcen, xkcen]
-        convpeak = imgcutout.convdata[ykcen, xkcen]
-        npts = kernel.mask.sum()
-        obj_masked = obj * kernel.mask
-        objmean = (obj_masked.sum() - objpeak) / (npts - 1)   # exclude peak
-        sharp = (objpeak - objmean) / convpeak
-        result['sharpness'].append(sharp)
-
-        dx, dy, g_roundness = _daofind_centroid_roundness(obj, kernel)
-        yc, xc = imgcutout.center
-        result['xcentroid'].append(xc + dx)
-        result['ycentroid'].append(yc + dy)
-        result['roundness2'].append(g_roundness)
-        result['sky'].append(sky)      # DAOFIND uses sky=0
-        result['npix'].append(float(obj.size))
-        result['peak'].append(objpeak - sky)
-        flux = (convpeak / threshold) - (sky * obj.size)
-        result['flux'].append(flux)
-        if flux <= 0:
-            mag = np.nan
-        else:
-            mag = -2.5 * np.log10(flux)
-        result['mag'].append(mag)
-
     names = ['xcentroid', 'ycentroid', 'sharpness', 'roundness1', 'roundness2',
              'npix', 'sky', 'peak', 'flux', 'mag']
-    if len(result) == 0:
-        for name in names:
-            result[name] = []
+    if len(imgcutouts) == 0:
+        return Table({name: [] for name in names}, names=names)
+
+    # (nsources, ny, nx) stacks of the cutouts
+    obj = np.array([imgcutout.data for imgcutout in imgcutouts])
+    convdata = np.array([imgcutout.convdata for imgcutout in imgcutouts])
+    nsources = len(imgcutouts)
+
+    result = {}
+    ykcen, xkcen = kernel.center
+    convobj = convdata.copy()
+    convobj[:, ykcen, xkcen] = 0.0
+    q1 = convobj[:, 0:ykcen+1, xkcen+1:]
+    q2 = convobj[:, 0:ykcen, 0:xkcen+1]
+    q3 = convobj[:, ykcen:, 0:xkcen]
+    q4 = convobj[:, ykcen+1:, xkcen:]
+    sum2 = (-q1.sum(axis=(1, 2)) + q2.sum(axis=(1, 2)) -
+            q3.sum(axis=(1, 2)) + q4.sum(axis=(1, 2)))
+    sum4 = np.abs(convobj).sum(axis=(1, 2))
+    result['roundness1'] = 2.0 * sum2 / sum4
+
+    objpeak = obj[:, ykcen, xkcen]
+    convpeak = convdata[:, ykcen, xkcen]
+    npts = kernel.mask.sum()
+    obj_masked = obj * kernel.mask
+    objmean = (obj_masked.sum(axis=(1, 2)) - objpeak) / (npts - 1)
+    result['sharpness'] = (objpeak - objmean) / convpeak
+
+    dx, dy, g_roundness = _daofind_centroid_roundness(obj, kernel)
+    yc = np.array([imgcutout.center[0] for imgcutout in imgcutouts])
+    xc = np.array([imgcutout.center[1] for imgcutout in imgcutouts])
+    result['xcentroid'] = xc + dx
+    result['ycentroid'] = yc + dy
+    result['roundness2'] = g_roundness
+    result['sky'] = np.zeros(nsources) + sky      # DAOFIND uses sky=0
+    npix = obj[0].size
+    result['npix'] = np.zeros(nsources) + float(npix)
+    result['peak'] = objpeak - sky
+    flux = (convpeak / threshold) - (sky * npix)
+    result['flux'] = flux
+    mag = np.zeros(nsources) + np.nan
+    positive = (flux > 0)
+    mag[positive] = -2.5 * np.log10(flux[positive])
+    result['mag'] = mag
+
     table = Table(result, names=names)
     return table
 
@@ -670,20 +1267,20 @@ def _daofind_centroid_roundness(obj, kernel):
     Parameters
     ----------
     obj : array_like
-        The 2D array of the source cutout.
+        The 3D ``(nsources, ny, nx)`` stack of the source cutouts.
 
     kernel : `_FindObjKernel`
         The convolution kernel.  The dimensions should match those of
-        ``obj``.  ``kernel.gkernel`` should have a peak pixel value of
-        1.0 and not contain any masked pixels.
+        the cutouts in ``obj``.  ``kernel.gkernel`` should have a peak
+        pixel value of 1.0 and not contain any masked pixels.
 
     Returns
     -------
-    dx, dy : float
+    dx, dy : 1D `~numpy.ndarray`
         Fractional shift in x and y of the image centroid relative to
         the maximum pixel.
 
-    g_roundness : float
+    g_roundness : 1D `~numpy.ndarray`
         `DAOFIND`_ roundness (GROUND) statistic.
 
     .. _DAOFIND: http://stsdas.stsci.edu/cgi-bin/gethelp.cgi?daofind
@@ -703,12 +1300,12 @@ def _daofind_centroidfit(obj, kernel, axis):
     Parameters
     ----------
     obj : array_like
-        The 2D array of the source cutout.
+        The 3D ``(nsources, ny, nx)`` stack of the source cutouts.
 
     kernel : `_FindObjKernel`
         The convolution kernel.  The dimensions should match those of
-        ``obj``.  ``kernel.gkernel`` should have a peak pixel value of
-        1.0 and not contain any masked pixels.
+        the cutouts in ``obj``.  ``kernel.gkernel`` should have a peak
+        pixel value of 1.0 and not contain any masked pixels.
 
     axis : {0, 1}
         The axis for which the centroid is computed:
@@ -718,11 +1315,11 @@ def _daofind_centroidfit(obj, kernel, axis):
 
     Returns
     -------
-    dx : float
+    dx : 1D `~numpy.ndarray`
         Fractional shift in x or y (depending on ``axis`` value) of the
         image centroid relative to the maximum pixel.
 
-    hx : float
+    hx : 1D `~numpy.ndarray`
         Height of the best-fitting Gaussian to the marginal x or y
         (depending on ``axis`` value) distribution of the unconvolved
         source data.
@@ -759,26 +1356,30 @@ def _daofind_centroidfit(obj, kernel, axis):
     sdgdx = (wt * dgdx).sum()
     sdgdx2 = (wt * dgdx**2).sum()
     sgdgdx = (wt * sg * dgdx).sum()
-    sd = (obj * wts).sum(axis)
-    sumd = (wt * sd).sum()
-    sumgd = (wt * sg * sd).sum()
-    sddgdx = (wt * sd * dgdx).sum()
-    sumdx = (wt * sd * sumdx_vec).sum()
+
+    # the marginal distributions of all sources: (nsources, ksize)
+    sd = (obj * wts).sum(axis + 1)
+    sumd = np.dot(sd, wt)
+    sumgd = np.dot(sd, wt * sg)
+    sddgdx = np.dot(sd, wt * dgdx)
+    sumdx = np.dot(sd, wt * sumdx_vec)
     # linear least-squares fit (data = sky + hx*gkernel) to find amplitudes
     denom = (n*sumg2 - sumg**2)
     hx = (n*sumgd - sumg*sumd) / denom
     # sky = (sumg2*sumd - sumg*sumgd) / denom
     dx = (sgdgdx - (sddgdx - sdgdx*sumd)) / (hx * sdgdx2 / kernel_sigma**2)
 
+    # if the fit is off the cutout, use the weighted centroid instead
+    # (or 0 if it is also off the cutout)
     hsize = (ksize / 2.)
-    if abs(dx) > hsize:
-        dx = 0
-        if sumd == 0:
-            dx = 0.0
-        else:
-            dx = float(sumdx / sumd)
-            if abs(dx) > hsize:
-                dx = 0.0
+    badfit = (np.abs(dx) > hsize)
+    if np.any(badfit):
+        dx_wt = np.zeros(sumd.shape)
+        nonzero = badfit & (sumd != 0)
+        dx_wt[nonzero] = sumdx[nonzero] / sumd[nonzero]
+        dx_wt[np.abs(dx_wt) > hsize] = 0.0
+        dx[badfit] = dx_wt[badfit]
+
     return dx, hx
 
 
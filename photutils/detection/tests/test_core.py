@@ -5,6 +5,7 @@ from __future__ import (absolute_import, division, print_function,
 import numpy as np
 from numpy.testing import assert_array_equal, assert_allclose
 from astropy.tests.helper import pytest
+from astropy.modeling.models import Gaussian2D
 from astropy.wcs import WCS
 
 from ..core import detect_threshold, find_peaks
@@ -91,6 +92,48 @@ class TestDetectThreshold(object):
         ref = 12. * np.ones((3, 3))
         assert_allclose(threshold, ref)
 
+    def test_broadcast(self):
+        """Test that scalar inputs do not create full-sized images."""
+
+        threshold = detect_threshold(DATA, snr=2.0, background=10., error=1.)
+        assert threshold.shape == DATA.shape
+        assert not threshold.flags.writeable
+        assert threshold.strides == (0, 0)
+
+        background = np.array([[1., 2., 3.]])
+        threshold = detect_threshold(DATA, snr=2.0, background=background,
+                                     error=1.)
+        assert_allclose(threshold, np.ones((3, 3)) * [3., 4., 5.])
+
+    def test_background2d(self):
+        from ...background import Background2D
+
+        data = np.random.RandomState(0).normal(10., 2., size=(50, 60))
+        bkg = Background2D(data, (10, 12), filter_size=(1, 1))
+        ref = bkg.background + 2. * bkg.background_rms
+        threshold = detect_threshold(data, snr=2.0, background=bkg)
+        assert_allclose(threshold, ref)
+
+        threshold = detect_threshold(data, snr=2.0, background=bkg,
+                                     error=1.)
+        assert_allclose(threshold, bkg.background + 2.)
+
+        with pytest.raises(ValueError):
+            detect_threshold(data[:10], snr=2.0, background=bkg)
+
+    def test_background2d_nonlinear_interpolator(self):
+        from ...background import Background2D, BkgZoomInterpolator
+
+        def interpolator(mesh, bkg2d_obj):
+            return BkgZoomInterpolator()(mesh, bkg2d_obj)**2
+
+        data = np.random.RandomState(0).normal(10., 2., size=(50, 60))
+        bkg = Background2D(data, (10, 12), filter_size=(1, 1),
+                           interpolator=interpolator)
+        ref = bkg.background + 2. * bkg.background_rms
+        threshold = detect_threshold(data, snr=2.0, background=bkg)
+        assert_allclose(threshold, ref)
+
     def test_mask_value(self):
         """Test detection with mask_value."""
 
@@ -146,6 +189,21 @@ class TestFindPeaks(object):
         with pytest.raises(ValueError):
             find_peaks(PEAKDATA, 0.1, box_size=2, subpixel=True)
 
+    @pytest.mark.skipif('not HAS_SKIMAGE')
+    def test_subpixel(self):
+        """Test the subpixel centroids, including a peak near an edge."""
+
+        y, x = np.mgrid[0:40, 0:50]
+        xcen = [20.3, 1.2]
+        ycen = [15.6, 30.4]
+        data = (Gaussian2D(10., xcen[0], ycen[0], 2.0, 1.5)(x, y) +
+                Gaussian2D(5., xcen[1], ycen[1], 1.5, 1.5)(x, y))
+        tbl = find_peaks(data, 1., box_size=9, subpixel=True)
+        assert_array_equal(tbl['fit_converged'], True)
+        assert_allclose(tbl['x_centroid'], xcen, atol=1.e-5)
+        assert_allclose(tbl['y_centroid'], ycen, atol=1.e-5)
+        assert_allclose(tbl['fit_peak_value'], [10., 5.], atol=1.e-5)
+
     def test_mask(self):
         """Test with mask."""
 
@@ -176,6 +234,40 @@ class TestFindPeaks(object):
         tbl = find_peaks(PEAKDATA, 0.1, box_size=3, border_width=3)
         assert_array_equal(len(tbl), 0)
 
+    def test_border_width_zero(self):
+        """Test that border_width=0 does not exclude any peaks."""
+
+        tbl1 = find_peaks(PEAKDATA, 0.1, box_size=3)
+        tbl2 = find_peaks(PEAKDATA, 0.1, box_size=3, border_width=0)
+        assert_array_equal(tbl1, tbl2)
+
+    @pytest.mark.parametrize('threshold', [0.5, 0.99])
+    def test_sparse_candidates(self, threshold):
+        """
+        Test that the results are the same as a full-image maximum
+        filter when few (or many) pixels are above the threshold.
+        """
+
+        from scipy import ndimage
+
+        data = np.random.RandomState(0).uniform(size=(60, 70))
+        footprint = np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]], dtype=bool)
+        data_max = ndimage.maximum_filter(data, footprint=footprint,
+                                          mode='constant', cval=0.0)
+        peaks = (data == data_max) & (data > threshold)
+        peaks[:2] = peaks[-2:] = peaks[:, :2] = peaks[:, -2:] = False
+        y_ref, x_ref = peaks.nonzero()
+        tbl = find_peaks(data, threshold, footprint=footprint,
+                         border_width=2)
+        assert_array_equal(tbl['x_peak'], x_ref)
+        assert_array_equal(tbl['y_peak'], y_ref)
+
+        tbl = find_peaks(data, threshold, footprint=footprint,
+                         border_width=2, npeaks=5)
+        idx = np.argsort(data[y_ref, x_ref])[::-1][:5]
+        assert_array_equal(tbl['x_peak'], x_ref[idx])
+        assert_array_equal(tbl['y_peak'], y_ref[idx])
+
     def test_zerodet(self):
         """Test with large threshold giving no sources."""
 
@@ -13,7 +13,8 @@ from astropy.utils.exceptions import AstropyUserWarning
 from astropy.utils.exceptions import AstropyDeprecationWarning
 
 from ..findstars import daofind, irafstarfind
-from ..findstars import DAOStarFinder, IRAFStarFinder
+from ..findstars import DAOStarFinder, IRAFStarFinder, MultiScaleDAOStarFinder
+from ..findstars import _min_separation_mask
 from ...datasets import make_100gaussians_image
 
 try:
@@ -145,6 +146,133 @@ class TestDAOStarFinder(object):
             t = daofind(data, threshold=0.1, fwhm=1.0, sky=10)
         assert not np.isfinite(t['mag'])
 
+    @pytest.mark.parametrize('n_jobs', [1, 2])
+    def test_daofind_tiled(self, n_jobs):
+        starfinder = DAOStarFinder(threshold=8.0, fwhm=2.0)
+        t1 = starfinder.find_stars(DATA)
+        t2 = starfinder.find_stars_tiled(DATA, tile_size=64, n_jobs=n_jobs)
+        t1.sort(['ycentroid', 'xcentroid'])
+        t2.sort(['ycentroid', 'xcentroid'])
+        assert len(t1) == len(t2)
+        for column in t1.colnames[1:]:
+            assert_allclose(t1[column], t2[column])
+
+    @pytest.mark.parametrize('tile_size', [0, -64, 64.5])
+    def test_daofind_tiled_badtilesize(self, tile_size):
+        starfinder = DAOStarFinder(threshold=8.0, fwhm=2.0)
+        with pytest.raises(ValueError):
+            starfinder.find_stars_tiled(DATA, tile_size=tile_size)
+
+    def test_daofind_convolved_data(self):
+        daofinder = DAOStarFinder(threshold=8.0, fwhm=2.0)
+        iraffinder = IRAFStarFinder(threshold=8.0, fwhm=2.0)
+        cache = {}
+        t1 = daofinder.find_stars(DATA, convolved_data=cache)
+        assert len(cache) == 1
+        t2 = iraffinder.find_stars(DATA, convolved_data=cache)
+        assert len(cache) == 1
+        assert_allclose(t1['xcentroid'],
+                        daofinder.find_stars(DATA)['xcentroid'])
+        assert_allclose(t2['xcentroid'],
+                        iraffinder.find_stars(DATA)['xcentroid'])
+
+        convolved_data = list(cache.values())[0]
+        t3 = daofinder.find_stars(DATA, convolved_data=convolved_data)
+        assert_allclose(t1['xcentroid'], t3['xcentroid'])
+        with pytest.raises(ValueError):
+            daofinder.find_stars(DATA, convolved_data=np.ones((10, 10)))
+
+    @pytest.mark.parametrize('fwhm', [2.0, 12.0])
+    def test_daofind_stack(self, fwhm):
+        data = np.array([DATA, DATA[::-1], DATA[:, ::-1]])
+        starfinder = DAOStarFinder(threshold=10.0, fwhm=fwhm)
+        tables = list(starfinder.find_stars_stack(data))
+        assert len(tables) == len(data)
+        for frame, t2 in zip(data, tables):
+            t1 = starfinder.find_stars(frame)
+            assert len(t1) == len(t2)
+            for column in t1.colnames:
+                assert_allclose(t1[column], t2[column])
+
+    def test_daofind_stack_baddim(self):
+        starfinder = DAOStarFinder(threshold=10.0, fwhm=2.0)
+        with pytest.raises(ValueError):
+            next(starfinder.find_stars_stack(DATA))
+
+    def test_daofind_tiled_nosources(self):
+        starfinder = DAOStarFinder(threshold=100, fwhm=2)
+        with catch_warnings(AstropyUserWarning) as warning_lines:
+            t = starfinder.find_stars_tiled(DATA, tile_size=64)
+            assert len(t) == 0
+            assert len(warning_lines) == 1
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+@pytest.mark.skipif('not HAS_SKIMAGE')
+class TestMultiScaleDAOStarFinder(object):
+    def test_multiscale(self):
+        """
+        Test that each source matches the DAOStarFinder result for its
+        fwhm and (highest) threshold.
+        """
+
+        cache = {}
+        starfinder = MultiScaleDAOStarFinder(THRESHOLDS, FWHMS)
+        t = starfinder.find_stars(DATA, convolved_data=cache)
+        assert len(cache) == len(FWHMS)
+        assert len(t) > 0
+        assert_allclose(t['id'], np.arange(len(t)) + 1)
+
+        for fwhm, threshold in itertools.product(FWHMS, THRESHOLDS):
+            t_ref = DAOStarFinder(threshold, fwhm).find_stars(DATA)
+            t_sub = t[(t['fwhm'] == fwhm) & (t['threshold'] == threshold)]
+            for row in t_sub:
+                dist = np.hypot(t_ref['xcentroid'] - row['xcentroid'],
+                                t_ref['ycentroid'] - row['ycentroid'])
+                idx = np.argmin(dist)
+                assert dist[idx] == 0
+                for column in t_ref.colnames[1:]:
+                    assert_allclose(row[column], t_ref[column][idx])
+
+        # the merged sources are separated by more than merge_radius
+        # from the sources found with the other kernels
+        for fwhm in FWHMS:
+            t1 = t[t['fwhm'] == fwhm]
+            t2 = t[t['fwhm'] != fwhm]
+            dist = np.hypot(t1['xcentroid'][:, np.newaxis] - t2['xcentroid'],
+                            t1['ycentroid'][:, np.newaxis] - t2['ycentroid'])
+            assert np.all(dist > min(FWHMS))
+
+    def test_multiscale_single(self):
+        """Test that a single fwhm and threshold match DAOStarFinder."""
+
+        t1 = DAOStarFinder(10., 2.).find_stars(DATA)
+        t2 = MultiScaleDAOStarFinder(10., [2.]).find_stars(DATA)
+        assert len(t1) == len(t2)
+        for column in t1.colnames:
+            assert_allclose(t1[column], t2[column])
+
+    def test_multiscale_stack(self):
+        data = np.array([DATA, DATA[::-1]])
+        starfinder = MultiScaleDAOStarFinder(THRESHOLDS, [2.0, 12.0])
+        for frame, t2 in zip(data, starfinder.find_stars_stack(data)):
+            t1 = starfinder.find_stars(frame)
+            assert len(t1) == len(t2)
+            for column in t1.colnames:
+                assert_allclose(t1[column], t2[column])
+
+    def test_multiscale_nosources(self):
+        data = np.ones((3, 3))
+        starfinder = MultiScaleDAOStarFinder(threshold=10, fwhm=[1, 2])
+        with catch_warnings(AstropyUserWarning):
+            t = starfinder.find_stars(data)
+        assert len(t) == 0
+
+    def test_multiscale_convolved_data_badtype(self):
+        starfinder = MultiScaleDAOStarFinder(10., [2.])
+        with pytest.raises(ValueError):
+            starfinder.find_stars(DATA, convolved_data=DATA)
+
 
 @pytest.mark.skipif('not HAS_SCIPY')
 @pytest.mark.skipif('not HAS_SKIMAGE')
@@ -234,3 +362,46 @@ class TestIRAFStarFinder(object):
         with catch_warnings(AstropyDeprecationWarning):
             t = irafstarfind(DATA, threshold=25.0, fwhm=2.0, sky=100.)
         assert len(t) == 0
+
+    @pytest.mark.parametrize('minsep_fwhm', [2.5, 6.])
+    def test_irafstarfind_minsep_kdtree(self, minsep_fwhm):
+        t1 = IRAFStarFinder(threshold=8.0, fwhm=2.0,
+                            minsep_fwhm=minsep_fwhm).find_stars(DATA)
+        t2 = IRAFStarFinder(threshold=8.0, fwhm=2.0, minsep_fwhm=minsep_fwhm,
+                            minsep_method='kdtree').find_stars(DATA)
+        assert len(t1) == len(t2)
+        for column in t1.colnames:
+            assert_allclose(t1[column], t2[column])
+
+    def test_irafstarfind_stack(self):
+        data = np.array([DATA, DATA[::-1]])
+        starfinder = IRAFStarFinder(threshold=8.0, fwhm=2.0)
+        for frame, t2 in zip(data, starfinder.find_stars_stack(data)):
+            t1 = starfinder.find_stars(frame)
+            assert len(t1) == len(t2)
+            for column in t1.colnames:
+                assert_allclose(t1[column], t2[column])
+
+    def test_irafstarfind_minsep_method_invalid(self):
+        with pytest.raises(ValueError):
+            IRAFStarFinder(threshold=8.0, fwhm=2.0, minsep_method='invalid')
+
+    def test_irafstarfind_tiled(self):
+        starfinder = IRAFStarFinder(threshold=8.0, fwhm=2.0)
+        t1 = starfinder.find_stars(DATA)
+        t2 = starfinder.find_stars_tiled(DATA, tile_size=64, n_jobs=2,
+                                         use_processes=True)
+        t1.sort(['ycentroid', 'xcentroid'])
+        t2.sort(['ycentroid', 'xcentroid'])
+        assert len(t1) == len(t2)
+        for column in t1.colnames[1:]:
+            assert_allclose(t1[column], t2[column])
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+def test_min_separation_mask():
+    x = [0, 1, 10, 12, 20, 21]
+    y = [0, 0, 0, 0, 0, 0]
+    values = [5., 3., 1., 2., 4., 4.]
+    mask = _min_separation_mask(x, y, values, 2)
+    assert_allclose(mask, [True, False, False, True, True, True])
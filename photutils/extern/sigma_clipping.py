@@ -195,9 +195,71 @@ def sigma_clip(data, sigma=3, sigma_lower=None, sigma_upper=None, iters=5,
     return filtered_data
 
 
+def _median_partition(values):
+    """
+    Calculate the median of a 1D array, partitioning the array in
+    place.
+    """
+
+    n = values.size
+    if n % 2 == 1:
+        values.partition(n // 2)
+        return values[n // 2]
+    else:
+        values.partition([n // 2 - 1, n // 2])
+        return 0.5 * (values[n // 2 - 1] + values[n // 2])
+
+
+def _sigma_clipped_stats_fast(values, sigma_lower, sigma_upper, iters):
+    """
+    Calculate the sigma-clipped mean, median, and standard deviation of
+    a 1D array of finite values using the median and standard deviation
+    for the clipping.
+
+    Instead of masking rejected values, the working array is shrunk in
+    place.  The partitioning used to calculate the median also splits
+    the array into values below and above the median, so the rejected
+    values can be moved to the ends of the array (with a partial
+    partition of each half) and excluded using a view.  ``values`` is
+    modified in place.
+
+    `None` is returned if all values are rejected.
+    """
+
+    i = 0
+    median = _median_partition(values)
+    while iters is None or i < iters:
+        i += 1
+        n = values.size
+        std = values.std()
+        min_value = median - std * sigma_lower
+        max_value = median + std * sigma_upper
+
+        # after partitioning around the median, rejected values can
+        # only be in the lower and upper halves, respectively
+        lower = values[:n // 2]
+        upper = values[(n + 1) // 2:]
+        nlow = np.count_nonzero(lower < min_value)
+        nhigh = np.count_nonzero(upper > max_value)
+        if nlow + nhigh == 0:
+            break
+        if nlow + nhigh == n:
+            return None
+
+        if nlow > 0:
+            lower.partition(nlow - 1)
+        if nhigh > 0:
+            upper.partition(upper.size - nhigh)
+        values = values[nlow:n - nhigh]
+        median = _median_partition(values)
+
+    return values.mean(), median, values.std()
+
+
 def sigma_clipped_stats(data, mask=None, mask_value=None, sigma=3.0,
                         sigma_lower=None, sigma_upper=None, iters=5,
-                        cenfunc=np.ma.median, stdfunc=np.std, axis=None):
+                        cenfunc=np.ma.median, stdfunc=np.std, axis=None,
+                        subsample=None):
     """
     Calculate sigma-clipped statistics from data.
 
@@ -267,18 +329,62 @@ def sigma_clipped_stats(data, mask=None, mask_value=None, sigma=3.0,
         (like the numpy functions).  If `None`, clip over all axes.
         Defaults to `None`.
 
+    subsample : int or `None`, optional
+        If not `None`, then only every ``subsample``-th value of the
+        flattened ``data`` is used, giving approximate statistics for
+        very large images at a fraction of the cost.  ``subsample`` can
+        be used only if ``axis`` is `None`.  Defaults to `None`.
+
     Returns
     -------
     mean, median, stddev : float
         The mean, median, and standard deviation of the sigma-clipped
         image.
+
+    Notes
+    -----
+    If ``axis`` is `None` and the default ``cenfunc`` and ``stdfunc``
+    are used, then the statistics are calculated from a 1D copy of the
+    unmasked finite values, which is partitioned (instead of sorted) to
+    calculate the median and shrunk in place at each iteration.
     """
 
+    if subsample is not None:
+        if axis is not None:
+            raise ValueError('subsample can be used only if axis is None')
+        data = np.ma.asanyarray(data).ravel()[::subsample]
+
     if mask is not None:
+        if subsample is not None:
+            mask = np.ravel(mask)[::subsample]
         data = np.ma.MaskedArray(data, mask)
     if mask_value is not None:
         data = np.ma.masked_values(data, mask_value)
 
+    if (axis is None and cenfunc in (np.ma.median, np.median) and
+            stdfunc is np.std):
+        values = np.ma.getdata(data)[~np.ma.getmaskarray(data)]
+        values = values.astype(np.float64, copy=False)
+        finite = np.isfinite(values)
+        if not np.all(finite):
+            values = values[finite]
+            warnings.warn('Input data contains invalid values (NaNs or '
+                          'infs), which were automatically masked.',
+                          AstropyUserWarning)
+
+        if sigma_lower is None:
+            sigma_lower = sigma
+        if sigma_upper is None:
+            sigma_upper = sigma
+
+        # if there are no values or all values are rejected, use
+        # sigma_clip below to return the same (masked) statistics
+        if values.size > 0:
+            stats = _sigma_clipped_stats_fast(values, sigma_lower,
+                                              sigma_upper, iters)
+            if stats is not None:
+                return stats
+
     data_clip = sigma_clip(data, sigma=sigma, sigma_lower=sigma_lower,
                            sigma_upper=sigma_upper, iters=iters,
                            cenfunc=cenfunc, stdfunc=stdfunc, axis=axis)
@@ -0,0 +1,88 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+from numpy.testing import assert_allclose
+from astropy.tests.helper import pytest, catch_warnings
+from astropy.utils.exceptions import AstropyUserWarning
+
+from ..sigma_clipping import sigma_clipped_stats
+
+
+def _cenfunc(data):
+    """A wrapped median, which disables the fast (partition) path."""
+
+    return np.ma.median(data)
+
+
+def _make_data():
+    prng = np.random.RandomState(12345)
+    data = prng.normal(10., 2., size=(50, 41))
+    data[0:4, 0:5] += 50.     # high outliers
+    data[10, 0:5] -= 30.      # low outliers
+    return data
+
+
+def _compare(data, **kwargs):
+    with catch_warnings(AstropyUserWarning):
+        result1 = sigma_clipped_stats(data, **kwargs)
+        result2 = sigma_clipped_stats(data, cenfunc=_cenfunc, **kwargs)
+    assert_allclose(result1, result2, rtol=1.e-12)
+
+
+@pytest.mark.parametrize('iters', [None, 1, 5])
+def test_fast_iters(iters):
+    _compare(_make_data(), iters=iters)
+
+
+def test_fast_mask():
+    data = _make_data()
+    mask = np.zeros(data.shape, dtype=bool)
+    mask[20:30, 10:30] = True
+    data[mask] = 1.e5
+    _compare(data, mask=mask)
+    _compare(np.ma.masked_array(data, mask=mask))
+    _compare(data, mask=mask, mask_value=data[0, 0])
+
+
+def test_fast_nonfinite():
+    data = _make_data()
+    data[5, 5] = np.nan
+    data[6, 6] = np.inf
+    data[7, 7] = -np.inf
+    _compare(data)
+    with catch_warnings(AstropyUserWarning) as warning_lines:
+        sigma_clipped_stats(data)
+        assert warning_lines[0].category == AstropyUserWarning
+
+
+@pytest.mark.parametrize(('sigma_lower', 'sigma_upper'),
+                         [(1.5, 3.), (3., 1.), (None, 2.)])
+def test_fast_sigma_lower_upper(sigma_lower, sigma_upper):
+    _compare(_make_data(), sigma_lower=sigma_lower, sigma_upper=sigma_upper,
+             iters=None)
+
+
+def test_fast_all_rejected():
+    data = np.array([1., 2.])
+    result1 = sigma_clipped_stats(data, sigma=0.1)
+    result2 = sigma_clipped_stats(data, sigma=0.1, cenfunc=_cenfunc)
+    assert result1[0] is np.ma.masked
+    assert result1[2] is np.ma.masked
+    assert result1[1] == result2[1]
+
+
+def test_subsample():
+    data = _make_data()
+    result1 = sigma_clipped_stats(data, subsample=3)
+    result2 = sigma_clipped_stats(data, subsample=3)
+    assert result1 == result2
+    result = sigma_clipped_stats(data)
+    assert_allclose(result1, result, rtol=0.05)
+    _compare(data, subsample=3)
+
+
+def test_subsample_axis():
+    with pytest.raises(ValueError):
+        sigma_clipped_stats(_make_data(), subsample=3, axis=0)
@@ -5,6 +5,7 @@ segmentation and measuring their centroids, photometry, and
 morphological properties.
 """
 
+from .catalog import *
 from .core import *
 from .deblend import *
 from .detect import *
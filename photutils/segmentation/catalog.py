@@ -0,0 +1,768 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+import astropy.units as u
+from astropy.table import Table
+from astropy.utils import lazyproperty
+from astropy.wcs.utils import pixel_to_skycoord
+
+from .core import SegmentationImage
+from .properties import _PROPERTIES_TABLE_COLUMNS, _broadcast_image
+from ..utils.convolution import filter_data
+
+
+__all__ = ['SourceCatalog']
+
+__doctest_requires__ = {('SourceCatalog', 'SourceCatalog.*'): ['scipy']}
+
+
+def _split_unit(value, shape, name):
+    """
+    Split an optional image (or scalar) into a (broadcasted)
+    `~numpy.ndarray` and its unit (`None` if not a
+    `~astropy.units.Quantity`).
+    """
+
+    if value is None:
+        return None, None
+
+    unit = None
+    if isinstance(value, u.Quantity):
+        unit = value.unit
+        value = value.value
+
+    return _broadcast_image(np.asanyarray(value), shape, name), unit
+
+
+def _scalar_value(image):
+    """
+    The value of an image broadcasted from a scalar by
+    `_broadcast_image` (all of its strides are zero), or `None` if
+    ``image`` is not a broadcasted scalar.
+    """
+
+    if image.size > 0 and not any(image.strides):
+        return image.flat[0]
+    return None
+
+
+def _with_unit(value, unit):
+    """Multiply ``value`` by ``unit``, if ``unit`` is not `None`."""
+
+    if unit is None:
+        return value
+    return value * unit
+
+
+class SourceCatalog(object):
+    """
+    Class to calculate the photometry and morphological properties of
+    all the labeled sources in a segmentation image at once.
+
+    `SourceCatalog` is a columnar version of `SourceProperties` (and
+    `source_properties`).  Instead of measuring each source on its own
+    cutout, each property is calculated for all sources at once using
+    `numpy.bincount` and `scipy.ndimage` label reductions over the
+    (non-masked) pixels of the source segments.  The properties are
+    lazily computed arrays (or `~astropy.units.Quantity` arrays) with
+    one element per source and have the same names, units, and
+    definitions as the scalar-valued properties of `SourceProperties`.
+
+    Parameters
+    ----------
+    data : array_like or `~astropy.units.Quantity`
+        The 2D array from which to calculate the source photometry and
+        properties.  ``data`` should be background-subtracted.
+
+    segment_img : `SegmentationImage` or array_like (int)
+        A 2D segmentation image, either as a `SegmentationImage` object
+        or an `~numpy.ndarray`, with the same shape as ``data`` where
+        sources are labeled by different positive integer values.  A
+        value of zero is reserved for the background.
+
+    error : array_like or `~astropy.units.Quantity`, optional
+        The pixel-wise Gaussian 1-sigma errors of the input ``data``.
+        ``error`` is assumed to include *all* sources of error,
+        including the Poisson error of the sources (see
+        `~photutils.utils.calc_total_error`) .  ``error`` must have the
+        same shape as the input ``data``.
+
+    mask : array_like (bool), optional
+        A boolean mask with the same shape as ``data`` where a `True`
+        value indicates the corresponding element of ``data`` is masked.
+        Masked data are excluded from all calculations.
+
+    background : float, array_like, or `~astropy.units.Quantity`, optional
+        The background level that was *previously* present in the input
+        ``data``.  ``background`` may either be a scalar value or a 2D
+        image with the same shape as the input ``data``.  The input
+        ``background`` does *not* get subtracted from the input
+        ``data``, which should already be background-subtracted.
+
+    filter_kernel : array-like (2D) or `~astropy.convolution.Kernel2D`, optional
+        The 2D array of the kernel used to filter the data prior to
+        calculating the source centroid and morphological parameters.
+        If `None`, then the unfiltered ``data`` will be used instead.
+
+    wcs : `~astropy.wcs.WCS`
+        The WCS transformation to use.  If `None`, then
+        `icrs_centroid`, `ra_icrs_centroid`, and `dec_icrs_centroid`
+        will be `None`.
+
+    labels : int, array-like (1D, int)
+        Subset of segmentation labels for which to calculate the
+        properties.  Invalid and repeated labels are ignored.  If
+        `None`, then the properties will be calculated for all labeled
+        sources (the default).
+
+    See Also
+    --------
+    SourceProperties, source_properties, properties_table
+
+    Notes
+    -----
+    As for `SourceProperties`, negative (and non-finite) (filtered) data
+    values within the source segment are set to zero when measuring the
+    centroid and the morphological properties based on image moments.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from photutils import SegmentationImage, SourceCatalog
+    >>> image = np.arange(16.).reshape(4, 4)
+    >>> segm = SegmentationImage([[1, 1, 0, 0],
+    ...                           [1, 0, 0, 2],
+    ...                           [0, 0, 2, 2],
+    ...                           [0, 2, 2, 0]])
+    >>> cat = SourceCatalog(image, segm)
+    >>> cat.id
+    array([1, 2])
+    >>> cat.source_sum    # doctest: +FLOAT_CMP
+    array([  5.,  55.])
+    >>> tbl = cat.to_table(columns=['id', 'xcentroid', 'ycentroid',
+    ...                             'source_sum'])
+    >>> print(tbl)
+     id   xcentroid     ycentroid   source_sum
+             pix           pix
+    --- ------------- ------------- ----------
+      1           0.2           0.8        5.0
+      2 2.09090909091 2.36363636364       55.0
+    """
+
+    def __init__(self, data, segment_img, error=None, mask=None,
+                 background=None, filter_kernel=None, wcs=None,
+                 labels=None):
+
+        if not isinstance(segment_img, SegmentationImage):
+            segment_img = SegmentationImage(segment_img)
+
+        if segment_img.shape != data.shape:
+            raise ValueError('segment_img and data must have the same shape.')
+
+        self._data, self._data_unit = _split_unit(data, data.shape, 'data')
+        self._error, self._error_unit = _split_unit(error, data.shape,
+                                                    'error')
+        self._background, self._background_unit = _split_unit(
+            background, data.shape, 'background')
+
+        if mask is np.ma.nomask:
+            mask = None
+        if mask is not None:
+            mask = np.asanyarray(mask)
+            if mask.shape != data.shape:
+                raise ValueError('mask and data must have the same shape.')
+
+        # filter the data once for the centroids and the morphological
+        # properties
+        if filter_kernel is not None:
+            self._filtered_data = filter_data(
+                self._data, filter_kernel, mode='constant', fill_value=0.0,
+                check_normalization=True)
+        else:
+            self._filtered_data = self._data
+
+        if labels is None:
+            labels = segment_img.labels
+        else:
+            labels = np.atleast_1d(labels)
+            labels = labels[np.in1d(labels, segment_img.labels)]
+            labels = labels[np.sort(np.unique(labels, return_index=True)[1])]
+
+        self._segment_img = segment_img
+        self._mask = mask
+        self._wcs = wcs
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, key):
+        return getattr(self, key, None)
+
+    def to_table(self, columns=None, exclude_columns=None):
+        """
+        Create a `~astropy.table.Table` of properties, with one row per
+        source.
+
+        Parameters
+        ----------
+        columns : str or list of str, optional
+            Names of columns, in order, to include in the output
+            `~astropy.table.Table`.  The allowed column names are any of
+            the properties of `SourceCatalog`.
+
+        exclude_columns : str or list of str, optional
+            Names of columns to exclude from the default properties list
+            in the output `~astropy.table.Table`.
+
+        Returns
+        -------
+        table : `~astropy.table.Table`
+            A table of properties of the segmented sources, with the
+            same default columns as `properties_table`.
+        """
+
+        table_columns = None
+        if exclude_columns is not None:
+            table_columns = [s for s in _PROPERTIES_TABLE_COLUMNS
+                             if s not in exclude_columns]
+        if columns is not None:
+            table_columns = np.atleast_1d(columns)
+        if table_columns is None:
+            table_columns = _PROPERTIES_TABLE_COLUMNS
+
+        table = Table()
+        for column in table_columns:
+            values = getattr(self, column)
+            if values is None:
+                values = [None] * len(self)
+            table[column] = values
+
+        return table
+
+    @lazyproperty
+    def _pixels(self):
+        """
+        The flat indices of the non-masked pixels of the source segments
+        and the (catalog) index of their source.
+        """
+
+        # lookup table from the segmentation labels to the source index
+        segm_data = self._segment_img.data
+        label_map = np.full(self._segment_img.max + 1, -1, dtype=np.intp)
+        label_map[self.labels] = np.arange(len(self.labels))
+        source_idx = label_map[segm_data]
+        if self._mask is not None:
+            source_idx[self._mask.astype(bool)] = -1
+        idx = np.flatnonzero(source_idx >= 0)
+
+        return idx, source_idx.ravel()[idx]
+
+    def _sum(self, values):
+        """
+        Sum the (non-masked) pixel ``values`` (or an image) over each
+        source segment.
+        """
+
+        idx, sources = self._pixels
+        if np.shape(values) == self._data.shape:
+            value = _scalar_value(values)
+            if value is not None:
+                # do not copy the broadcasted image with ravel
+                return self._area * np.float64(value)
+            values = values.ravel()[idx]
+        return np.bincount(sources, weights=values, minlength=len(self))
+
+    @lazyproperty
+    def _pixel_coords(self):
+        """The ``(y, x)`` coordinates of the pixels in `_pixels`."""
+
+        return np.unravel_index(self._pixels[0], self._data.shape)
+
+    @lazyproperty
+    def _moment_weights(self):
+        """
+        The (filtered) data values of the pixels in `_pixels`, where
+        non-finite and negative values are set to zero.
+        """
+
+        values = np.array(self._filtered_data.ravel()[self._pixels[0]],
+                          dtype=np.float64)
+        values[~(values > 0)] = 0.    # also sets NaNs to zero
+        return values
+
+    @lazyproperty
+    def _moment_sum(self):
+        """The zeroth-order moment of the (filtered) sources."""
+
+        return self._sum(self._moment_weights)
+
+    @lazyproperty
+    def id(self):
+        """
+        The source identification numbers corresponding to the object
+        labels in the segmentation image.
+        """
+
+        return self.labels
+
+    @lazyproperty
+    def centroid(self):
+        """
+        The ``(y, x)`` coordinates of the centroids within the source
+        segments, as a ``(N, 2)`` array.
+        """
+
+        weights = self._moment_weights
+        ypix, xpix = self._pixel_coords
+        m00 = self._moment_sum
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ycen = self._sum(weights * ypix) / m00
+            xcen = self._sum(weights * xpix) / m00
+        ycen[m00 == 0] = np.nan
+        xcen[m00 == 0] = np.nan
+
+        return np.transpose([ycen, xcen]) * u.pix
+
+    @lazyproperty
+    def xcentroid(self):
+        """The ``x`` coordinates of the centroids of the sources."""
+
+        return self.centroid[:, 1]
+
+    @lazyproperty
+    def ycentroid(self):
+        """The ``y`` coordinates of the centroids of the sources."""
+
+        return self.centroid[:, 0]
+
+    @lazyproperty
+    def icrs_centroid(self):
+        """
+        The ICRS coordinates of the centroids of the sources, returned
+        as a `~astropy.coordinates.SkyCoord` object.
+        """
+
+        if self._wcs is not None:
+            return pixel_to_skycoord(self.xcentroid.value,
+                                     self.ycentroid.value,
+                                     self._wcs, origin=1).icrs
+        else:
+            return None
+
+    @lazyproperty
+    def ra_icrs_centroid(self):
+        """
+        The ICRS Right Ascension coordinates (in degrees) of the
+        centroids of the sources.
+        """
+
+        if self._wcs is not None:
+            return self.icrs_centroid.ra.degree * u.deg
+        else:
+            return None
+
+    @lazyproperty
+    def dec_icrs_centroid(self):
+        """
+        The ICRS Declination coordinates (in degrees) of the centroids
+        of the sources.
+        """
+
+        if self._wcs is not None:
+            return self.icrs_centroid.dec.degree * u.deg
+        else:
+            return None
+
+    @lazyproperty
+    def bbox(self):
+        """
+        The bounding boxes ``(ymin, xmin, ymax, xmax)`` of the source
+        segments, as a ``(N, 4)`` array.
+        """
+
+        slices = self._segment_img.slices
+        bbox = np.array([(slc[0].start, slc[1].start,
+                          slc[0].stop - 1, slc[1].stop - 1)
+                         for slc in (slices[label - 1]
+                                     for label in self.labels)],
+                        dtype=np.float64).reshape(-1, 4)
+
+        return bbox * u.pix
+
+    @lazyproperty
+    def xmin(self):
+        """The minimum ``x`` pixel locations of the bounding boxes."""
+
+        return self.bbox[:, 1]
+
+    @lazyproperty
+    def xmax(self):
+        """The maximum ``x`` pixel locations of the bounding boxes."""
+
+        return self.bbox[:, 3]
+
+    @lazyproperty
+    def ymin(self):
+        """The minimum ``y`` pixel locations of the bounding boxes."""
+
+        return self.bbox[:, 0]
+
+    @lazyproperty
+    def ymax(self):
+        """The maximum ``y`` pixel locations of the bounding boxes."""
+
+        return self.bbox[:, 2]
+
+    def _extremum(self, func):
+        """
+        Apply a `scipy.ndimage` label reduction (``'minimum'``,
+        ``'maximum'``, ``'minimum_position'``, or ``'maximum_position'``)
+        to the (background-subtracted) data of each source.
+        """
+
+        from scipy import ndimage
+
+        idx, sources = self._pixels
+        if len(self) == 0:
+            return np.zeros(0)
+        values = self._data.ravel()[idx]
+        result = np.array(getattr(ndimage, func)(values, sources + 1,
+                                                 np.arange(1, len(self) + 1)),
+                          dtype=np.float64).ravel()
+        if func.endswith('_position'):
+            result = idx[result.astype(np.intp)].astype(np.float64)
+        result[self._area == 0] = np.nan
+
+        return result
+
+    @lazyproperty
+    def min_value(self):
+        """
+        The minimum pixel values of the (background-subtracted) data
+        within the source segments.
+        """
+
+        return _with_unit(self._extremum('minimum'), self._data_unit)
+
+    @lazyproperty
+    def max_value(self):
+        """
+        The maximum pixel values of the (background-subtracted) data
+        within the source segments.
+        """
+
+        return _with_unit(self._extremum('maximum'), self._data_unit)
+
+    def _position(self, flat_idx):
+        """Convert flat pixel indices to a ``(N, 2)`` ``(y, x)`` array."""
+
+        ny, nx = self._data.shape
+        return np.transpose([flat_idx // nx, flat_idx % nx]) * u.pix
+
+    @lazyproperty
+    def minval_pos(self):
+        """
+        The ``(y, x)`` coordinates of the minimum pixel values of the
+        (background-subtracted) data.
+        """
+
+        return self._position(self._extremum('minimum_position'))
+
+    @lazyproperty
+    def maxval_pos(self):
+        """
+        The ``(y, x)`` coordinates of the maximum pixel values of the
+        (background-subtracted) data.
+        """
+
+        return self._position(self._extremum('maximum_position'))
+
+    @lazyproperty
+    def minval_xpos(self):
+        """The ``x`` coordinates of the minimum pixel values."""
+
+        return self.minval_pos[:, 1]
+
+    @lazyproperty
+    def minval_ypos(self):
+        """The ``y`` coordinates of the minimum pixel values."""
+
+        return self.minval_pos[:, 0]
+
+    @lazyproperty
+    def maxval_xpos(self):
+        """The ``x`` coordinates of the maximum pixel values."""
+
+        return self.maxval_pos[:, 1]
+
+    @lazyproperty
+    def maxval_ypos(self):
+        """The ``y`` coordinates of the maximum pixel values."""
+
+        return self.maxval_pos[:, 0]
+
+    @lazyproperty
+    def _area(self):
+        """The number of non-masked pixels in each source segment."""
+
+        return np.bincount(self._pixels[1], minlength=len(self))
+
+    @lazyproperty
+    def area(self):
+        """The areas of the source segments in units of pixels**2."""
+
+        return self._area.astype(np.float64) * u.pix**2
+
+    @lazyproperty
+    def equivalent_radius(self):
+        """
+        The radii of circles with the same `area` as the source
+        segments.
+        """
+
+        return np.sqrt(self.area / np.pi)
+
+    @lazyproperty
+    def perimeter(self):
+        """
+        The perimeters of the source segments, approximated lines
+        through the centers of the border pixels using a
+        4-connectivity.
+
+        Unlike the other properties, the perimeter is calculated from
+        the cutout of each source segment.
+        """
+
+        from skimage.measure import perimeter
+
+        segm_data = self._segment_img.data
+        slices = self._segment_img.slices
+        return np.array([perimeter(segm_data[slices[label - 1]] == label, 4)
+                         for label in self.labels]) * u.pix
+
+    @lazyproperty
+    def covariance(self):
+        """
+        The covariance matrices of the 2D Gaussian functions that have
+        the same second-order moments as the sources, as a ``(N, 2, 2)``
+        array.
+        """
+
+        weights = self._moment_weights
+        ypix, xpix = self._pixel_coords
+        sources = self._pixels[1]
+        ycen, xcen = self.centroid.value.T
+        dx = xpix - xcen[sources]
+        dy = ypix - ycen[sources]
+        m00 = self._moment_sum
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covar_xx = self._sum(weights * dx**2) / m00
+            covar_xy = self._sum(weights * dx * dy) / m00
+            covar_yy = self._sum(weights * dy**2) / m00
+
+        # SExtractor's prescription for "infinitely" thin detections
+        # (see SourceProperties._check_covariance)
+        p = 1. / 12
+        thin = (covar_xx * covar_yy - covar_xy**2) < p**2
+        while np.any(thin):
+            covar_xx[thin] += p
+            covar_yy[thin] += p
+            thin[thin] = ((covar_xx[thin] * covar_yy[thin] -
+                           covar_xy[thin]**2) < p**2)
+
+        covariance = np.empty((len(self), 2, 2))
+        covariance[:, 0, 0] = covar_xx
+        covariance[:, 0, 1] = covariance[:, 1, 0] = covar_xy
+        covariance[:, 1, 1] = covar_yy
+
+        return covariance * u.pix**2
+
+    @lazyproperty
+    def covariance_eigvals(self):
+        """
+        The two eigenvalues of the `covariance` matrices in decreasing
+        order, as a ``(N, 2)`` array.
+        """
+
+        covar = self.covariance.value
+        a, b, c = covar[:, 0, 0], covar[:, 0, 1], covar[:, 1, 1]
+        with np.errstate(invalid='ignore'):
+            mean = (a + c) / 2.
+            delta = np.sqrt(((a - c) / 2.)**2 + b**2)
+            eigvals = np.transpose([mean + delta, mean - delta])
+            eigvals[np.any(eigvals < 0, axis=1)] = np.nan    # negative var
+
+        return eigvals * u.pix**2
+
+    @lazyproperty
+    def semimajor_axis_sigma(self):
+        """
+        The 1-sigma standard deviations along the semimajor axes of the
+        2D Gaussian functions that have the same second-order central
+        moments as the sources.
+        """
+
+        return np.sqrt(self.covariance_eigvals[:, 0])
+
+    @lazyproperty
+    def semiminor_axis_sigma(self):
+        """
+        The 1-sigma standard deviations along the semiminor axes of the
+        2D Gaussian functions that have the same second-order central
+        moments as the sources.
+        """
+
+        return np.sqrt(self.covariance_eigvals[:, 1])
+
+    @lazyproperty
+    def eccentricity(self):
+        """
+        The eccentricities of the 2D Gaussian functions that have the
+        same second-order moments as the sources.
+        """
+
+        l1, l2 = self.covariance_eigvals.value.T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            eccen = np.sqrt(1. - (l2 / l1))
+        eccen[l1 == 0] = 0.
+
+        return eccen * u.dimensionless_unscaled
+
+    @lazyproperty
+    def orientation(self):
+        """
+        The angles in radians between the ``x`` axis and the major axes
+        of the 2D Gaussian functions that have the same second-order
+        moments as the sources.  The angle increases in the
+        counter-clockwise direction.
+        """
+
+        covar = self.covariance.value
+        a, b, c = covar[:, 0, 0], covar[:, 0, 1], covar[:, 1, 1]
+        orient = 0.5 * np.arctan2(2. * b, (a - c))
+        with np.errstate(invalid='ignore'):
+            orient[(a < 0) | (c < 0)] = np.nan    # negative variance
+
+        return orient * u.rad
+
+    @lazyproperty
+    def elongation(self):
+        """
+        The ratios of the lengths of the semimajor and semiminor axes.
+        """
+
+        return self.semimajor_axis_sigma / self.semiminor_axis_sigma
+
+    @lazyproperty
+    def ellipticity(self):
+        """
+        ``1`` minus the ratios of the lengths of the semimajor and
+        semiminor axes.
+        """
+
+        return 1.0 - (self.semiminor_axis_sigma / self.semimajor_axis_sigma)
+
+    @lazyproperty
+    def covar_sigx2(self):
+        """The ``(0, 0)`` elements of the `covariance` matrices."""
+
+        return self.covariance[:, 0, 0]
+
+    @lazyproperty
+    def covar_sigy2(self):
+        """The ``(1, 1)`` elements of the `covariance` matrices."""
+
+        return self.covariance[:, 1, 1]
+
+    @lazyproperty
+    def covar_sigxy(self):
+        """The ``(0, 1)`` elements of the `covariance` matrices."""
+
+        return self.covariance[:, 0, 1]
+
+    @lazyproperty
+    def cxx(self):
+        """SExtractor's CXX ellipse parameters in units of pixel**(-2)."""
+
+        return ((np.cos(self.orientation) / self.semimajor_axis_sigma)**2 +
+                (np.sin(self.orientation) / self.semiminor_axis_sigma)**2)
+
+    @lazyproperty
+    def cyy(self):
+        """SExtractor's CYY ellipse parameters in units of pixel**(-2)."""
+
+        return ((np.sin(self.orientation) / self.semimajor_axis_sigma)**2 +
+                (np.cos(self.orientation) / self.semiminor_axis_sigma)**2)
+
+    @lazyproperty
+    def cxy(self):
+        """SExtractor's CXY ellipse parameters in units of pixel**(-2)."""
+
+        return (2. * np.cos(self.orientation) * np.sin(self.orientation) *
+                ((1. / self.semimajor_axis_sigma**2) -
+                 (1. / self.semiminor_axis_sigma**2)))
+
+    @lazyproperty
+    def source_sum(self):
+        """
+        The sums of the non-masked (background-subtracted) data values
+        within the source segments.
+        """
+
+        return _with_unit(self._sum(self._data), self._data_unit)
+
+    @lazyproperty
+    def source_sum_err(self):
+        """
+        The uncertainties of `source_sum`, propagated from the input
+        ``error`` array as the quadrature sums of the total errors over
+        the non-masked pixels within the source segments.
+        """
+
+        if self._error is None:
+            return None
+        error = _scalar_value(self._error)
+        if error is not None:
+            variance = self._area * np.float64(error)**2
+        else:
+            error = self._error.ravel()[self._pixels[0]]
+            variance = self._sum(error**2)
+        return _with_unit(np.sqrt(variance), self._error_unit)
+
+    @lazyproperty
+    def background_sum(self):
+        """The sums of ``background`` values within the source segments."""
+
+        if self._background is None:
+            return None
+        return _with_unit(self._sum(self._background),
+                          self._background_unit)
+
+    @lazyproperty
+    def background_mean(self):
+        """The means of ``background`` values within the source segments."""
+
+        if self._background is None:
+            return None
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.background_sum / self._area
+
+    @lazyproperty
+    def background_at_centroid(self):
+        """
+        The values of the ``background`` at the positions of the source
+        centroids.  Fractional position values are determined using
+        spline interpolation (as in `SourceProperties`).
+        """
+
+        from scipy.ndimage import map_coordinates
+
+        if self._background is None:
+            return None
+        values = map_coordinates(self._background,
+                                 [self.ycentroid.value,
+                                  self.xcentroid.value])
+        return _with_unit(values, self._background_unit)
@@ -2,20 +2,25 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import warnings
+
 import numpy as np
 from astropy.stats import gaussian_fwhm_to_sigma
-from astropy.convolution import Gaussian2DKernel
+from astropy.convolution import Gaussian2DKernel, Kernel2D
+from astropy.utils.exceptions import AstropyUserWarning
 
 from .core import SegmentationImage
 from ..detection import detect_threshold
-from ..utils.convolution import filter_data
+from ..utils.convolution import filter_data, _select_filter_method
+from ..utils.tiling import _check_tile_size, _map_tiles
 
 
 __all__ = ['detect_sources', 'make_source_mask']
 
 
 def detect_sources(data, threshold, npixels, filter_kernel=None,
-                   connectivity=8):
+                   connectivity=8, tile_size=None, n_jobs=1,
+                   use_processes=False):
     """
     Detect sources above a specified threshold value in an image and
     return a `~photutils.segmentation.SegmentationImage` object.
@@ -57,6 +62,31 @@ def detect_sources(data, threshold, npixels, filter_kernel=None,
         8-connected pixels touch along their edges or corners.  For
         reference, SExtractor uses 8-connected pixels.
 
+    tile_size : int or `None`, optional
+        If not `None`, the image is filtered, thresholded, and labeled
+        in independent tiles of ``tile_size`` pixels on a side.  The
+        labels of sources that touch across the tile boundaries are
+        then merged.  This bounds the memory used for temporary arrays
+        and allows the tiles of very large images to be processed in
+        parallel (see ``n_jobs``).  The segmentation image is identical
+        to the monolithic (``tile_size=None``) detection if no
+        ``filter_kernel`` is used or if the filtering uses direct
+        convolution (kernels with at most 200 elements or
+        non-floating-point data).  Larger kernels on floating-point
+        data are applied with FFTs on each tile, so the filtered values
+        can differ from the whole-image FFT at the rounding level,
+        which may change pixels exactly at the ``threshold``.
+
+    n_jobs : int, optional
+        The number of worker threads (or processes) used to process
+        the tiles if ``tile_size`` is not `None`.  If 1, the tiles are
+        processed serially.
+
+    use_processes : bool, optional
+        If `True`, use a pool of worker processes instead of threads
+        to process the tiles.  Each tile (extended by half the filter
+        kernel size) is copied to the worker processes.
+
     Returns
     -------
     segment_image : `~photutils.segmentation.SegmentationImage`
@@ -119,8 +149,8 @@ def detect_sources(data, threshold, npixels, filter_kernel=None,
         raise ValueError('npixels must be a positive integer, got '
                          '"{0}"'.format(npixels))
 
-    image = (filter_data(data, filter_kernel, mode='constant', fill_value=0.0,
-                         check_normalization=True) > threshold)
+    if tile_size is not None:
+        tile_size = _check_tile_size(tile_size)
 
     if connectivity == 4:
         selem = ndimage.generate_binary_structure(2, 1)
@@ -130,20 +160,213 @@ def detect_sources(data, threshold, npixels, filter_kernel=None,
         raise ValueError('Invalid connectivity={0}.  '
                          'Options are 4 or 8'.format(connectivity))
 
-    objlabels, nobj = ndimage.label(image, structure=selem)
-    objslices = ndimage.find_objects(objlabels)
+    if tile_size is None:
+        image = (filter_data(data, filter_kernel, mode='constant',
+                             fill_value=0.0, check_normalization=True) >
+                 threshold)
+        objlabels, nobj = ndimage.label(image, structure=selem)
+    else:
+        objlabels, nobj = _label_tiled(data, threshold, filter_kernel,
+                                       selem, tile_size, n_jobs=n_jobs,
+                                       use_processes=use_processes)
+
+    # remove objects with less than npixels and relabel the remaining
+    # objects with sequential label indices (in the same order) using a
+    # lookup table
+    obj_npix = np.bincount(objlabels.ravel(), minlength=nobj + 1)
+    keep = (obj_npix >= npixels)
+    keep[0] = False
+    if np.count_nonzero(keep) < nobj:
+        label_map = np.zeros(nobj + 1, dtype=objlabels.dtype)
+        label_map[keep] = np.arange(1, np.count_nonzero(keep) + 1)
+        objlabels = label_map[objlabels]
 
-    # remove objects with less than npixels
-    for objslice in objslices:
-        objlabel = objlabels[objslice]
-        obj_npix = len(np.where(objlabel.ravel() != 0)[0])
-        if obj_npix < npixels:
-            objlabels[objslice] = 0
+    return SegmentationImage(objlabels)
 
-    # relabel to make sequential label indices
-    objlabels, nobj = ndimage.label(objlabels, structure=selem)
 
-    return SegmentationImage(objlabels)
+def _label_tile(args):
+    """
+    Filter, threshold, and label a single image tile.
+
+    This is a module-level function so that it can be used with a
+    `multiprocessing.Pool`.
+    """
+
+    from scipy import ndimage
+
+    data, threshold, kernel, method, (dy, dx), selem = args
+    if kernel is not None:
+        data = filter_data(data, kernel, mode='constant', fill_value=0.0,
+                           method=method)
+    ny, nx = threshold.shape
+    image = data[dy:dy + ny, dx:dx + nx] > threshold
+
+    return ndimage.label(image, structure=selem)
+
+
+def _first_label_pixels(labels):
+    """
+    Return the flat (raster) index of the first pixel of each label in
+    a `scipy.ndimage.label` image.
+
+    `scipy.ndimage.label` assigns the labels in the raster order of
+    their first pixel, so the first pixels are where the running
+    maximum of the (nonzero) labels increases.
+    """
+
+    labels = labels.ravel()
+    idx = np.flatnonzero(labels)
+    if len(idx) == 0:
+        return idx
+    values = labels[idx]
+    new = np.empty(len(values), dtype=bool)
+    new[0] = True
+    new[1:] = values[1:] > np.maximum.accumulate(values)[:-1]
+
+    return idx[new]
+
+
+def _boundary_pairs(labels1, labels2, shifts):
+    """
+    Return the pairs of nonzero labels of touching pixels in two
+    adjacent rows (or columns) of a label image.
+
+    ``shifts`` are the offsets along the rows between the touching
+    pixels, i.e. ``(0,)`` for 4-connectivity and ``(-1, 0, 1)`` for
+    8-connectivity.
+    """
+
+    n = len(labels1)
+    for shift in shifts:
+        lab1 = labels1[max(-shift, 0):n - max(shift, 0)]
+        lab2 = labels2[max(shift, 0):n - max(-shift, 0)]
+        mask = (lab1 > 0) & (lab2 > 0)
+        yield lab1[mask], lab2[mask]
+
+
+def _label_tiled(data, threshold, kernel, selem, tile_size, n_jobs=1,
+                 use_processes=False):
+    """
+    Label the pixels above the threshold in independent tiles of the
+    image and merge the labels that touch across the tile boundaries.
+
+    The returned labels are identical to those of `scipy.ndimage.label`
+    applied to the whole thresholded image, provided the tiles are
+    filtered (if at all) with direct convolution (see
+    `detect_sources`).
+
+    Parameters
+    ----------
+    data : array_like
+        The 2D array of the image.
+
+    threshold : float or array-like
+        The detection threshold (broadcastable to the ``data`` shape).
+
+    kernel : array-like (2D), `~astropy.convolution.Kernel2D`, or `None`
+        The filter kernel.
+
+    selem : 2D bool `~numpy.ndarray`
+        The 3x3 structuring element defining the pixel connectivity.
+
+    tile_size : int
+        The size (in pixels) of the tiles along both axes.
+
+    n_jobs : int, optional
+        The number of worker threads (or processes).
+
+    use_processes : bool, optional
+        If `True`, use a pool of worker processes instead of threads.
+
+    Returns
+    -------
+    objlabels : 2D int `~numpy.ndarray`
+        The label image.
+
+    nobj : int
+        The number of labels.
+    """
+
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    data = np.asanyarray(data)
+    threshold = np.broadcast_to(threshold, data.shape)
+    ny, nx = data.shape
+
+    halo = 0
+    method = 'direct'
+    if kernel is not None:
+        if isinstance(kernel, Kernel2D):
+            kernel = kernel.array
+        kernel = np.asanyarray(kernel)
+        if not np.allclose(np.sum(kernel), 1.0):
+            warnings.warn('The kernel is not normalized.',
+                          AstropyUserWarning)
+        halo = max(kernel.shape) // 2
+
+        # use the same convolution method for all tiles (as for the
+        # whole image with method='auto')
+        method = _select_filter_method(data, kernel.size)
+
+    def tile_args(core, extended):
+        y0, y1, x0, x1 = core
+        ty0, ty1, tx0, tx1 = extended
+        return (data[ty0:ty1, tx0:tx1], threshold[y0:y1, x0:x1], kernel,
+                method, (y0 - ty0, x0 - tx0), selem)
+
+    # label the tiles, offsetting the tile labels to make them unique
+    # and recording the raster index of the first pixel of each label
+    objlabels = np.zeros(data.shape, dtype=np.int32)
+    first_pixels = [np.zeros(1, dtype=np.intp)]
+    nlabels = 0
+    cores = []
+    for core, _, (labels, nobj) in _map_tiles(
+            _label_tile, data.shape, tile_size, halo, tile_args,
+            n_jobs=n_jobs, use_processes=use_processes):
+        y0, y1, x0, x1 = core
+        cores.append(core)
+        np.add(labels, nlabels, out=objlabels[y0:y1, x0:x1],
+               where=(labels > 0))
+        first = _first_label_pixels(labels)
+        first_pixels.append((y0 + first // (x1 - x0)) * nx +
+                            x0 + first % (x1 - x0))
+        nlabels += nobj
+    first_pixels = np.concatenate(first_pixels)
+
+    # find the pairs of labels that touch across the tile boundaries
+    shifts = (-1, 0, 1) if selem[0, 0] else (0,)
+    pairs = []
+    for x0 in range(tile_size, nx, tile_size):
+        pairs.extend(_boundary_pairs(objlabels[:, x0 - 1],
+                                     objlabels[:, x0], shifts))
+    for y0 in range(tile_size, ny, tile_size):
+        pairs.extend(_boundary_pairs(objlabels[y0 - 1], objlabels[y0],
+                                     shifts))
+    if pairs:
+        labels1, labels2 = (np.concatenate(lab) for lab in zip(*pairs))
+    else:
+        labels1 = labels2 = np.zeros(0, dtype=np.int32)
+
+    # merge the touching labels (the connected components of the graph
+    # of label pairs; label 0 is always its own component)
+    graph = coo_matrix((np.ones(len(labels1), dtype=np.int8),
+                        (labels1, labels2)), shape=(nlabels + 1,) * 2)
+    ncomp, components = connected_components(graph, directed=False)
+
+    # number the merged labels in the raster order of their first
+    # pixel, as done by scipy.ndimage.label
+    comp_first = np.full(ncomp, np.iinfo(np.intp).max, dtype=np.intp)
+    np.minimum.at(comp_first, components[1:], first_pixels[1:])
+    comp_label = np.empty(ncomp, dtype=np.int32)
+    comp_label[np.argsort(comp_first)] = np.arange(1, ncomp + 1)
+    label_map = comp_label[components]
+    label_map[0] = 0
+
+    for (y0, y1, x0, x1) in cores:
+        objlabels[y0:y1, x0:x1] = label_map[objlabels[y0:y1, x0:x1]]
+
+    return objlabels, ncomp - 1
 
 
 def make_source_mask(data, snr, npixels, mask=None, mask_value=None,
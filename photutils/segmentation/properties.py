@@ -18,6 +18,40 @@ __doctest_requires__ = {('SourceProperties', 'SourceProperties.*',
                          'source_properties', 'properties_table'):
                         ['scipy', 'skimage']}
 
+# all scalar-valued properties (the default properties_table columns)
+_PROPERTIES_TABLE_COLUMNS = [
+    'id', 'xcentroid', 'ycentroid', 'ra_icrs_centroid', 'dec_icrs_centroid',
+    'source_sum', 'source_sum_err', 'background_sum', 'background_mean',
+    'background_at_centroid', 'xmin', 'xmax', 'ymin', 'ymax', 'min_value',
+    'max_value', 'minval_xpos', 'minval_ypos', 'maxval_xpos', 'maxval_ypos',
+    'area', 'equivalent_radius', 'perimeter', 'semimajor_axis_sigma',
+    'semiminor_axis_sigma', 'eccentricity', 'orientation', 'ellipticity',
+    'elongation', 'covar_sigx2', 'covar_sigxy', 'covar_sigy2', 'cxx', 'cxy',
+    'cyy']
+
+
+def _broadcast_image(value, shape, name):
+    """
+    Broadcast a scalar (or length-1) ``value`` to a 2D image of the
+    given ``shape``.
+
+    The result is a read-only view of ``value``, so no full-sized array
+    is allocated.  `None` is returned unchanged and a 2D ``value`` must
+    have the given ``shape``.
+    """
+
+    if value is None:
+        return None
+
+    value = np.atleast_1d(value)
+    if len(value) == 1:
+        value = np.broadcast_to(value, shape, subok=True)
+    if value.shape != shape:
+        raise ValueError('{0} and data must have the same shape.'
+                         .format(name))
+
+    return value
+
 
 class SourceProperties(object):
     """
@@ -133,26 +167,15 @@ class SourceProperties(object):
         if segment_img.shape != data.shape:
             raise ValueError('segment_img and data must have the same shape.')
 
-        if error is not None:
-            error = np.atleast_1d(error)
-            if len(error) == 1:
-                error = np.zeros(data.shape) + error
-            if error.shape != data.shape:
-                raise ValueError('error and data must have the same shape.')
+        error = _broadcast_image(error, data.shape, 'error')
 
         if mask is np.ma.nomask:
-            mask = np.zeros(data.shape).astype(bool)
+            mask = None
         if mask is not None:
             if mask.shape != data.shape:
                 raise ValueError('mask and data must have the same shape.')
 
-        if background is not None:
-            background = np.atleast_1d(background)
-            if len(background) == 1:
-                background = np.zeros(data.shape) + background
-            if background.shape != data.shape:
-                raise ValueError('background and data must have the same '
-                                 'shape.')
+        background = _broadcast_image(background, data.shape, 'background')
 
         # data and filtered_data should be background-subtracted
         # for accurate source photometry and properties
@@ -1107,6 +1130,11 @@ def source_properties(data, segment_img, error=None, mask=None,
     if segment_img.shape != data.shape:
         raise ValueError('segment_img and data must have the same shape.')
 
+    # broadcast scalar inputs once (as read-only views), instead of
+    # repeating for each source
+    error = _broadcast_image(error, data.shape, 'error')
+    background = _broadcast_image(background, data.shape, 'background')
+
     # filter the data once, instead of repeating for each source
     if filter_kernel is not None:
         filtered_data = filter_data(data, filter_kernel, mode='constant',
@@ -1195,25 +1223,14 @@ def properties_table(source_props, columns=None, exclude_columns=None):
         raise ValueError('source_props is an empty list')
     source_props = np.atleast_1d(source_props)
 
-    # all scalar-valued properties
-    columns_all = ['id', 'xcentroid', 'ycentroid', 'ra_icrs_centroid',
-                   'dec_icrs_centroid', 'source_sum',
-                   'source_sum_err', 'background_sum', 'background_mean',
-                   'background_at_centroid', 'xmin', 'xmax', 'ymin', 'ymax',
-                   'min_value', 'max_value', 'minval_xpos', 'minval_ypos',
-                   'maxval_xpos', 'maxval_ypos', 'area', 'equivalent_radius',
-                   'perimeter', 'semimajor_axis_sigma',
-                   'semiminor_axis_sigma', 'eccentricity', 'orientation',
-                   'ellipticity', 'elongation', 'covar_sigx2',
-                   'covar_sigxy', 'covar_sigy2', 'cxx', 'cxy', 'cyy']
-
     table_columns = None
     if exclude_columns is not None:
-        table_columns = [s for s in columns_all if s not in exclude_columns]
+        table_columns = [s for s in _PROPERTIES_TABLE_COLUMNS
+                         if s not in exclude_columns]
     if columns is not None:
         table_columns = np.atleast_1d(columns)
     if table_columns is None:
-        table_columns = columns_all
+        table_columns = _PROPERTIES_TABLE_COLUMNS
 
     # it's *much* faster to calculate world coordinates using the
     # complete list of (x, y) instead of from the individual (x, y).
@@ -0,0 +1,116 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+from astropy.tests.helper import pytest, assert_quantity_allclose
+from astropy.convolution import Gaussian2DKernel
+import astropy.units as u
+
+from ..catalog import SourceCatalog
+from ..detect import detect_sources
+from ..properties import source_properties, properties_table
+from ...datasets import make_100gaussians_image
+
+try:
+    import scipy
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+try:
+    import skimage
+    HAS_SKIMAGE = True
+except ImportError:
+    HAS_SKIMAGE = False
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+@pytest.mark.skipif('not HAS_SKIMAGE')
+class TestSourceCatalog(object):
+    def setup_class(self):
+        self.data = make_100gaussians_image() - 5.
+        kernel = Gaussian2DKernel(1., x_size=5, y_size=5)
+        kernel.normalize()
+        self.kernel = kernel
+        self.segm = detect_sources(self.data, 5., npixels=5,
+                                   filter_kernel=kernel)
+
+        prng = np.random.RandomState(12345)
+        self.mask = prng.uniform(size=self.data.shape) < 0.05
+        self.error = prng.uniform(1., 2., size=self.data.shape)
+        self.background = prng.uniform(4., 6., size=self.data.shape)
+
+    @pytest.mark.parametrize('inputs', ['none', 'all'])
+    def test_properties_table(self, inputs):
+        """Test that the catalog matches properties_table."""
+
+        kwargs = {}
+        if inputs == 'all':
+            kwargs = dict(mask=self.mask, error=self.error,
+                          background=self.background,
+                          filter_kernel=self.kernel)
+        tbl1 = properties_table(source_properties(self.data, self.segm,
+                                                  **kwargs))
+        tbl2 = SourceCatalog(self.data, self.segm, **kwargs).to_table()
+        assert tbl1.colnames == tbl2.colnames
+        assert len(tbl2) == self.segm.nlabels
+        for column in tbl1.colnames:
+            if tbl1[column].dtype == object:
+                assert all(value is None for value in tbl2[column])
+                continue
+            assert tbl1[column].unit == tbl2[column].unit
+            assert_allclose(tbl2[column], tbl1[column], rtol=1.e-9,
+                            atol=1.e-10)
+
+    def test_labels(self):
+        cat = SourceCatalog(self.data, self.segm, labels=[5, 3, 3, 999, 1])
+        assert_array_equal(cat.id, [5, 3, 1])
+        assert len(cat) == 3
+        props = source_properties(self.data, self.segm, labels=[5, 3, 1])
+        assert_quantity_allclose(cat.centroid,
+                                 u.Quantity([p.centroid for p in props]))
+
+    def test_units(self):
+        cat = SourceCatalog(self.data * u.Jy, self.segm,
+                            error=self.error * u.Jy)
+        cat_nounit = SourceCatalog(self.data, self.segm, error=self.error)
+        assert_quantity_allclose(cat.source_sum,
+                                 cat_nounit.source_sum * u.Jy)
+        assert_quantity_allclose(cat.source_sum_err,
+                                 cat_nounit.source_sum_err * u.Jy)
+        assert cat.max_value.unit == u.Jy
+
+    def test_scalar_background(self):
+        cat = SourceCatalog(self.data, self.segm, background=5.)
+        assert_allclose(cat.background_mean, 5.)
+        assert_allclose(cat.background_sum, 5. * cat.area.value)
+
+    def test_scalar_error(self):
+        cat = SourceCatalog(self.data, self.segm, mask=self.mask,
+                            error=2. * u.Jy, background=np.array([5]))
+        error = np.full(self.data.shape, 2.)
+        cat2 = SourceCatalog(self.data, self.segm, mask=self.mask,
+                             error=error * u.Jy,
+                             background=np.full(self.data.shape, 5.))
+        assert_quantity_allclose(cat.source_sum_err, cat2.source_sum_err)
+        assert_allclose(cat.background_sum, cat2.background_sum)
+        assert_allclose(cat.background_mean, cat2.background_mean)
+
+    def test_columns(self):
+        cat = SourceCatalog(self.data, self.segm)
+        tbl = cat.to_table(columns=['id', 'xcentroid'])
+        assert tbl.colnames == ['id', 'xcentroid']
+        tbl = cat.to_table(exclude_columns=['perimeter'])
+        assert 'perimeter' not in tbl.colnames
+        assert cat['source_sum'] is cat.source_sum
+        assert cat.covariance.shape == (len(cat), 2, 2)
+
+    def test_inputs_shape(self):
+        with pytest.raises(ValueError):
+            SourceCatalog(self.data, np.zeros((3, 3), dtype=int))
+        with pytest.raises(ValueError):
+            SourceCatalog(self.data, self.segm, error=np.ones((3, 3)))
+        with pytest.raises(ValueError):
+            SourceCatalog(self.data, self.segm, mask=np.ones((3, 3), bool))
@@ -50,6 +50,22 @@ class TestDetectSources(object):
         segm = detect_sources(self.data, threshold=0.9, npixels=5)
         assert_array_equal(segm.data, self.ref1)
 
+    def test_small_sources_overlapping_slices(self):
+        """
+        Test that the pixels of other sources within the bounding box of
+        a small source are not counted.
+        """
+
+        data = np.zeros((10, 10))
+        data[0, :] = 1.     # L-shaped source with 19 pixels
+        data[:, 9] = 1.
+        data[2:, 0:8] = 1.    # 64 pixels
+        segm = detect_sources(data, threshold=0.5, npixels=20)
+        assert segm.nlabels == 1
+        ref = np.zeros((10, 10), dtype=int)
+        ref[2:, 0:8] = 1
+        assert_array_equal(segm.data, ref)
+
     def test_zerothresh(self):
         """Test detection with zero threshold."""
 
@@ -124,6 +140,38 @@ class TestDetectSources(object):
             assert ('The kernel is not normalized.'
                     in str(warning_lines[0].message))
 
+    @pytest.mark.parametrize('connectivity', [4, 8])
+    @pytest.mark.parametrize(('tile_size', 'n_jobs'),
+                             [(3, 1), (7, 1), (16, 2), (500, 1)])
+    def test_tiled(self, connectivity, tile_size, n_jobs):
+        """Test that the tiled detection matches the whole image."""
+
+        data = make_4gaussians_image()
+        kernel = Gaussian2DKernel(1., x_size=5, y_size=5)
+        kernel.normalize()
+        segm1 = detect_sources(data, 20., npixels=3, filter_kernel=kernel,
+                               connectivity=connectivity)
+        segm2 = detect_sources(data, 20., npixels=3, filter_kernel=kernel,
+                               connectivity=connectivity,
+                               tile_size=tile_size, n_jobs=n_jobs)
+        assert segm1.nlabels > 1
+        assert_array_equal(segm2.data, segm1.data)
+
+    @pytest.mark.parametrize('tile_size', [0, -3, 2.5])
+    def test_tiled_invalid_tile_size(self, tile_size):
+        with pytest.raises(ValueError):
+            detect_sources(self.data, 0.5, npixels=1, tile_size=tile_size)
+
+    def test_tiled_diagonal(self):
+        """Test the merging of labels touching at tile corners."""
+
+        data = np.eye(8)
+        segm = detect_sources(data, 0.5, npixels=1, tile_size=3)
+        assert_array_equal(segm.data, data)
+        segm = detect_sources(data, 0.5, npixels=1, connectivity=4,
+                              tile_size=3)
+        assert_array_equal(segm.data, np.diag(np.arange(1, 9)))
+
 
 @pytest.mark.skipif('not HAS_SCIPY')
 class TestMakeSourceMask(object):
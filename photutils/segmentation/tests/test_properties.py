@@ -181,6 +181,16 @@ class TestSourcePropertiesFunction(object):
         assert props[0].background_mean == value
         assert_allclose(props[0].background_at_centroid, value)
 
+    def test_properties_scalar_error_background(self):
+        """Scalar inputs are broadcast without full-sized copies."""
+
+        props = source_properties(IMAGE, SEGM, error=2., background=1.)
+        assert props[0]._error.strides == (0, 0)
+        assert props[0]._background.strides == (0, 0)
+        assert_allclose(props[0].source_sum_err,
+                        2. * np.sqrt(props[0].area.value))
+        assert_allclose(props[0].background_sum, props[0].area.value)
+
     def test_properties_error_background_None(self):
         props = source_properties(IMAGE, SEGM)
         assert props[0].background_cutout_ma is None
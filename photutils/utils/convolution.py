@@ -11,14 +11,214 @@ from astropy.utils.exceptions import AstropyUserWarning
 __all__ = ['filter_data']
 
 
+# the minimum number of kernel elements for which FFT convolution is
+# used if method='auto' (FFT convolution is faster for kernels larger
+# than about 15 x 15 pixels)
+_FFT_MIN_KERNEL_SIZE = 200
+
+# the size of the blocks of the output image computed in each FFT
+# convolution, which bounds the memory used for large images
+_FFT_BLOCK_SIZE = 1024
+
+# numpy.pad modes corresponding to the scipy.ndimage boundary modes
+_PAD_MODES = {'constant': 'constant', 'reflect': 'symmetric',
+              'nearest': 'edge', 'mirror': 'reflect', 'wrap': 'wrap'}
+
+
+def _select_filter_method(data, kernel_size, method='auto'):
+    """
+    Select the convolution method (``'direct'`` or ``'fft'``).
+
+    ``'auto'`` selects FFT convolution for floating-point ``data``
+    without non-finite values if ``kernel_size`` (the total number of
+    kernel elements) is larger than ``_FFT_MIN_KERNEL_SIZE``, and
+    direct convolution otherwise.
+    """
+
+    if method not in ('auto', 'direct', 'fft'):
+        raise ValueError('method must be "auto", "direct", or "fft"')
+
+    if method == 'auto':
+        data = np.asanyarray(data)
+        if (kernel_size > _FFT_MIN_KERNEL_SIZE and
+                np.issubdtype(data.dtype, np.floating) and
+                np.all(np.isfinite(data))):
+            method = 'fft'
+        else:
+            method = 'direct'
+
+    return method
+
+
+def _fft_convolve(data, kernel, mode='constant', fill_value=0.0):
+    """
+    Convolve a 2D image with a 2D kernel using FFTs.
+
+    The result is the same as `scipy.ndimage.convolve` (including the
+    kernel origin for even-sized kernels), but is always a float array.
+    The image is padded according to ``mode`` and then convolved in
+    blocks of at most ``_FFT_BLOCK_SIZE`` pixels on a side (each block
+    is computed from the padded data overlapping the block), so that
+    the FFTs of the full image are never held in memory.
+    """
+
+    from scipy.signal import fftconvolve
+
+    # the padding before and after (the kernel origin is at k // 2)
+    pad_width = [(size - 1 - size // 2, size // 2) for size in kernel.shape]
+    pad_mode = _PAD_MODES[mode]
+    if pad_mode == 'constant':
+        padded_data = np.pad(data, pad_width, mode=str(pad_mode),
+                             constant_values=fill_value)
+    else:
+        padded_data = np.pad(data, pad_width, mode=str(pad_mode))
+
+    ky, kx = kernel.shape
+    result = np.empty(data.shape)
+    for y0 in range(0, data.shape[0], _FFT_BLOCK_SIZE):
+        y1 = min(y0 + _FFT_BLOCK_SIZE, data.shape[0])
+        for x0 in range(0, data.shape[1], _FFT_BLOCK_SIZE):
+            x1 = min(x0 + _FFT_BLOCK_SIZE, data.shape[1])
+            block = padded_data[y0:y1 + ky - 1, x0:x1 + kx - 1]
+            result[y0:y1, x0:x1] = fftconvolve(block, kernel, mode='valid')
+
+    return result
+
+
+def _fft_convolve_multi(data, kernels, mode='constant', fill_value=0.0,
+                        output=None, workspace=None):
+    """
+    Convolve a 2D image with several 2D kernels using FFTs, sharing the
+    FFTs of the image between the kernels.
+
+    The kernels are embedded (keeping their origins) in an array with
+    the shape of the largest kernel, so that the image is padded and
+    transformed only once (in blocks, as in `_fft_convolve`).  The FFT
+    of each block is then multiplied by the FFT of each kernel.
+
+    ``output`` is an optional list of float arrays (one for each
+    kernel) in which the results are written.  ``workspace`` is an
+    optional `dict` in which the padded image buffer (for
+    ``mode='constant'``) and the kernel FFTs are kept, so that they can
+    be reused when convolving several images of the same shape with
+    the same kernels.
+    """
+
+    from scipy.fftpack import next_fast_len
+
+    shape = tuple(max(kernel.shape[i] for kernel in kernels)
+                  for i in range(2))
+    ky, kx = shape
+    embedded = []
+    for kernel in kernels:
+        kernel_array = np.zeros(shape)
+        y0 = (ky // 2) - (kernel.shape[0] // 2)
+        x0 = (kx // 2) - (kernel.shape[1] // 2)
+        kernel_array[y0:y0 + kernel.shape[0],
+                     x0:x0 + kernel.shape[1]] = kernel
+        embedded.append(kernel_array)
+
+    if workspace is None:
+        workspace = {}
+
+    pad_width = [(size - 1 - size // 2, size // 2) for size in shape]
+    pad_mode = _PAD_MODES[mode]
+    if pad_mode == 'constant':
+        padded_shape = tuple(size + sum(width)
+                             for size, width in zip(data.shape, pad_width))
+        padded_data = workspace.get('padded_data')
+        if (padded_data is None or padded_data.shape != padded_shape or
+                workspace.get('fill_value') != fill_value):
+            padded_data = np.empty(padded_shape)
+            padded_data.fill(fill_value)
+            workspace['padded_data'] = padded_data
+            workspace['fill_value'] = fill_value
+        padded_data[pad_width[0][0]:pad_width[0][0] + data.shape[0],
+                    pad_width[1][0]:pad_width[1][0] + data.shape[1]] = data
+    else:
+        padded_data = np.pad(data, pad_width, mode=str(pad_mode))
+
+    if output is None:
+        results = [np.empty(data.shape) for _ in kernels]
+    else:
+        results = output
+    kernel_ffts = workspace.setdefault('kernel_ffts', {})
+    for y0 in range(0, data.shape[0], _FFT_BLOCK_SIZE):
+        y1 = min(y0 + _FFT_BLOCK_SIZE, data.shape[0])
+        for x0 in range(0, data.shape[1], _FFT_BLOCK_SIZE):
+            x1 = min(x0 + _FFT_BLOCK_SIZE, data.shape[1])
+            block = padded_data[y0:y1 + ky - 1, x0:x1 + kx - 1]
+            fshape = tuple(next_fast_len(size) for size in block.shape)
+            if fshape not in kernel_ffts:
+                kernel_ffts[fshape] = [np.fft.rfftn(kernel_array, fshape)
+                                       for kernel_array in embedded]
+            block_fft = np.fft.rfftn(block, fshape)
+            for result, kernel_fft in zip(results, kernel_ffts[fshape]):
+                conv = np.fft.irfftn(block_fft * kernel_fft, fshape)
+                result[y0:y1, x0:x1] = conv[ky - 1:ky - 1 + y1 - y0,
+                                            kx - 1:kx - 1 + x1 - x0]
+
+    return results
+
+
+def _filter_data_multi(data, kernels, mode='constant', fill_value=0.0,
+                       method='auto', output=None, workspace=None):
+    """
+    Convolve a 2D image with each of several 2D kernels.
+
+    This is equivalent to calling `filter_data` for each kernel, but
+    with FFT convolution the FFTs of the image are computed only once.
+    With ``method='auto'``, FFT convolution is used (for floating-point
+    ``data`` without non-finite values) if the total number of kernel
+    elements is more than 200.
+
+    ``output`` and ``workspace`` can be used to reuse the result arrays
+    and the FFT buffers when convolving several images (see
+    `_fft_convolve_multi`).  The ``output`` arrays must be float arrays.
+
+    Returns
+    -------
+    result : list of `~numpy.ndarray`
+        The convolved images, in the same order as ``kernels``.
+    """
+
+    kernels = [kernel.array if isinstance(kernel, Kernel2D)
+               else np.asanyarray(kernel) for kernel in kernels]
+
+    data = np.asanyarray(data)
+    method = _select_filter_method(
+        data, sum(kernel.size for kernel in kernels), method=method)
+
+    if method == 'fft':
+        return _fft_convolve_multi(data, kernels, mode=mode,
+                                   fill_value=fill_value, output=output,
+                                   workspace=workspace)
+
+    if output is None:
+        return [filter_data(data, kernel, mode=mode, fill_value=fill_value,
+                            method='direct') for kernel in kernels]
+
+    from scipy import ndimage
+
+    for kernel, result in zip(kernels, output):
+        ndimage.convolve(data, kernel, output=result, mode=mode,
+                         cval=fill_value)
+    return output
+
+
 def filter_data(data, kernel, mode='constant', fill_value=0.0,
-                check_normalization=False):
+                check_normalization=False, method='auto'):
     """
     Convolve a 2D image with a 2D kernel.
 
     The kernel may either be a 2D `~numpy.ndarray` or a
     `~astropy.convolution.Kernel2D` object.
 
+    The convolution is performed either directly
+    (`scipy.ndimage.convolve`) or using FFTs.  For large kernels, FFT
+    convolution is much faster.  Large images are convolved with FFTs
+    in blocks to limit the memory use.
+
     Parameters
     ----------
     data : array_like
@@ -41,6 +241,14 @@ def filter_data(data, kernel, mode='constant', fill_value=0.0,
     check_normalization : bool, optional
         If `True` then a warning will be issued if the kernel is not
         normalized to 1.
+
+    method : {'auto', 'direct', 'fft'}, optional
+        The convolution method.  ``'auto'`` uses FFT convolution for
+        floating-point ``data`` without non-finite values if the kernel
+        has more than 200 elements, and direct convolution otherwise.
+        The FFT convolution always returns a float array and non-finite
+        ``data`` values affect the whole output image.  The default is
+        ``'auto'``.
     """
 
     from scipy import ndimage
@@ -56,6 +264,15 @@ def filter_data(data, kernel, mode='constant', fill_value=0.0,
                 warnings.warn('The kernel is not normalized.',
                               AstropyUserWarning)
 
+        kernel_array = np.asanyarray(kernel_array)
+        method = _select_filter_method(data, kernel_array.size,
+                                       method=method)
+
+        if method == 'fft':
+            return _fft_convolve(np.asanyarray(data),
+                                 np.asanyarray(kernel_array), mode=mode,
+                                 fill_value=fill_value)
+
         # NOTE:  astropy.convolution.convolve fails with zero-sum
         # kernels (used in findstars) (cf. astropy #1647)
         return ndimage.convolve(data, kernel_array, mode=mode,
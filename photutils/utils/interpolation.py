@@ -154,7 +154,7 @@ class ShepardIDWInterpolator(object):
         self.kdtree = cKDTree(coordinates, leafsize=leafsize)
 
     def __call__(self, positions, n_neighbors=8, eps=0.0, power=1.0, reg=0.0,
-                 conf_dist=1e-12, dtype=np.float):
+                 conf_dist=1e-12, dtype=np.float, chunk_size=None):
         """
         Evaluate the interpolator at the given positions.
 
@@ -212,6 +212,13 @@ class ShepardIDWInterpolator(object):
             then the type will be inferred from the type of the
             ``values`` parameter used during the initialization of the
             interpolator.
+
+        chunk_size : int, optional
+            The maximum number of positions to evaluate at once.  The
+            memory required for the nearest-neighbor query and the
+            interpolation weights scales as ``chunk_size *
+            n_neighbors``.  If `None` (default), then all positions are
+            evaluated at once.
         """
 
         n_neighbors = int(n_neighbors)
@@ -244,46 +251,117 @@ class ShepardIDWInterpolator(object):
         positions = np.reshape(positions, (-1, self.coords_ndim))
         npositions = positions.shape[0]
 
-        distances, idx = self.kdtree.query(positions, k=n_neighbors, eps=eps)
+        if chunk_size is None:
+            chunk_size = max(npositions, 1)
+        chunk_size = int(chunk_size)
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be a positive integer')
 
         if n_neighbors == 1:
+            distances, idx = self.kdtree.query(positions, k=1, eps=eps)
             return self.values[idx]
 
         if dtype is None:
             dtype = self.values.dtype
 
         interp_values = np.zeros(npositions, dtype=dtype)
-        for k in range(npositions):
-            valid_idx = np.isfinite(distances[k])
-            idk = idx[k][valid_idx]
-            dk = distances[k][valid_idx]
-
-            if dk.shape[0] == 0:
-                interp_values[k] = np.nan
-                continue
-
-            if conf_dist is not None:
-                # check if we are close to a known data point
-                confused = (dk <= conf_dist)
-                if np.any(confused):
-                    interp_values[k] = self.values[idk[confused][0]]
-                    continue
-
-            w = 1.0 / ((dk ** power) + reg)
-            if self.weights is not None:
-                w *= self.weights[idk]
-
-            wtot = np.sum(w)
-            if wtot > 0.0:
-                interp_values[k] = np.dot(w, self.values[idk]) / wtot
-            else:
-                interp_values[k] = np.nan
+        for i0 in range(0, npositions, chunk_size):
+            i1 = min(i0 + chunk_size, npositions)
+            distances, idx = self.kdtree.query(positions[i0:i1],
+                                               k=n_neighbors, eps=eps)
+            interp_values[i0:i1] = self._interpolate(distances, idx, power,
+                                                     reg, conf_dist)
 
         if len(interp_values) == 1:
             return interp_values[0]
         else:
             return interp_values
 
+    def _neighbor_weights(self, distances, idx, power, reg, conf_dist):
+        """
+        Compute the normalized interpolation weights of the nearest
+        neighbors of a set of positions.
+
+        The weights depend only on the positions (and the input
+        ``weights``), so they can be reused to interpolate several sets
+        of values defined at the same coordinates.
+
+        Parameters
+        ----------
+        distances : 2D `~numpy.ndarray`
+            The distances to the nearest neighbors of each position,
+            sorted in increasing order.  Missing neighbors have an
+            infinite distance.
+
+        idx : 2D `~numpy.ndarray`
+            The indices of the nearest neighbors of each position.
+            Missing neighbors have an index equal to ``ncoords``.
+
+        power : float
+            The power of the inverse distance used for the interpolation
+            weights.
+
+        reg : float
+            The regularization parameter.
+
+        conf_dist : float or `None`
+            The confusion distance below which the value of the closest
+            data point is used.
+
+        Returns
+        -------
+        idx : 2D `~numpy.ndarray`
+            The indices of the nearest neighbors of each position, where
+            missing neighbors have an index of zero (and a zero weight).
+
+        weights : 2D `~numpy.ndarray`
+            The interpolation weights of the nearest neighbors, which
+            sum to one for each position.  The weights of positions
+            without any valid neighbors (or with zero total weight) are
+            NaN.
+        """
+
+        valid = np.isfinite(distances)
+        idx = np.where(valid, idx, 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            w = 1.0 / ((np.where(valid, distances, 1.0) ** power) + reg)
+            w[~valid] = 0.0
+            if self.weights is not None:
+                w *= self.weights[idx]
+
+            wtot = np.sum(w, axis=1)
+            w /= wtot[:, np.newaxis]
+
+        w[~(wtot > 0.0)] = np.nan
+
+        if conf_dist is not None:
+            # check if we are close to a known data point; the neighbors
+            # are sorted by distance, so only the nearest one is checked
+            confused = valid[:, 0] & (distances[:, 0] <= conf_dist)
+            w[confused] = 0.0
+            w[confused, 0] = 1.0
+
+        return idx, w
+
+    def _interpolate(self, distances, idx, power, reg, conf_dist):
+        """
+        Compute the interpolated values for a set of positions from
+        the distances and indices of their nearest neighbors.
+
+        See `_neighbor_weights` for a description of the parameters.
+
+        Returns
+        -------
+        result : 1D `~numpy.ndarray`
+            The interpolated values.  Positions without any valid
+            neighbors (or with zero total weight) are set to NaN.
+        """
+
+        idx, w = self._neighbor_weights(distances, idx, power, reg,
+                                        conf_dist)
+        return np.sum(w * np.asarray(self.values)[idx], axis=1)
+
 
 def interpolate_masked_data(data, mask, error=None, background=None):
     """
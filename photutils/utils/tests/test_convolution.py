@@ -0,0 +1,79 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import itertools
+
+import numpy as np
+from numpy.testing import assert_allclose
+from astropy.convolution import Gaussian2DKernel
+from astropy.tests.helper import pytest
+
+from .. import convolution
+from ..convolution import filter_data, _filter_data_multi
+
+try:
+    import scipy
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+
+MODES = ['constant', 'reflect', 'nearest', 'mirror', 'wrap']
+KERNEL_SHAPES = [(3, 3), (4, 6), (15, 16)]
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+@pytest.mark.parametrize(('mode', 'kernel_shape'),
+                         list(itertools.product(MODES, KERNEL_SHAPES)))
+def test_filter_data_fft(mode, kernel_shape):
+    prng = np.random.RandomState(12345)
+    data = prng.random_sample((50, 61))
+    kernel = prng.random_sample(kernel_shape)
+    result1 = filter_data(data, kernel, mode=mode, fill_value=0.5,
+                          method='direct')
+    result2 = filter_data(data, kernel, mode=mode, fill_value=0.5,
+                          method='fft')
+    assert_allclose(result1, result2)
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+def test_filter_data_fft_blocks(monkeypatch):
+    monkeypatch.setattr(convolution, '_FFT_BLOCK_SIZE', 16)
+    prng = np.random.RandomState(12345)
+    data = prng.random_sample((50, 61))
+    kernel = Gaussian2DKernel(5)
+    result1 = filter_data(data, kernel, method='direct')
+    result2 = filter_data(data, kernel)    # auto selects fft
+    assert_allclose(result1, result2)
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+def test_filter_data_auto_nonfinite():
+    data = np.ones((30, 30))
+    data[25, 25] = np.nan
+    kernel = np.ones((21, 21))
+    result = filter_data(data, kernel)
+    assert np.isfinite(result[0, 0])
+    assert np.isnan(result[25, 25])
+
+
+def test_filter_data_invalid_method():
+    with pytest.raises(ValueError):
+        filter_data(np.ones((10, 10)), np.ones((3, 3)), method='invalid')
+
+
+@pytest.mark.skipif('not HAS_SCIPY')
+@pytest.mark.parametrize('mode', MODES)
+def test_filter_data_multi(monkeypatch, mode):
+    monkeypatch.setattr(convolution, '_FFT_BLOCK_SIZE', 16)
+    prng = np.random.RandomState(12345)
+    data = prng.random_sample((50, 61))
+    kernels = [prng.random_sample(shape) for shape in KERNEL_SHAPES]
+    results = _filter_data_multi(data, kernels, mode=mode, fill_value=0.5,
+                                 method='fft')
+    assert len(results) == len(kernels)
+    for kernel, result in zip(kernels, results):
+        assert_allclose(result, filter_data(data, kernel, mode=mode,
+                                            fill_value=0.5,
+                                            method='direct'))
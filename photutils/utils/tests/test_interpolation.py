@@ -109,6 +109,19 @@ class TestShepardIDWInterpolator(object):
         with pytest.raises(ValueError):
             self.f(np.ones((3, 3, 3)))
 
+    def test_chunk_size(self):
+        pos = np.random.random(50)
+        assert_allclose(self.f(pos, chunk_size=7), self.f(pos))
+
+    def test_chunk_size_invalid(self):
+        with pytest.raises(ValueError):
+            self.f(0.5, chunk_size=0)
+
+    def test_n_neighbors_too_large(self):
+        """test when there are fewer data points than n_neighbors"""
+        f = idw([0., 1.], [1., 3.])
+        assert_allclose(f(0.25, n_neighbors=5), 1.5)
+
 
 class TestInterpolateMaskedData(object):
     def test_mask_shape(self):
@@ -0,0 +1,35 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from astropy.tests.helper import pytest
+
+from ..tiling import _map_tiles
+
+
+def _tile_sum(tile):
+    return tile.sum()
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_map_tiles(n_jobs):
+    data = np.arange(70 * 45).reshape(70, 45)
+    coverage = np.zeros(data.shape, dtype=int)
+    results = list(_map_tiles(
+        _tile_sum, data.shape, 20, 3,
+        lambda core, ext: data[ext[0]:ext[1], ext[2]:ext[3]], n_jobs=n_jobs))
+    assert len(results) == 4 * 3
+    for (y0, y1, x0, x1), (ty0, ty1, tx0, tx1), result in results:
+        coverage[y0:y1, x0:x1] += 1
+        assert (ty0, ty1) == (max(y0 - 3, 0), min(y1 + 3, 70))
+        assert (tx0, tx1) == (max(x0 - 3, 0), min(x1 + 3, 45))
+        assert result == data[ty0:ty1, tx0:tx1].sum()
+    assert_array_equal(coverage, 1)
+
+
+@pytest.mark.parametrize('tile_size', [0, -10, 10.5])
+def test_map_tiles_tile_size(tile_size):
+    with pytest.raises(ValueError):
+        list(_map_tiles(_tile_sum, (10, 10), tile_size, 0, None))
@@ -0,0 +1,103 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+
+
+__all__ = []
+
+
+def _check_tile_size(tile_size):
+    """
+    Check that ``tile_size`` is a positive integer and return it as an
+    `int`.
+    """
+
+    if (tile_size <= 0) or (int(tile_size) != tile_size):
+        raise ValueError('tile_size must be a positive integer, got '
+                         '"{0}"'.format(tile_size))
+
+    return int(tile_size)
+
+
+def _map_tiles(func, shape, tile_size, halo, tile_args, n_jobs=1,
+               use_processes=False):
+    """
+    Apply a function to overlapping tiles of a 2D image, optionally in
+    parallel.
+
+    The image is split into tiles of ``tile_size`` pixels on a side
+    (the "cores"), in raster order.  Each tile is extended by ``halo``
+    pixels on all sides (clipped at the image edges).
+
+    This is a generator that yields the results in the tile order as
+    they become available.  The worker pool (if any) is closed when
+    the generator is exhausted or closed.
+
+    Parameters
+    ----------
+    func : callable
+        The function applied to the argument of each tile.  It must be
+        a module-level function if ``use_processes`` is `True`.
+
+    shape : tuple of int
+        The ``(ny, nx)`` shape of the image.
+
+    tile_size : int
+        The size (in pixels) of the tiles along both axes, excluding
+        the halo.
+
+    halo : int
+        The number of pixels by which each tile is extended.
+
+    tile_args : callable
+        A function called as ``tile_args(core, extended)`` that returns
+        the argument of ``func`` for a tile.  ``core`` and ``extended``
+        are the ``(y0, y1, x0, x1)`` pixel ranges of the tile and of the
+        extended tile.
+
+    n_jobs : int, optional
+        The number of worker threads (or processes).  If 1, the tiles
+        are processed serially.
+
+    use_processes : bool, optional
+        If `True`, use a pool of worker processes instead of threads.
+
+    Yields
+    ------
+    core, extended : tuple of int
+        The ``(y0, y1, x0, x1)`` pixel ranges of the tile and of the
+        extended tile.
+
+    result : object
+        The result of ``func`` for the tile.
+    """
+
+    tile_size = _check_tile_size(tile_size)
+    ny, nx = shape
+
+    cores = []
+    extended = []
+    for y0 in range(0, ny, tile_size):
+        for x0 in range(0, nx, tile_size):
+            y1 = min(y0 + tile_size, ny)
+            x1 = min(x0 + tile_size, nx)
+            cores.append((y0, y1, x0, x1))
+            extended.append((max(y0 - halo, 0), min(y1 + halo, ny),
+                             max(x0 - halo, 0), min(x1 + halo, nx)))
+    args = [tile_args(core, ext) for core, ext in zip(cores, extended)]
+
+    pool = None
+    if n_jobs == 1:
+        results = (func(arg) for arg in args)
+    else:
+        pool = (Pool if use_processes else ThreadPool)(n_jobs)
+        results = pool.imap(func, args, chunksize=1)
+    try:
+        for core, ext, result in zip(cores, extended, results):
+            yield core, ext, result
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()